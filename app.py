@@ -1,12 +1,18 @@
 # app.py
 from dotenv import load_dotenv
 import os
-from flask import Flask, render_template, request, redirect, url_for, session, flash
-from datetime import datetime
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from datetime import date, datetime, timedelta
 import uuid
 from werkzeug.utils import secure_filename
-from services.wsjf_calculator import calculate_wsjf
-from utils.db_utils import execute_db, init_db, query_db
+from services.wsjf_calculator import calculate_wsjf, rescorer_projets
+from services.capacite import vers_lignes
+from services.ordonnancement import proposer_planning, resultat_json
+from services.simulation import invalider as invalider_simulation, simuler
+from services.import_jobs import marquer_jobs_interrompus
+from utils.db_utils import execute_db, init_db, query_db, init_app as init_db_app, pool_stats
+from utils.recherche import rechercher
+from utils.referentiel import lignes as referentiel, statistiques as referentiel_stats
 from werkzeug.security import generate_password_hash, check_password_hash
 from utils.decorators import readonly_if_user  # ✅ pour restreindre certaines actions
 
@@ -27,6 +33,7 @@ from routes.phase_routes import phase_bp
 load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'votre_cle_secrete_super_securisee')
+init_db_app(app)
 
 # Enregistrement des Blueprints
 app.register_blueprint(collab_bp)
@@ -47,6 +54,7 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 # Initialisation DB
 init_db()
+marquer_jobs_interrompus()
 
 # ----------------- HELPERS / DÉCORATEURS -----------------
 def login_required(func):
@@ -142,7 +150,7 @@ def logout():
 @app.route('/interface1', methods=['GET', 'POST'])
 @login_required
 def interface1():
-    categorie = query_db("SELECT * FROM categorie")
+    categorie = referentiel('categorie')
     if request.method == 'POST':
         date_mep = datetime.strptime(request.form['date_mep'], '%Y-%m-%d').date()
         session['form1'] = {
@@ -254,6 +262,81 @@ def priorites():
     return render_template('priorites.html', projets=projets, filtre_retenu=filtre_retenu)
 
 
+@app.route('/priorites/ordonnancement')
+@login_required
+def ordonnancement():
+    """Proposition de planning : projets WSJF placés sous contrainte de capacité par profil."""
+    aujourd_hui = date.today()
+    try:
+        debut = date.fromisoformat(request.args.get('debut') or aujourd_hui.isoformat())
+        fin = date.fromisoformat(request.args.get('fin') or (debut + timedelta(weeks=52)).isoformat())
+    except ValueError:
+        flash("⚠️ Période invalide : affichage des 52 prochaines semaines.", "warning")
+        debut, fin = aujourd_hui, aujourd_hui + timedelta(weeks=52)
+    if fin < debut:
+        debut, fin = fin, debut
+    fin = min(fin, debut + timedelta(weeks=520))
+    retenus = request.args.get('retenu') == '1'
+
+    resultat = proposer_planning(debut, fin, retenus_seulement=retenus, a_partir_de=aujourd_hui)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(resultat_json(resultat))
+
+    cal = resultat['calendrier']
+    surcharge = resultat['charge'] > resultat['capacite'] + 1e-9
+    lignes = vers_lignes(resultat['charge'], cal.labels, [
+        {'profil': p['nom'], 'capacite': dict(zip(cal.labels, cap)), 'surcharge': dict(zip(cal.labels, sur))}
+        for p, cap, sur in zip(resultat['profils'], resultat['capacite'].tolist(), surcharge.tolist())
+    ])
+    return render_template(
+        'ordonnancement.html',
+        propositions=resultat['propositions'],
+        sans_repartition=resultat['sans_repartition'],
+        week_labels=cal.labels,
+        data=lignes,
+        debut=debut.isoformat(),
+        fin=fin.isoformat(),
+        retenu=retenus
+    )
+
+
+@app.route('/priorites/simulation', methods=['POST'])
+@login_required
+def simulation():
+    """
+    Simulation sans écriture : JSON {"projets": [ids], "decalages": {id: semaines},
+    "debut": "AAAA-MM-JJ", "fin": "AAAA-MM-JJ"} → charge profil × semaine et surcharges.
+    Sans "projets", la sélection courante (retenu) est simulée.
+    """
+    params = request.get_json(silent=True) or {}
+    aujourd_hui = date.today()
+    try:
+        debut = date.fromisoformat(params.get('debut') or aujourd_hui.isoformat())
+        fin = date.fromisoformat(params.get('fin') or (debut + timedelta(weeks=52)).isoformat())
+        decalages = {str(k): int(v) for k, v in (params.get('decalages') or {}).items()}
+        projets = params.get('projets')
+        if projets is not None:
+            projets = [str(p) for p in projets]
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({"erreur": f"Paramètres invalides : {e}"}), 400
+    if fin < debut or (fin - debut).days > 520 * 7:
+        return jsonify({"erreur": "Période invalide"}), 400
+
+    return jsonify(simuler(debut, fin, projets, decalages))
+
+
+@app.route('/recherche')
+@login_required
+def recherche():
+    """
+    Recherche globale (JSON) : ?q=texte&limite=20 → résultats classés par pertinence
+    sur les collaborateurs, projets, projets importés, complexités et valeurs métier.
+    """
+    q = (request.args.get('q') or '').strip()
+    limite = min(max(request.args.get('limite', 20, type=int), 1), 100)
+    return jsonify({"q": q, "resultats": rechercher(q, limite)})
+
+
 @app.route('/toggle_retenu/<string:projet_id>', methods=['POST'])
 @login_required
 @readonly_if_user  # ✅ les users ne peuvent plus modifier
@@ -264,6 +347,7 @@ def toggle_retenu(projet_id):
     else:
         nouveau_statut = 0 if projet['retenu'] else 1
         execute_db("UPDATE projets SET retenu = ? WHERE id = ?", [nouveau_statut, projet_id])
+        invalider_simulation()
         flash("✅ Statut 'retenu' mis à jour", "success")
     return redirect(url_for('priorites'))
 
@@ -294,6 +378,35 @@ def create_admin():
     return render_template('create_admin.html')
 
 
+@app.route('/admin/rescorer-wsjf', methods=['POST'])
+@login_required
+@has_role(['superadmin', 'admin'])
+def rescorer_wsjf():
+    """Recalcule score WSJF et complexité de tous les projets avec le barème actuel."""
+    try:
+        nb = rescorer_projets()
+        flash(f"✅ Scores WSJF recalculés : {nb} projet(s) modifié(s).", "success")
+    except Exception as e:
+        flash(f"❌ Erreur lors du recalcul des scores : {e}", "danger")
+    return redirect(url_for('priorites'))
+
+
+@app.route('/admin/db-stats')
+@login_required
+@has_role(['superadmin', 'admin'])
+def db_stats():
+    """Statistiques du pool de connexions SQLite (JSON)."""
+    return jsonify(pool_stats())
+
+
+@app.route('/admin/cache-stats')
+@login_required
+@has_role(['superadmin', 'admin'])
+def cache_stats():
+    """Succès / échecs du cache des tables de référence (JSON)."""
+    return jsonify(referentiel_stats())
+
+
 # ----------------- MAIN -----------------
 if __name__ == '__main__':
     host = "127.0.0.1"
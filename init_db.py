@@ -259,6 +259,23 @@ CREATE TABLE IF NOT EXISTS Complexite_projet (
     FOREIGN KEY (id_complexite) REFERENCES Complexite(id),
     FOREIGN KEY (id_projet) REFERENCES Projet(id)
 );
+
+-- Index secondaires des prédicats fréquents (mêmes définitions que utils/migrations.INDEX ;
+-- ceux des colonnes ajoutées après coup, comme projets.programme_id, sont créés par les migrations)
+CREATE INDEX IF NOT EXISTS ix_projets_score ON projets (score_wsjf DESC);
+CREATE INDEX IF NOT EXISTS ix_projets_statut ON projets (statut);
+CREATE INDEX IF NOT EXISTS ix_phase_profils_phase ON phase_profils_programme (phase_id, profil_id, pourcentage);
+CREATE INDEX IF NOT EXISTS ix_phase_profils_programme_profil ON phase_profils_programme (programme_id, profil_id);
+CREATE INDEX IF NOT EXISTS ix_collaborateurs_profil ON collaborateurs (profil_id);
+CREATE INDEX IF NOT EXISTS ix_dispo_jour_annee
+    ON disponibilites_jour (annee, collaborateur_matricule, mois, jour, jours_dispo);
+CREATE INDEX IF NOT EXISTS ix_dispo_semaine_annee
+    ON disponibilites_semaine (annee, collaborateur_matricule, mois, semaine, jours_dispo);
+CREATE INDEX IF NOT EXISTS ix_valeur_metier_projet_projet ON Valeur_metier_projet (id_projet, id_valeur_metier);
+CREATE INDEX IF NOT EXISTS ix_valeur_metier_projet_valeur ON Valeur_metier_projet (id_valeur_metier);
+CREATE INDEX IF NOT EXISTS ix_complexite_projet_complexite ON Complexite_projet (id_complexite);
+CREATE INDEX IF NOT EXISTS ix_complexite_libelle ON Complexite (libelle, type_libelle, valeur_libelle);
+CREATE INDEX IF NOT EXISTS ix_releases_debut_fin ON releases (debut, fin);
 """
 
 def log_step(message):
@@ -290,6 +307,13 @@ def init_db():
                 "collaborateur_matricule": "TEXT REFERENCES collaborateurs(matricule)"
             })
 
+            conn.commit()
+
+            # Colonnes et index des migrations (tables créées ici après le démarrage de l'application)
+            from utils.migrations import migrer
+            appliquees = migrer(conn)
+            log_step(f"✅ Migrations appliquées : {appliquees or 'aucune'}.")
+
             # ✅ Commit final
             conn.commit()
             log_step("✅ Base initialisée avec succès.")
@@ -1,67 +1,75 @@
 # routes/caf.py
-from flask import Blueprint, render_template, request
-from datetime import date, timedelta, datetime
-from utils.db_utils import query_db, execute_db  # Assure-toi que execute_db existe
-import calendar
+from flask import Blueprint, render_template, request, flash
+from datetime import date
+from utils.db_utils import query_db
+from services.charge_hebdo import charge_semaines
+from services.capacite import (
+    calendrier, calendrier_annee, capacite_automatique, capacite_build_profils,
+    capacite_collaborateurs, cumul_par_mois, ecart, vers_lignes
+)
+import numpy as np
 
 caf_bp = Blueprint('caf', __name__, url_prefix='/caf')
 
-from flask import Blueprint, render_template, request
-from datetime import date, timedelta
-from utils.db_utils import query_db
+HORIZON_MAX_JOURS = 10 * 366  # au-delà, la page devient illisible
+
+
+def _horizon():
+    """
+    Fenêtre affichée : ?debut=AAAA-MM-JJ&fin=AAAA-MM-JJ, sinon ?annee=AAAA (semaines ISO),
+    sinon l'année en cours. Retourne (calendrier, paramètres à reporter dans les formulaires).
+    """
+    debut, fin = request.args.get('debut'), request.args.get('fin')
+    if debut and fin:
+        try:
+            d, f = date.fromisoformat(debut), date.fromisoformat(fin)
+            if d <= f and (f - d).days <= HORIZON_MAX_JOURS:
+                return calendrier(d, f), {'debut': d.isoformat(), 'fin': f.isoformat()}
+        except ValueError:
+            pass
+        flash("⚠️ Période invalide : affichage de l'année en cours.", "warning")
+
+    annee = request.args.get('annee', type=int)
+    if annee is None or not 1900 <= annee <= 2200:
+        annee = date.today().year
+    return calendrier_annee(annee), {'annee': annee}
+
+
+def _profils_avec_effectif():
+    return query_db("""
+        SELECT p.id, p.nom, COUNT(c.matricule) AS nb_collab
+        FROM profils p
+        LEFT JOIN collaborateurs c ON p.id = c.profil_id
+        GROUP BY p.id, p.nom
+    """)
 
-caf_bp = Blueprint('caf', __name__, url_prefix='/caf')
 
 @caf_bp.route('/automatique')
 def caf_automatique():
-    annee = 2025
-    mois_labels = [
-        'January', 'February', 'March', 'April', 'May', 'June',
-        'July', 'August', 'September', 'October', 'November', 'December'
-    ]
+    cal, horizon = _horizon()
+    week_labels, mois_labels = list(cal.labels), list(cal.mois_labels)
 
     # Récupérer le filtre depuis l'URL
     mois_filtre = request.args.get('mois', 'all')
-
-    # Trouver le premier lundi de l'année
-    start = date(annee, 1, 1)
-    while start.weekday() != 0:  # Lundi = 0
-        start += timedelta(days=1)
-
-    # Associer chaque semaine à un mois
-    semaine_to_mois = {}
-    mois_to_semaines = {m: [] for m in mois_labels}
-    week_labels = []
-
-    for i in range(1, 53):
-        debut_semaine = start + timedelta(weeks=i-1)
-        mois = debut_semaine.strftime("%B")  # "January", "February", etc.
-        semaine = f"S{i}"
-        week_labels.append(semaine)
-        semaine_to_mois[semaine] = mois
-        if mois in mois_to_semaines:
-            mois_to_semaines[mois].append(semaine)
+    semaine_to_mois = {s: mois_labels[m] for s, m in zip(week_labels, cal.mois)}
 
     # Appliquer le filtre
-    if mois_filtre != 'all' and mois_filtre in mois_to_semaines:
-        semaines_affichees = mois_to_semaines[mois_filtre]
+    if mois_filtre != 'all' and mois_filtre in mois_labels:
+        colonnes = np.flatnonzero(cal.mois == mois_labels.index(mois_filtre))
     else:
-        semaines_affichees = week_labels
+        colonnes = np.arange(len(week_labels))
+    semaines_affichees = [week_labels[i] for i in colonnes]
 
     # Récupérer les profils
-    profils = query_db("""
-        SELECT p.id, p.nom, COUNT(c.matricule) AS nb_collab
-        FROM profils p
-        LEFT JOIN collaborateurs c ON p.id = c.profil_id
-        GROUP BY p.id, p.nom
-    """)
+    profils = _profils_avec_effectif()
+
+    capacite = capacite_automatique([p['nb_collab'] for p in profils], len(week_labels))
+    totaux = capacite[:, colonnes].sum(axis=1)
 
-    data = []
-    for profil in profils:
-        row = {'profil': profil['nom'], 'nb_collab': profil['nb_collab']}
-        for semaine in week_labels:
-            row[semaine] = profil['nb_collab'] * 5  # 5 JH/semaine
-        data.append(row)
+    data = vers_lignes(capacite, week_labels, [
+        {'profil': p['nom'], 'nb_collab': p['nb_collab'], 'total': total}
+        for p, total in zip(profils, totaux.tolist())
+    ])
 
     return render_template(
         'caf_automatique.html',
@@ -70,113 +78,79 @@ def caf_automatique():
         semaine_to_mois=semaine_to_mois,
         mois_labels=mois_labels,
         data=data,
-        mois_filtre=mois_filtre
+        mois_filtre=mois_filtre,
+        horizon=horizon
     )
 
 @caf_bp.route('/caf-requise')
 def caf_requise():
-    annee = 2025
-    week_labels = [f"S{i}" for i in range(1, 53)]
-
-    # Trouver le premier lundi de l'année
-    start = date(annee, 1, 1)
-    while start.weekday() != 0:
-        start += timedelta(days=1)
-
-    # Récupérer les projets avec leurs phases
-    projets = query_db("""
-        SELECT 
-            p.id, p.titre, p.duree_estimee_jh,
-            pp.date_debut, pp.date_fin,
-            pph.profil_id, pph.pourcentage
-        FROM projets p
-        JOIN projet_phases pp ON p.id = pp.projet_id
-        JOIN phase_profils_programme pph ON pp.phase_id = pph.phase_id
-        WHERE p.statut IN ('En attente', 'À planifier', 'En cours')
-    """)
+    cal, horizon = _horizon()
+    week_labels, lundis = list(cal.labels), cal.lundis.tolist()
 
     # Récupérer les profils
-    profils = query_db("SELECT id, nom FROM profils")
-    profil_dict = {p['id']: p['nom'] for p in profils}
-
-    # Initialiser la charge par semaine
-    charge_semaine = {f"S{i}": {p['id']: 0 for p in profils} for i in range(1, 53)}
+    profils = _profils_avec_effectif()
+
+    # Charge requise lue dans la table matérialisée charge_hebdo (tenue à jour à chaque modification)
+    requise = charge_semaines([p['id'] for p in profils], lundis)
+
+    # Capacité BUILD disponible par profil (somme des collaborateurs) et écart avec la charge
+    disponible = capacite_build_profils([p['id'] for p in profils], lundis)
+    ecarts = ecart(disponible, requise)
+
+    entetes = [{'profil': p['nom']} for p in profils]
+    data = vers_lignes(requise, week_labels, [
+        dict(e, total=t) for e, t in zip(entetes, requise.sum(axis=1).tolist())
+    ])
+    data_ecart = vers_lignes(ecarts, week_labels, [
+        dict(e, total=t) for e, t in zip(entetes, ecarts.sum(axis=1).tolist())
+    ])
+
+    # Cumuls mensuels et totaux par semaine (toutes lignes confondues)
+    mois_requise = cumul_par_mois(requise, cal.mois, len(cal.mois_labels)).tolist()
+    mois_ecart = cumul_par_mois(ecarts, cal.mois, len(cal.mois_labels)).tolist()
+    par_mois = [
+        {'profil': e['profil'], 'requise': r, 'ecart': g}
+        for e, r, g in zip(entetes, mois_requise, mois_ecart)
+    ]
+    totaux_semaine = dict(zip(week_labels, requise.sum(axis=0).tolist()))
 
-    for projet in projets:
-        try:
-            debut = datetime.strptime(projet['date_debut'], "%Y-%m-%d").date()
-            fin = datetime.strptime(projet['date_fin'], "%Y-%m-%d").date()
-            charge = projet['duree_estimee_jh'] or 0
-            pourcentage = projet['pourcentage'] or 1.0
-            charge_projet = charge * (pourcentage / 100)
-        except:
-            continue
-
-        # Répartir sur les semaines
-        for i in range(1, 53):
-            debut_semaine = start + timedelta(weeks=i-1)
-            fin_semaine = debut_semaine + timedelta(days=6)
-            key = f"S{i}"
-            if debut <= fin_semaine and fin >= debut_semaine:
-                overlap = min(fin, fin_semaine) - max(debut, debut_semaine)
-                jours = overlap.days + 1
-                total_jours = (fin - debut).days + 1
-                if total_jours > 0:
-                    charge_semaine_projet = (charge_projet * jours) / total_jours
-                    charge_semaine[key][projet['profil_id']] += charge_semaine_projet
-
-    # Préparer les données
-    data = []
-    for profil in profils:
-        row = {'profil': profil['nom']}
-        for s in week_labels:
-            row[s] = charge_semaine[s][profil['id']]
-        data.append(row)
-
-    return render_template('caf_requise.html', week_labels=week_labels, data=data)
+    return render_template(
+        'caf_requise.html',
+        week_labels=week_labels,
+        data=data,
+        data_ecart=data_ecart,
+        par_mois=par_mois,
+        mois_labels=cal.mois_labels,
+        totaux_semaine=totaux_semaine,
+        horizon=horizon
+    )
 
 @caf_bp.route('/caf-disponibles')
 def caf_disponibles():
-    annee = 2025
-    weeks = []
-    week_labels = []
-
-    start = date(annee, 1, 1)
-    while start.weekday() != 0:
-        start += timedelta(days=1)
-
-    num_weeks = 53 if calendar.isleap(annee) else 52
-    for i in range(1, num_weeks + 1):
-        weeks.append((i, start + timedelta(weeks=i-1)))
-        week_labels.append(f"S{i}")
-
-    # Récupérer les collaborateurs avec leurs profils
-    collaborateurs = query_db("""
-        SELECT 
-            c.matricule,
-            c.nom || ' ' || c.prenom AS nom_prenom,
-            p.nom AS profil,
-            a.nom AS affectation,
-            p.build_ratio,
-            p.run_ratio,
-            c.caf_disponible_build,
-            c.caf_disponible_run
-        FROM collaborateurs c
-        JOIN profils p ON c.profil_id = p.id
-        JOIN affectation a ON c.affectation_id = a.id
-    """)
-
-    # Exemple : 5 JH disponibles par semaine par collab (à remplacer par une vraie logique)
-    data = {}
-    for collab in collaborateurs:
-        matricule = collab['matricule']
-        data[matricule] = {}
-        for i in range(1, num_weeks + 1):
-            data[matricule][f"S{i}"] = 5.0  # Exemple fixe
+    cal, horizon = _horizon()
+    week_labels = list(cal.labels)
+
+    collaborateurs, total, build, run = capacite_collaborateurs(cal.lundis.tolist())
+
+    # Conversion en lignes d'affichage : cumuls annuels et répartition effective
+    cumul_total, cumul_build, cumul_run = total.sum(axis=1), build.sum(axis=1), run.sum(axis=1)
+    part_build = np.divide(cumul_build, cumul_build + cumul_run,
+                           out=np.zeros_like(cumul_build), where=(cumul_build + cumul_run) > 0)
+    lignes = [
+        dict(collab, caf_total=t, caf_build=b, caf_run=r,
+             pct_build=round(100 * pb), pct_run=100 - round(100 * pb))
+        for collab, t, b, r, pb in zip(collaborateurs, cumul_total.tolist(), cumul_build.tolist(),
+                                       cumul_run.tolist(), part_build.tolist())
+    ]
+    data = {
+        collab['matricule']: dict(zip(week_labels, valeurs))
+        for collab, valeurs in zip(collaborateurs, total.tolist())
+    }
 
     return render_template(
         'caf_disponibles.html',
         week_labels=week_labels,
         data=data,
-        collaborateurs=collaborateurs
-    )
\ No newline at end of file
+        collaborateurs=lignes,
+        horizon=horizon
+    )
@@ -1,6 +1,7 @@
 # routes/categorie_routes.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from utils.db_utils import query_db, get_db
+from utils.referentiel import invalider, lignes as referentiel
 
 categorie_bp = Blueprint("categorie", __name__, url_prefix="/categorie")
 
@@ -12,20 +13,12 @@ categorie_bp = Blueprint("categorie", __name__, url_prefix="/categorie")
 def liste_categories():
     q = (request.args.get("q", "") or "").strip()
 
-    sql = """
-        SELECT id, nom
-        FROM Categorie
-    """
-    params = []
-
     if q:
         # filtre insensible à la casse
-        sql += " WHERE nom LIKE ? COLLATE NOCASE"
-        params.append(f"%{q}%")
-
-    sql += " ORDER BY id DESC"
-
-    rows = query_db(sql, params)
+        rows = query_db("SELECT id, nom FROM Categorie WHERE nom LIKE ? COLLATE NOCASE ORDER BY id DESC",
+                        [f"%{q}%"])
+    else:
+        rows = referentiel("categorie", inverse=True)
     categories = [dict(r) for r in rows]  # pour éviter les soucis Row → JSON si besoin
 
     return render_template("categorie_liste.html", categories=categories)
@@ -48,6 +41,7 @@ def ajouter_categorie():
         INSERT INTO Categorie (nom, idate, iuser)
         VALUES (?, DATETIME('now'), 1)
     """, (nom,))  # ✅ tuple avec virgule
+    invalider("categorie", cur)
 
     conn.commit()
     flash("✅ Catégorie ajoutée avec succès.", "success")
@@ -66,6 +60,7 @@ def modifier_categorie(id):
         SET nom = ?, udate = DATETIME('now'), uuser = 1
         WHERE id = ?
     """, (nom, id))
+    invalider("categorie", cur)
     conn.commit()
 
     flash("✏️ Catégorie mise à jour avec succès.", "success")
@@ -86,6 +81,7 @@ def supprimer_categorie(id):
 
     # Supprimer la catégorie
     cur.execute("DELETE FROM Categorie WHERE id = ?", (id,))
+    invalider("categorie", cur)
     conn.commit()
 
     flash("🗑️ Catégorie supprimée avec succès.", "success")
@@ -2,6 +2,9 @@
 import sqlite3
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from utils.db_utils import query_db, execute_db
+from utils.pagination import compter, invalider_comptes, nb_pages, page_keyset
+from utils.recherche import condition_recherche
+from utils.referentiel import lignes as referentiel
 from utils.decorators import readonly_if_user  # ✅ ajout du décorateur
 
 collab_bp = Blueprint('collaborateurs', __name__, url_prefix='/collaborateurs')
@@ -16,13 +19,12 @@ def liste_collaborateurs():
     search = request.args.get('search', "").strip()
     page = request.args.get('page', 1, type=int)
     per_page = 10
-    offset = (page - 1) * per_page
 
-    profils = query_db("SELECT * FROM profils ORDER BY nom")
-    affectations = query_db("SELECT * FROM affectation ORDER BY nom")
+    profils = referentiel('profils', tri='nom')
+    affectations = referentiel('affectation', tri='nom')
 
     base_query = """
-        SELECT c.matricule, c.nom, c.prenom, c.profil_id, c.affectation_id,
+        SELECT c.rowid AS rang, c.matricule, c.nom, c.prenom, c.profil_id, c.affectation_id,
                p.nom AS profil, a.nom AS affectation
         FROM collaborateurs c
         JOIN profils p ON c.profil_id = p.id
@@ -36,16 +38,23 @@ def liste_collaborateurs():
         args.append(profil_id)
 
     if search:
-        base_query += " AND (c.matricule LIKE ? OR c.nom LIKE ? OR c.prenom LIKE ?)"
-        args.extend([f"%{search}%", f"%{search}%", f"%{search}%"])
-
-    # Total
-    total = query_db(f"SELECT COUNT(*) as count FROM ({base_query})", args, one=True)['count']
+        # Index plein texte (accents ignorés) ; LIKE si l'index n'a pas encore été créé
+        filtre = condition_recherche('fts_collaborateurs', search, 'c.matricule')
+        if filtre:
+            base_query += f" AND {filtre[0]}"
+            args.extend(filtre[1])
+        else:
+            base_query += " AND (c.matricule LIKE ? OR c.nom LIKE ? OR c.prenom LIKE ?)"
+            args.extend([f"%{search}%", f"%{search}%", f"%{search}%"])
 
-    # Page courante
-    collaborateurs = query_db(f"{base_query} ORDER BY c.rowid DESC LIMIT ? OFFSET ?", args + [per_page, offset])
+    # Total (mis en cache par filtre)
+    total_pages = nb_pages(compter('collaborateurs', base_query, args), per_page)
 
-    total_pages = (total // per_page) + (1 if total % per_page > 0 else 0)
+    # Page courante : reprise après / avant la ligne du curseur (ordre c.rowid décroissant)
+    collaborateurs, precedent, suivant = page_keyset(
+        base_query, args, ['rang'], per_page,
+        apres=request.args.get('apres'), avant=request.args.get('avant')
+    )
 
     user_role = session.get('user', {}).get('role', '')
 
@@ -58,6 +67,8 @@ def liste_collaborateurs():
         search=search,
         page=page,
         total_pages=total_pages,
+        precedent=precedent,
+        suivant=suivant,
         user_role=user_role  # ✅ utile pour cacher les actions dans le template
     )
 
@@ -88,6 +99,7 @@ def ajouter_collaborateur():
         INSERT INTO collaborateurs (matricule, nom, prenom, profil_id, affectation_id)
         VALUES (?, ?, ?, ?, ?)
     """, [matricule, nom, prenom, profil_id, affectation_id])
+    invalider_comptes('collaborateurs')
 
     flash("✅ Collaborateur ajouté avec succès", "success")
     return redirect(url_for('collaborateurs.liste_collaborateurs'))
@@ -119,6 +131,7 @@ def modifier_collaborateur(matricule):
         SET nom = ?, prenom = ?, profil_id = ?, affectation_id = ?
         WHERE matricule = ?
     """, [nom, prenom, profil_id, affectation_id, matricule])
+    invalider_comptes('collaborateurs')
 
     flash("✅ Collaborateur mis à jour", "success")
     return redirect(url_for('collaborateurs.liste_collaborateurs'))
@@ -138,6 +151,7 @@ def supprimer_collaborateur(matricule):
             flash("❌ Ce collaborateur a des projets associés. Supprimez les projets d’abord.", "danger")
         else:
             execute_db("DELETE FROM collaborateurs WHERE matricule = ?", [matricule])
+            invalider_comptes('collaborateurs')
             flash("✅ Collaborateur supprimé avec succès", "success")
     except Exception as e:
         flash(f"❌ Erreur lors de la suppression : {e}", "danger")
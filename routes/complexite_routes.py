@@ -1,9 +1,20 @@
 # routes/complexite_routes.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from utils.db_utils import query_db, execute_db
+import hashlib
+import json
+import threading
+from flask import Blueprint, Response, render_template, request, redirect, url_for, flash, session, jsonify
+from utils.db_utils import query_db, transaction, valeurs_normalisees
+from utils.pagination import compter, invalider_comptes, nb_pages, page_keyset
+from utils.recherche import condition_recherche
+from utils.versions import incrementer_version, lire_version_datee
+from services.recalcul_scores import planifier_recalcul
 
 complexite_bp = Blueprint('complexite', __name__, url_prefix='/complexite')
 
+# Arbre libellé → type → valeurs des listes en cascade, gardé pour une version du catalogue
+_arbre = None
+_verrou_arbre = threading.Lock()
+
 
 # -----------------------
 # LISTE AVEC PAGINATION + RECHERCHE
@@ -12,12 +23,20 @@ complexite_bp = Blueprint('complexite', __name__, url_prefix='/complexite')
 def liste_complexite():
     page = request.args.get('page', 1, type=int)
     per_page = 10
-    offset = (page - 1) * per_page
     search = request.args.get('q', '').strip()
 
-    base_query = "SELECT * FROM complexite"
+    # Tri : idate DESC, udate DESC, départagé par id (clés du curseur, voir ix_complexite_tri)
+    base_query = """
+        SELECT *, COALESCE(idate, '') AS tri_idate, COALESCE(udate, '') AS tri_udate
+        FROM complexite
+    """
     args = []
-    if search:
+    filtre = condition_recherche('fts_complexite', search) if search else None
+    if filtre:
+        # Index plein texte (accents ignorés)
+        base_query += f" WHERE {filtre[0]}"
+        args.extend(filtre[1])
+    elif search:
         base_query += """
             WHERE libelle LIKE ?
                OR type_libelle LIKE ?
@@ -27,25 +46,22 @@ def liste_complexite():
         like = f"%{search}%"
         args.extend([like, like, like, like])
 
-    # total
-    total_row = query_db(f"SELECT COUNT(*) AS count FROM ({base_query}) AS t", args, one=True)
-    total = total_row['count'] if total_row else 0
+    # total (mis en cache par filtre)
+    total_pages = nb_pages(compter('complexite', base_query, args), per_page)
 
     # page
-    complexites = query_db(
-        f"{base_query} ORDER BY idate DESC, udate DESC LIMIT ? OFFSET ?",
-        args + [per_page, offset]
+    complexites, precedent, suivant = page_keyset(
+        base_query, args, ['tri_idate', 'tri_udate', 'id'], per_page,
+        apres=request.args.get('apres'), avant=request.args.get('avant')
     )
 
-    total_pages = (total // per_page) + (1 if total % per_page else 0)
-    if total_pages == 0:
-        total_pages = 1
-
     return render_template(
         'complexite_list.html',
         complexites=complexites,
         page=page,
-        total_pages=total_pages
+        total_pages=total_pages,
+        precedent=precedent,
+        suivant=suivant
     )
 
 
@@ -64,10 +80,16 @@ def ajouter_complexite():
 
     user = session.get('user', {}).get('username', 'inconnu')
 
-    execute_db("""
-        INSERT INTO complexite (libelle, type_libelle, valeur_libelle, ponderation, iuser, idate, uuser, udate)
-        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?, CURRENT_TIMESTAMP)
-    """, [libelle, type_libelle, valeur_libelle, ponderation, user, user])
+    with transaction() as cur:
+        cur.execute("""
+            INSERT INTO complexite (libelle, type_libelle, valeur_libelle, ponderation, iuser, idate, uuser, udate,
+                                    libelle_norm, type_libelle_norm, valeur_libelle_norm)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?, CURRENT_TIMESTAMP, ?, ?, ?)
+        """, [libelle, type_libelle, valeur_libelle, ponderation, user, user,
+              *valeurs_normalisees(libelle, type_libelle, valeur_libelle)])
+        incrementer_version('complexite', cur)
+    invalider_comptes('complexite')
+    planifier_recalcul()
 
     flash("✅ Complexité ajoutée avec succès", "success")
     return redirect(url_for('complexite.liste_complexite'))
@@ -88,16 +110,39 @@ def modifier_complexite(id):
 
     user = session.get('user', {}).get('username', 'inconnu')
 
-    execute_db("""
-        UPDATE complexite
-           SET libelle = ?,
-               type_libelle = ?,
-               valeur_libelle = ?,
-               ponderation = ?,
-               uuser = ?,
-               udate = CURRENT_TIMESTAMP
-         WHERE id = ?
-    """, [libelle, type_libelle, valeur_libelle, ponderation, user, id])
+    with transaction() as cur:
+        # Un projet n'a qu'une complexité par libellé : refuser si un projet lié à cette ligne
+        # a déjà une autre complexité sous le nouveau libellé
+        conflits = cur.execute("""
+            SELECT COUNT(DISTINCT cp.id_projet)
+            FROM complexite_projet cp
+            JOIN complexite_projet autre
+              ON autre.id_projet = cp.id_projet AND autre.libelle = ? AND autre.id_complexite <> cp.id_complexite
+            WHERE cp.id_complexite = ?
+        """, [libelle, id]).fetchone()[0]
+        if conflits:
+            flash(f"❌ {conflits} projet(s) ont déjà une complexité « {libelle} » : modification refusée.", "error")
+            return redirect(url_for('complexite.liste_complexite'))
+
+        cur.execute("""
+            UPDATE complexite
+               SET libelle = ?,
+                   type_libelle = ?,
+                   valeur_libelle = ?,
+                   ponderation = ?,
+                   uuser = ?,
+                   udate = CURRENT_TIMESTAMP,
+                   libelle_norm = ?,
+                   type_libelle_norm = ?,
+                   valeur_libelle_norm = ?
+             WHERE id = ?
+        """, [libelle, type_libelle, valeur_libelle, ponderation, user,
+              *valeurs_normalisees(libelle, type_libelle, valeur_libelle), id])
+        # Garder la clé (projet, libellé) des complexités projet alignée
+        cur.execute("UPDATE complexite_projet SET libelle = ? WHERE id_complexite = ?", [libelle, id])
+        incrementer_version('complexite', cur)
+    invalider_comptes('complexite')
+    planifier_recalcul()
 
     flash("✅ Complexité mise à jour", "success")
     return redirect(url_for('complexite.liste_complexite'))
@@ -108,7 +153,11 @@ def modifier_complexite(id):
 # -----------------------
 @complexite_bp.route('/supprimer/<id>', methods=['POST'])
 def supprimer_complexite(id):
-    execute_db("DELETE FROM complexite WHERE id = ?", [id])
+    with transaction() as cur:
+        cur.execute("DELETE FROM complexite WHERE id = ?", [id])
+        incrementer_version('complexite', cur)
+    invalider_comptes('complexite')
+    planifier_recalcul()
     flash("✅ Complexité supprimée", "success")
     return redirect(url_for('complexite.liste_complexite'))
 
@@ -116,30 +165,64 @@ def supprimer_complexite(id):
 # -----------------------
 # ROUTES AJAX (DÉPENDANCES)
 # -----------------------
+def arbre_complexite():
+    """
+    Arbre {libellé: {type: [valeurs]}} du catalogue (ordre SQL ; {} pour un libellé sans type),
+    reconstruit quand la version du catalogue change.
+    Retourne (arbre, corps JSON, ETag, date de modification).
+    """
+    global _arbre
+    version, udate = lire_version_datee('complexite')
+    with _verrou_arbre:
+        if _arbre is not None and _arbre[0] == version:
+            return _arbre[1:]
+
+    rows = query_db("""
+        SELECT DISTINCT libelle, type_libelle, valeur_libelle FROM complexite
+        WHERE libelle IS NOT NULL
+        ORDER BY libelle, type_libelle, valeur_libelle
+    """)
+    arbre = {}
+    for r in rows:
+        types = arbre.setdefault(r["libelle"], {})
+        # Un libellé sans type reste proposé, avec une liste de types vide
+        if r["type_libelle"] is not None:
+            types.setdefault(r["type_libelle"], []).append(r["valeur_libelle"])
+    corps = json.dumps({"version": version, "libelles": arbre}, ensure_ascii=False).encode("utf-8")
+    etag = f"complexite-{version}-{hashlib.sha1(corps).hexdigest()[:12]}"
+
+    with _verrou_arbre:
+        _arbre = (version, arbre, corps, etag, udate)
+    return arbre, corps, etag, udate
+
+
+# Cascade complète, à filtrer côté navigateur (304 si inchangée)
+@complexite_bp.route('/arbre')
+def get_arbre():
+    _, corps, etag, udate = arbre_complexite()
+    reponse = Response(corps, mimetype='application/json')
+    reponse.set_etag(etag)
+    if udate is not None:
+        reponse.last_modified = udate
+    reponse.cache_control.no_cache = True  # toujours revalider (ETag)
+    return reponse.make_conditional(request)
+
 
 # Types distincts pour un libellé donné
 @complexite_bp.route('/get_types/<libelle>')
 def get_types(libelle):
-    rows = query_db(
-        "SELECT DISTINCT type_libelle FROM complexite WHERE libelle = ? ORDER BY type_libelle",
-        [libelle]
-    )
-    return jsonify({"types": [r["type_libelle"] for r in rows]})
+    arbre = arbre_complexite()[0]
+    return jsonify({"types": list(arbre.get(libelle, {}))})
 
 
 # Valeurs distinctes pour un couple (libellé, type_libelle)
 @complexite_bp.route('/get_valeurs/<libelle>/<type_libelle>')
 def get_valeurs(libelle, type_libelle):
-    rows = query_db(
-        "SELECT DISTINCT valeur_libelle FROM complexite WHERE libelle = ? AND type_libelle = ? ORDER BY valeur_libelle",
-        [libelle, type_libelle]
-    )
-    return jsonify({"valeurs": [r["valeur_libelle"] for r in rows]})
+    arbre = arbre_complexite()[0]
+    return jsonify({"valeurs": arbre.get(libelle, {}).get(type_libelle, [])})
 
 
 # Libellés distincts
 @complexite_bp.route('/get_libelles')
 def get_libelles():
-    rows = query_db("SELECT DISTINCT libelle FROM complexite ORDER BY libelle")
-    libelles = [row['libelle'] for row in rows]
-    return jsonify({"libelles": libelles})
+    return jsonify({"libelles": list(arbre_complexite()[0])})
@@ -1,6 +1,8 @@
 # routes/phase_routes.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from utils.db_utils import query_db, get_db
+from utils.db_utils import get_db
+from utils.pagination import compter, invalider_comptes, nb_pages, page_keyset
+from utils.referentiel import invalider
 
 phase_bp = Blueprint("phase", __name__, url_prefix="/phase")
 
@@ -11,7 +13,6 @@ phase_bp = Blueprint("phase", __name__, url_prefix="/phase")
 def liste_phases():
     page = request.args.get("page", 1, type=int)
     per_page = 10
-    offset = (page - 1) * per_page
     q = (request.args.get("q", "") or "").strip()
 
     base_query = "SELECT id, nom FROM Phase"
@@ -21,15 +22,13 @@ def liste_phases():
         base_query += " WHERE nom LIKE ? COLLATE NOCASE"
         args.append(f"%{q}%")
 
-    # total
-    total_row = query_db(f"SELECT COUNT(*) as total FROM ({base_query})", args, one=True)
-    total = total_row["total"] if total_row else 0
-    total_pages = (total // per_page) + (1 if total % per_page else 0)
+    # total (mis en cache par filtre)
+    total_pages = nb_pages(compter("Phase", base_query, args), per_page)
 
-    # données paginées
-    phases = query_db(
-        f"{base_query} ORDER BY id DESC LIMIT ? OFFSET ?",
-        args + [per_page, offset]
+    # données paginées (ordre id décroissant, reprise au curseur)
+    phases, precedent, suivant = page_keyset(
+        base_query, args, ["id"], per_page,
+        apres=request.args.get("apres"), avant=request.args.get("avant")
     )
     phases = [dict(p) for p in phases]
 
@@ -38,6 +37,8 @@ def liste_phases():
         phases=phases,
         page=page,
         total_pages=total_pages,
+        precedent=precedent,
+        suivant=suivant,
     )
 
 
@@ -59,7 +60,9 @@ def ajouter_phase():
             INSERT INTO Phase (nom, idate, iuser)
             VALUES (?, DATETIME('now'), 1)
         """, (nom,))
+        invalider("Phase", cur)
         conn.commit()
+        invalider_comptes("Phase")
         flash("✅ Phase ajoutée avec succès.", "success")
     except Exception as e:
         flash(f"❌ Erreur : {e}", "error")
@@ -80,7 +83,9 @@ def modifier_phase(id):
         SET nom = ?, udate = DATETIME('now'), uuser = 1
         WHERE id = ?
     """, (nom, id))
+    invalider("Phase", cur)
     conn.commit()
+    invalider_comptes("Phase")
     flash("✏️ Phase mise à jour avec succès.", "success")
     return redirect(url_for("phase.liste_phases"))
 
@@ -93,6 +98,8 @@ def supprimer_phase(id):
     conn = get_db()
     cur = conn.cursor()
     cur.execute("DELETE FROM Phase WHERE id = ?", (id,))
+    invalider("Phase", cur)
     conn.commit()
+    invalider_comptes("Phase")
     flash("🗑️ Phase supprimée avec succès.", "success")
     return redirect(url_for("phase.liste_phases"))
@@ -1,13 +1,14 @@
 # routes/profils_routes.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from utils.db_utils import query_db, execute_db
+from utils.db_utils import transaction
+from utils.referentiel import invalider, lignes as referentiel
 
 profils_bp = Blueprint("profils", __name__, url_prefix="/profils")
 
 # 📌 Liste des profils
 @profils_bp.route("/")
 def liste_profils():
-    profils = query_db("SELECT * FROM profils ORDER BY id ASC")
+    profils = referentiel("profils")
     return render_template("profils_list.html", profils=profils)
 
 # 📌 Ajouter un profil
@@ -24,10 +25,12 @@ def ajouter_profil():
         return redirect(url_for("profils.liste_profils"))
 
     try:
-        execute_db("""
-            INSERT INTO profils (nom, description, build_ratio, run_ratio, heures_base)
-            VALUES (?, ?, ?, ?, ?)
-        """, [nom, description, build_ratio, run_ratio, heures_base])
+        with transaction() as cur:
+            cur.execute("""
+                INSERT INTO profils (nom, description, build_ratio, run_ratio, heures_base)
+                VALUES (?, ?, ?, ?, ?)
+            """, [nom, description, build_ratio, run_ratio, heures_base])
+            invalider("profils", cur)
         flash("✅ Profil ajouté avec succès.", "success")
     except Exception as e:
         flash(f"❌ Erreur lors de l’ajout du profil : {e}", "danger")
@@ -44,11 +47,13 @@ def modifier_profil(id):
     heures_base = request.form.get("heures_base", 35)
 
     try:
-        execute_db("""
-            UPDATE profils
-            SET nom=?, description=?, build_ratio=?, run_ratio=?, heures_base=?
-            WHERE id=?
-        """, [nom, description, build_ratio, run_ratio, heures_base, id])
+        with transaction() as cur:
+            cur.execute("""
+                UPDATE profils
+                SET nom=?, description=?, build_ratio=?, run_ratio=?, heures_base=?
+                WHERE id=?
+            """, [nom, description, build_ratio, run_ratio, heures_base, id])
+            invalider("profils", cur)
         flash("✅ Profil modifié avec succès.", "success")
     except Exception as e:
         flash(f"❌ Erreur lors de la modification du profil : {e}", "danger")
@@ -59,7 +64,9 @@ def modifier_profil(id):
 @profils_bp.route("/supprimer/<int:id>", methods=["POST"])
 def supprimer_profil(id):
     try:
-        execute_db("DELETE FROM profils WHERE id = ?", [id])
+        with transaction() as cur:
+            cur.execute("DELETE FROM profils WHERE id = ?", [id])
+            invalider("profils", cur)
         flash("✅ Profil supprimé avec succès.", "success")
     except Exception as e:
         flash(f"❌ Erreur lors de la suppression du profil : {e}", "danger")
@@ -3,6 +3,8 @@ import sqlite3
 import uuid
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from utils.db_utils import query_db, execute_db
+from services.charge_hebdo import maj_charge_projet
+from utils.referentiel import lignes as referentiel
 
 programmes_bp = Blueprint('programmes', __name__, url_prefix='/programmes')
 
@@ -43,7 +45,7 @@ def gerer_programme(id):
         return redirect(url_for('priorites'))
 
     phases = list(range(1, 9))  # 8 phases
-    profils = query_db("SELECT * FROM profils")
+    profils = referentiel('profils')
 
     if request.method == 'POST':
         action = request.form.get('action')
@@ -206,7 +208,7 @@ def modifier_projet(id):
 
     programme_id = projet['programme_id']
     programme = query_db("SELECT * FROM programmes WHERE id = ?", [programme_id], one=True)
-    categories = query_db("SELECT * FROM categorie")
+    categories = referentiel('categorie')
 
     if request.method == 'POST':
         titre = request.form['titre'].strip()
@@ -219,11 +221,13 @@ def modifier_projet(id):
             flash("❌ Le titre est requis.", "danger")
         else:
             try:
-                execute_db("""
-                    UPDATE projets SET titre = ?, description = ?, date_mep = ?, 
-                                      statut = ?, categorie_id = ?
-                    WHERE id = ?
-                """, [titre, description, date_mep, statut, categorie_id, str(id)])
+                # Le statut conditionne la prise en compte du projet dans charge_hebdo
+                with maj_charge_projet(str(id)) as cur:
+                    cur.execute("""
+                        UPDATE projets SET titre = ?, description = ?, date_mep = ?, 
+                                          statut = ?, categorie_id = ?
+                        WHERE id = ?
+                    """, [titre, description, date_mep, statut, categorie_id, str(id)])
                 flash("✅ Projet mis à jour", "success")
                 return redirect(url_for('programmes.gerer_projets', id=programme_id))
             except Exception as e:
@@ -245,7 +249,8 @@ def supprimer_projet(id):
         flash("❌ Projet introuvable", "danger")
     else:
         try:
-            execute_db("DELETE FROM projets WHERE id = ?", [str(id)])
+            with maj_charge_projet(str(id)) as cur:
+                cur.execute("DELETE FROM projets WHERE id = ?", [str(id)])
             flash("🗑️ Projet supprimé", "success")
         except Exception as e:
             flash(f"❌ Erreur : {e}", "danger")
@@ -278,24 +283,26 @@ def gerer_phases_projet(programme_id, projet_id):
     """, [projet_id_str])
 
     if request.method == 'POST':
-        execute_db("DELETE FROM projet_phases WHERE projet_id = ?", [projet_id_str])
-
         phase_ids = request.form.getlist('phase_id')
         dates_debut = request.form.getlist('date_debut')
         dates_fin = request.form.getlist('date_fin')
 
-        for i in range(len(phase_ids)):
-            phase_id = phase_ids[i]
-            debut = dates_debut[i]
-            fin = dates_fin[i]
-            if phase_id and debut and fin:
-                try:
-                    execute_db("""
-                        INSERT INTO projet_phases (projet_id, phase_id, date_debut, date_fin)
-                        VALUES (?, ?, ?, ?)
-                    """, [projet_id_str, phase_id, debut, fin])
-                except Exception as e:
-                    flash(f"❌ Erreur pour la phase {phase_id}: {e}", "danger")
+        # Réécriture des phases et mise à jour de charge_hebdo dans la même transaction
+        with maj_charge_projet(projet_id_str) as cur:
+            cur.execute("DELETE FROM projet_phases WHERE projet_id = ?", [projet_id_str])
+
+            for i in range(len(phase_ids)):
+                phase_id = phase_ids[i]
+                debut = dates_debut[i]
+                fin = dates_fin[i]
+                if phase_id and debut and fin:
+                    try:
+                        cur.execute("""
+                            INSERT INTO projet_phases (projet_id, phase_id, date_debut, date_fin)
+                            VALUES (?, ?, ?, ?)
+                        """, [projet_id_str, phase_id, debut, fin])
+                    except Exception as e:
+                        flash(f"❌ Erreur pour la phase {phase_id}: {e}", "danger")
 
         flash("✅ Phases mises à jour", "success")
         return redirect(url_for('programmes.gerer_phases_projet', programme_id=programme_id, projet_id=projet_id))
@@ -1,6 +1,7 @@
 # routes/projet_routes.py
 from flask import Blueprint, render_template, request, flash, redirect, url_for
-from utils.db_utils import query_db, get_db
+from utils.db_utils import query_db, get_db, transaction
+from services.recalcul_scores import recalculer_scores_projets, recalculer_si_perime
 
 projet_bp = Blueprint("projet", __name__, url_prefix="/projet")
 
@@ -10,6 +11,8 @@ projet_bp = Blueprint("projet", __name__, url_prefix="/projet")
 # ===============================
 @projet_bp.route("/liste")
 def liste_projets():
+    # Scores à jour des catalogues (recalcul immédiat si le recalcul différé n'a pas encore eu lieu)
+    recalculer_si_perime()
     projets = query_db("""
         SELECT 
             p.id,
@@ -29,15 +32,33 @@ def liste_projets():
 # ===============================
 @projet_bp.route('/modifier/<projet_id>', methods=['GET', 'POST'])
 def modifier_projet(projet_id):
-    conn = get_db()
-    cur = conn.cursor()
-
     # Charger le projet
     projet = query_db("SELECT * FROM Projet WHERE id = ?", [projet_id], one=True)
     if not projet:
         flash("❌ Projet introuvable.", "error")
         return redirect(url_for("projet.liste_projets"))
 
+    # =============================
+    # Bloc 1️⃣ : mise à jour du projet uniquement (aucun catalogue à charger)
+    # =============================
+    if request.method == "POST":
+        titre = request.form.get("titre")
+        description = request.form.get("description")
+        categorie = request.form.get("categorie")
+        statut = request.form.get("statut")
+
+        conn = get_db()
+        conn.execute("""
+            UPDATE Projet
+            SET titre_projet = ?, description = ?, categorie = ?, statut = ?, 
+                udate = DATETIME('now'), uuser = 1
+            WHERE id = ?
+        """, (titre, description, categorie, statut, projet_id))
+        conn.commit()
+
+        flash("✅ Informations du projet mises à jour avec succès.", "success")
+        return redirect(url_for("projet.modifier_projet", projet_id=projet_id))
+
     # =============================
     # Charger les valeurs métier
     # =============================
@@ -65,44 +86,31 @@ def modifier_projet(projet_id):
         dropdowns.setdefault(v_dict["libelle"], []).append(v_dict)
 
     # =============================
-    # Charger les complexités
+    # Charger les complexités : tous les libellés + la valeur retenue
+    # pour le projet, en une seule requête (LEFT JOIN)
     # =============================
-    libelles_complexite = query_db("""
-        SELECT DISTINCT libelle
-        FROM complexite
-        WHERE libelle IS NOT NULL AND libelle <> ''
-        ORDER BY libelle
-    """)
-
-    complexites = []
-    for l in libelles_complexite:
-        lib = l["libelle"]
-        valeur_existante = query_db("""
-            SELECT 
-                c.id AS id_complexite,
-                c.libelle,
-                c.type_libelle,
-                c.valeur_libelle
+    lignes_complexite = query_db("""
+        WITH libelles AS (
+            SELECT DISTINCT libelle
+            FROM complexite
+            WHERE libelle IS NOT NULL AND libelle <> ''
+        ),
+        choix AS (
+            SELECT c.libelle,
+                   c.id AS id_complexite,
+                   c.type_libelle,
+                   c.valeur_libelle,
+                   ROW_NUMBER() OVER (PARTITION BY c.libelle ORDER BY cp.id) AS rang
             FROM complexite_projet cp
             JOIN complexite c ON c.id = cp.id_complexite
-            WHERE cp.id_projet = ? AND c.libelle = ?
-            LIMIT 1
-        """, [projet_id, lib], one=True)
-
-        if valeur_existante:
-            complexites.append({
-                "libelle": lib,
-                "id_complexite": valeur_existante["id_complexite"],
-                "type_libelle": valeur_existante["type_libelle"],
-                "valeur_libelle": valeur_existante["valeur_libelle"]
-            })
-        else:
-            complexites.append({
-                "libelle": lib,
-                "id_complexite": None,
-                "type_libelle": None,
-                "valeur_libelle": None
-            })
+            WHERE cp.id_projet = ?
+        )
+        SELECT l.libelle, ch.id_complexite, ch.type_libelle, ch.valeur_libelle
+        FROM libelles l
+        LEFT JOIN choix ch ON ch.libelle = l.libelle AND ch.rang = 1
+        ORDER BY l.libelle
+    """, [projet_id])
+    complexites = [dict(l) for l in lignes_complexite]
 
     complexite_possibles = query_db("""
         SELECT DISTINCT libelle, id, type_libelle, valeur_libelle
@@ -116,26 +124,6 @@ def modifier_projet(projet_id):
         c_dict = dict(c)
         dropdowns_complexite.setdefault(c_dict["libelle"], []).append(c_dict)
 
-    # =============================
-    # Bloc 1️⃣ : mise à jour du projet uniquement
-    # =============================
-    if request.method == "POST":
-        titre = request.form.get("titre")
-        description = request.form.get("description")
-        categorie = request.form.get("categorie")
-        statut = request.form.get("statut")
-
-        cur.execute("""
-            UPDATE Projet
-            SET titre_projet = ?, description = ?, categorie = ?, statut = ?, 
-                udate = DATETIME('now'), uuser = 1
-            WHERE id = ?
-        """, (titre, description, categorie, statut, projet_id))
-        conn.commit()
-
-        flash("✅ Informations du projet mises à jour avec succès.", "success")
-        return redirect(url_for("projet.modifier_projet", projet_id=projet_id))
-
     return render_template(
         "projets_modifier.html",
         projet=projet,
@@ -180,6 +168,7 @@ def update_valeur_metier(projet_id, libelle):
         """, (nouvelle_valeur_id, projet_id, old_val["id_valeur_metier"]))
         flash(f"✅ Valeur '{libelle}' mise à jour avec succès.", "success")
 
+    _recalculer_score_wsjf(cur, projet_id)
     conn.commit()
     return redirect(url_for("projet.modifier_projet", projet_id=projet_id))
 
@@ -189,69 +178,39 @@ def update_valeur_metier(projet_id, libelle):
 # ===============================
 @projet_bp.route("/update_all_complexites/<projet_id>", methods=["POST"])
 def update_all_complexites(projet_id):
-    conn = get_db()
-    cur = conn.cursor()
+    # Valeurs choisies dans le formulaire (un champ "complexite_<libellé>" par critère)
+    choix = [
+        (projet_id, valeur_id)
+        for champ, valeur_id in request.form.items()
+        if champ.startswith("complexite_") and valeur_id
+    ]
+
+    with transaction() as cur:
+        # 1️⃣ - Upsert groupé : une ligne par (projet, libellé)
+        cur.executemany("""
+            INSERT INTO complexite_projet (id_projet, id_complexite, libelle, idate, iuser)
+            SELECT ?, c.id, c.libelle, DATETIME('now'), 1
+            FROM complexite c
+            WHERE c.id = ?
+            ON CONFLICT (id_projet, libelle) DO UPDATE
+            SET id_complexite = excluded.id_complexite, udate = DATETIME('now'), uuser = 1
+        """, choix)
+
+        # ✅ 2️⃣ - Recalculer le score WSJF dans la même transaction
+        score_wsjf = _recalculer_score_wsjf(cur, projet_id)
 
-    # 1️⃣ - Mettre à jour ou insérer les complexités du projet
-    libelles_complexite = query_db("""
-        SELECT DISTINCT libelle
-        FROM complexite
-        WHERE libelle IS NOT NULL AND libelle <> ''
-    """)
-
-    for l in libelles_complexite:
-        lib = l["libelle"]
-        valeur_id = request.form.get(f"complexite_{lib}")
-        if not valeur_id:
-            continue
-
-        existing = query_db("""
-            SELECT cp.id_complexite
-            FROM complexite_projet cp
-            JOIN complexite c ON c.id = cp.id_complexite
-            WHERE cp.id_projet = ? AND c.libelle = ?
-        """, [projet_id, lib], one=True)
-
-        if existing:
-            cur.execute("""
-                UPDATE complexite_projet
-                SET id_complexite = ?, udate = DATETIME('now'), uuser = 1
-                WHERE id_projet = ? AND id_complexite = ?
-            """, (valeur_id, projet_id, existing["id_complexite"]))
-        else:
-            cur.execute("""
-                INSERT INTO complexite_projet (id_projet, id_complexite, idate, iuser)
-                VALUES (?, ?, DATETIME('now'), 1)
-            """, (projet_id, valeur_id))
-
-    # ✅ 2️⃣ - Recalculer le score WSJF
-    somme_valeur_metier = query_db("""
-        SELECT SUM(vm.valeur_libelle * vm.ponderation) AS total
-        FROM valeur_metier_projet vmp
-        JOIN valeur_metier vm ON vm.id = vmp.id_valeur_metier
-        WHERE vmp.id_projet = ?
-    """, [projet_id], one=True)["total"] or 0
-
-    somme_complexite = query_db("""
-        SELECT SUM(c.valeur_libelle * c.ponderation) AS total
-        FROM complexite_projet cp
-        JOIN complexite c ON c.id = cp.id_complexite
-        WHERE cp.id_projet = ?
-    """, [projet_id], one=True)["total"] or 1
-
-    score_wsjf = round(somme_valeur_metier / somme_complexite, 2)
-
-    cur.execute("""
-        UPDATE Projet
-        SET score_wsjf_projet = ?, udate = DATETIME('now'), uuser = 1
-        WHERE id = ?
-    """, (score_wsjf, projet_id))
-
-    conn.commit()
     flash(f"✅ Complexités enregistrées et score WSJF recalculé : {score_wsjf}", "success")
     return redirect(url_for("projet.modifier_projet", projet_id=projet_id))
 
 
+def _recalculer_score_wsjf(cur, projet_id):
+    """Score WSJF = Σ(valeur métier × pondération) / Σ(complexité × pondération)."""
+    recalculer_scores_projets(cur, "SELECT ?", (projet_id,))
+    cur.execute("SELECT score_wsjf_projet FROM Projet WHERE id = ?", (projet_id,))
+    row = cur.fetchone()
+    return row["score_wsjf_projet"] if row else 0
+
+
 # ===============================
 # Bloc 3️⃣ - Supprimer un projet
 # ===============================
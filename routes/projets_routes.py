@@ -1,6 +1,7 @@
 # routes/projets_routes.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from utils.db_utils import query_db, execute_db
+from utils.db_utils import query_db
+from services.charge_hebdo import maj_charge_projet
 
 projets_bp = Blueprint('projets', __name__, url_prefix='/projets')
 
@@ -33,26 +34,28 @@ def gerer_phases_projet(programme_id, projet_id):
     """, [projet_id_str])  # ← str(projet_id)
 
     if request.method == 'POST':
-        # Supprimer les anciennes phases
-        execute_db("DELETE FROM projet_phases WHERE projet_id = ?", [projet_id_str])
-
         # Récupérer les nouvelles données
         phase_ids = request.form.getlist('phase_id')
         dates_debut = request.form.getlist('date_debut')
         dates_fin = request.form.getlist('date_fin')
 
-        for i in range(len(phase_ids)):
-            phase_id = phase_ids[i]
-            debut = dates_debut[i]
-            fin = dates_fin[i]
-            if phase_id and debut and fin:
-                try:
-                    execute_db("""
-                        INSERT INTO projet_phases (projet_id, phase_id, date_debut, date_fin)
-                        VALUES (?, ?, ?, ?)
-                    """, [projet_id_str, phase_id, debut, fin])
-                except Exception as e:
-                    flash(f"❌ Erreur pour la phase {phase_id}: {e}", "danger")
+        # Réécriture des phases et mise à jour de charge_hebdo dans la même transaction
+        with maj_charge_projet(projet_id_str) as cur:
+            # Supprimer les anciennes phases
+            cur.execute("DELETE FROM projet_phases WHERE projet_id = ?", [projet_id_str])
+
+            for i in range(len(phase_ids)):
+                phase_id = phase_ids[i]
+                debut = dates_debut[i]
+                fin = dates_fin[i]
+                if phase_id and debut and fin:
+                    try:
+                        cur.execute("""
+                            INSERT INTO projet_phases (projet_id, phase_id, date_debut, date_fin)
+                            VALUES (?, ?, ?, ?)
+                        """, [projet_id_str, phase_id, debut, fin])
+                    except Exception as e:
+                        flash(f"❌ Erreur pour la phase {phase_id}: {e}", "danger")
 
         flash("✅ Phases mises à jour", "success")
         return redirect(url_for('programmes.gerer_phases_projet', programme_id=programme_id, projet_id=projet_id))
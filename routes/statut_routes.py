@@ -1,6 +1,7 @@
 # routes/statut_routes.py
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from utils.db_utils import query_db, get_db
+from utils.referentiel import invalider, lignes as referentiel
 
 statut_bp = Blueprint("statut", __name__, url_prefix="/statut")
 
@@ -11,16 +12,11 @@ statut_bp = Blueprint("statut", __name__, url_prefix="/statut")
 def liste_statuts():
     q = (request.args.get("q", "") or "").strip()
 
-    sql = "SELECT id, nom FROM Statut"
-    params = []
-
     if q:
-        sql += " WHERE nom LIKE ? COLLATE NOCASE"
-        params.append(f"%{q}%")
-
-    sql += " ORDER BY id DESC"
-
-    rows = query_db(sql, params)
+        rows = query_db("SELECT id, nom FROM Statut WHERE nom LIKE ? COLLATE NOCASE ORDER BY id DESC",
+                        [f"%{q}%"])
+    else:
+        rows = referentiel("Statut", inverse=True)
     statuts = [dict(r) for r in rows]
     return render_template("statut_liste.html", statuts=statuts)
 
@@ -42,6 +38,7 @@ def ajouter_statut():
             INSERT INTO Statut (nom, idate, iuser)
             VALUES (?, DATETIME('now'), 1)
         """, (nom,))
+        invalider("Statut", cur)
         conn.commit()
         flash("✅ Statut ajouté avec succès.", "success")
     except Exception as e:
@@ -62,6 +59,7 @@ def modifier_statut(id):
         SET nom = ?, udate = DATETIME('now'), uuser = 1
         WHERE id = ?
     """, (nom, id))
+    invalider("Statut", cur)
     conn.commit()
     flash("✏️ Statut mis à jour avec succès.", "success")
     return redirect(url_for("statut.liste_statuts"))
@@ -75,6 +73,7 @@ def supprimer_statut(id):
     conn = get_db()
     cur = conn.cursor()
     cur.execute("DELETE FROM Statut WHERE id = ?", (id,))
+    invalider("Statut", cur)
     conn.commit()
     flash("🗑️ Statut supprimé avec succès.", "success")
     return redirect(url_for("statut.liste_statuts"))
@@ -0,0 +1,405 @@
+# services/capacite.py
+from collections import namedtuple
+from datetime import date, timedelta
+from functools import lru_cache
+import re
+import numpy as np
+import pandas as pd
+from utils.db_utils import query_db
+from utils.text_utils import normalize_text
+
+JH_PAR_SEMAINE = 5.0  # capacité hebdomadaire d'un collaborateur à temps plein
+MOIS_LABELS = [
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+]
+MOIS_FR = [
+    'janvier', 'fevrier', 'mars', 'avril', 'mai', 'juin',
+    'juillet', 'aout', 'septembre', 'octobre', 'novembre', 'decembre'
+]
+BUILD_RATIO_DEFAUT = 70
+RUN_RATIO_DEFAUT = 30
+POURCENTAGE_DEFAUT = 1.0  # pourcentage retenu quand il est absent ou nul (règle historique de l'écran CAF)
+
+
+# ===============================
+# 📅 CALENDRIER DES SEMAINES ISO
+# ===============================
+# Semaines d'une fenêtre : labels ("S1".. ou "2025-S01".. sur plusieurs années),
+# lundis (datetime64[D]) et indice du mois de chaque semaine dans mois_labels
+Calendrier = namedtuple("Calendrier", "labels lundis mois mois_labels")
+
+
+@lru_cache(maxsize=64)
+def semaines_iso(annee):
+    """
+    Table des semaines ISO d'une année : tuple de (semaine, lundi, dimanche, (annee, mois)).
+    Une semaine appartient au mois de son jeudi, comme elle appartient à l'année ISO de son jeudi.
+    """
+    nb_semaines = date(annee, 12, 28).isocalendar()[1]
+    premier = date.fromisocalendar(annee, 1, 1)
+    table = []
+    for semaine in range(1, nb_semaines + 1):
+        lundi = premier + timedelta(weeks=semaine - 1)
+        jeudi = lundi + timedelta(days=3)
+        table.append((semaine, lundi, lundi + timedelta(days=6), (jeudi.year, jeudi.month)))
+    return tuple(table)
+
+
+@lru_cache(maxsize=64)
+def calendrier(debut, fin):
+    """Calendrier (mis en cache) des semaines ISO qui recoupent [debut, fin]."""
+    annee_debut, annee_fin = debut.isocalendar()[0], fin.isocalendar()[0]
+    semaines = [
+        (annee, semaine, lundi, mois)
+        for annee in range(annee_debut, annee_fin + 1)
+        for semaine, lundi, dimanche, mois in semaines_iso(annee)
+        if dimanche >= debut and lundi <= fin
+    ]
+    une_annee = annee_debut == annee_fin
+    labels = tuple(f"S{s}" if une_annee else f"{a}-S{s:02d}" for a, s, _, _ in semaines)
+
+    cles_mois = list(dict.fromkeys(m for _, _, _, m in semaines))
+    meme_annee = len({a for a, _ in cles_mois}) == 1
+    mois_labels = tuple(
+        MOIS_LABELS[m - 1] if meme_annee else f"{MOIS_LABELS[m - 1]} {a}" for a, m in cles_mois
+    )
+    position = {cle: i for i, cle in enumerate(cles_mois)}
+
+    lundis = np.array([l for _, _, l, _ in semaines], dtype="datetime64[D]")
+    mois = np.array([position[m] for _, _, _, m in semaines], dtype=np.int64)
+    lundis.flags.writeable = False
+    mois.flags.writeable = False
+    return Calendrier(labels, lundis, mois, mois_labels)
+
+
+def calendrier_annee(annee):
+    """Calendrier des semaines ISO 1..52 (ou 53) de l'année `annee`."""
+    semaines = semaines_iso(annee)
+    return calendrier(semaines[0][1], semaines[-1][2])
+
+
+# ===============================
+# 🧮 MATRICES DE CAPACITÉ (lignes × semaines)
+# ===============================
+def capacite_automatique(nb_collab, nb_semaines, jh_par_semaine=JH_PAR_SEMAINE):
+    """CAF automatique : nb_collab × JH hebdomadaires, pour chaque ligne et chaque semaine."""
+    nb_collab = np.asarray(nb_collab, dtype=float)
+    return np.outer(nb_collab, np.full(nb_semaines, jh_par_semaine))
+
+
+def cumul_par_lignes(matrice, groupes, nb_groupes):
+    """Agrège les lignes d'une matrice par groupe (ex. collaborateurs → profils)."""
+    resultat = np.zeros((nb_groupes, matrice.shape[1]))
+    np.add.at(resultat, np.asarray(groupes, dtype=np.int64), matrice)
+    return resultat
+
+
+def cumul_par_mois(matrice, mois_semaine, nb_mois=12):
+    """Regroupe les colonnes semaines par mois : matrice (lignes × nb_mois)."""
+    affectation = np.zeros((len(mois_semaine), nb_mois))
+    affectation[np.arange(len(mois_semaine)), mois_semaine] = 1.0
+    return matrice @ affectation
+
+
+def ecart(disponible, requise):
+    """Écart de capacité (disponible − requise) ; négatif = surcharge."""
+    return disponible - requise
+
+
+def vers_lignes(matrice, week_labels, entetes):
+    """
+    Conversion en lignes de template, uniquement au moment de l'affichage :
+    chaque dict d'`entetes` est complété par {label semaine: valeur}.
+    """
+    data = []
+    for entete, valeurs in zip(entetes, matrice.tolist()):
+        row = dict(entete)
+        row.update(zip(week_labels, valeurs))
+        data.append(row)
+    return data
+
+
+def repartir_par_semaine(lignes, debuts, fins, charges, nb_lignes, origine, nb_semaines):
+    """
+    Répartit chaque charge uniformément sur les jours de [debut, fin] (bornes incluses)
+    puis agrège par semaine, pour toutes les lignes d'un coup.
+
+    - lignes  : indice de ligne (profil...) de chaque intervalle
+    - debuts, fins : dates numpy datetime64[D]
+    - charges : charge totale de chaque intervalle
+    Retourne une matrice (nb_lignes × nb_semaines).
+
+    Chaque intervalle ne touche que deux cases d'un tableau de différences
+    (début, lendemain de la fin) ; une somme cumulée reconstitue la charge
+    journalière, regroupée ensuite par blocs de 7 jours.
+    """
+    nb_jours = nb_semaines * 7
+    origine = np.datetime64(origine, "D")
+    d0 = (np.asarray(debuts, dtype="datetime64[D]") - origine).astype(np.int64)
+    d1 = (np.asarray(fins, dtype="datetime64[D]") - origine).astype(np.int64)
+    lignes = np.asarray(lignes, dtype=np.int64)
+    charges = np.asarray(charges, dtype=float)
+
+    total_jours = d1 - d0 + 1
+    debut_fenetre = np.maximum(d0, 0)
+    fin_fenetre = np.minimum(d1, nb_jours - 1)
+    garde = (total_jours > 0) & (debut_fenetre <= fin_fenetre)
+
+    taux = charges[garde] / total_jours[garde]
+    diff = np.zeros((nb_lignes, nb_jours + 1))
+    np.add.at(diff, (lignes[garde], debut_fenetre[garde]), taux)
+    np.add.at(diff, (lignes[garde], fin_fenetre[garde] + 1), -taux)
+
+    journalier = np.cumsum(diff[:, :nb_jours], axis=1)
+    return journalier.reshape(nb_lignes, nb_semaines, 7).sum(axis=2)
+
+
+def phases_valides(rows):
+    """
+    Lignes (date_debut, date_fin, duree_estimee_jh, pourcentage, profil_id) → DataFrame
+    (profil_id, debut, fin, charge). Même règle que l'écran CAF : charge = durée × pourcentage / 100,
+    pourcentage absent ou nul → POURCENTAGE_DEFAUT ; les lignes aux dates invalides sont ignorées.
+    """
+    df = pd.DataFrame(
+        [(r["date_debut"], r["date_fin"], r["duree_estimee_jh"], r["pourcentage"], r["profil_id"]) for r in rows],
+        columns=["date_debut", "date_fin", "duree_estimee_jh", "pourcentage", "profil_id"],
+    )
+    df["debut"] = pd.to_datetime(df["date_debut"], format="%Y-%m-%d", errors="coerce")
+    df["fin"] = pd.to_datetime(df["date_fin"], format="%Y-%m-%d", errors="coerce")
+    charge = pd.to_numeric(df["duree_estimee_jh"], errors="coerce").fillna(0)
+    pourcentage = pd.to_numeric(df["pourcentage"], errors="coerce")
+    pourcentage = pourcentage.where(pourcentage.notna() & (pourcentage != 0), POURCENTAGE_DEFAUT)
+    df["charge"] = charge * (pourcentage / 100)
+    return df.dropna(subset=["profil_id", "debut", "fin"])[["profil_id", "debut", "fin", "charge"]]
+
+
+def charge_requise(rows, profil_ids, lundis):
+    """
+    Charge requise (JH) par profil et par semaine de la fenêtre `lundis`.
+    `rows` : lignes (date_debut, date_fin, duree_estimee_jh, pourcentage, profil_id)
+    issues de projets ⋈ projet_phases ⋈ phase_profils_programme.
+    Les phases à cheval sur le bord de la fenêtre sont réparties au prorata des jours ;
+    les lignes aux dates invalides ou au profil inconnu sont ignorées.
+    """
+    matrice = np.zeros((len(profil_ids), len(lundis)))
+    if not rows or not len(lundis):
+        return matrice
+
+    df = phases_valides(rows)
+    position = {pid: i for i, pid in enumerate(profil_ids)}
+    df = df.assign(ligne=df["profil_id"].map(position)).dropna(subset=["ligne"])
+    if df.empty:
+        return matrice
+
+    return repartir_par_semaine(
+        df["ligne"].to_numpy(dtype=np.int64),
+        df["debut"].to_numpy(dtype="datetime64[D]"),
+        df["fin"].to_numpy(dtype="datetime64[D]"),
+        df["charge"].to_numpy(),
+        len(profil_ids),
+        np.datetime64(lundis[0], "D"),
+        len(lundis),
+    )
+
+
+def charge_par_lundi(rows):
+    """
+    Charge de chaque (profil, semaine) touchée par les phases, sans fenêtre :
+    liste de (profil_id, lundi de la semaine, jh) pour les cellules non nulles.
+    Sert à matérialiser la charge hebdomadaire (table charge_hebdo).
+    """
+    if not rows:
+        return []
+    df = phases_valides(rows)
+    df = df[df["fin"] >= df["debut"]]
+    if df.empty:
+        return []
+
+    profils, lignes = np.unique(df["profil_id"].to_numpy(), return_inverse=True)
+    debuts = df["debut"].to_numpy(dtype="datetime64[D]")
+    fins = df["fin"].to_numpy(dtype="datetime64[D]")
+    # Origine : lundi de la semaine de la première date (1970-01-01 était un jeudi)
+    premier = debuts.min()
+    origine = premier - ((premier.astype(np.int64) + 3) % 7)
+    nb_semaines = int((fins.max() - origine).astype(np.int64) // 7) + 1
+
+    matrice = repartir_par_semaine(lignes, debuts, fins, df["charge"].to_numpy(),
+                                   len(profils), origine, nb_semaines)
+    i, j = np.nonzero(matrice)
+    lundis = origine + 7 * j
+    return [
+        (profil, lundi, jh)
+        for profil, lundi, jh in zip(profils[i].astype(np.int64).tolist(), lundis.tolist(), matrice[i, j].tolist())
+    ]
+
+
+# ===============================
+# 👥 CAPACITÉ DISPONIBLE PAR COLLABORATEUR
+# ===============================
+def numero_mois(valeur):
+    """Mois saisi sous forme 1..12, "01", "January", "Janvier", "janv."... → 1..12, ou None."""
+    texte = normalize_text(str(valeur)).strip(" .") if valeur is not None else ""
+    if texte.isdigit():
+        mois = int(texte)
+        return mois if 1 <= mois <= 12 else None
+    for noms in (MOIS_FR, [m.lower() for m in MOIS_LABELS]):
+        for i, nom in enumerate(noms):
+            if len(texte) >= 3 and nom.startswith(texte):
+                return i + 1
+    return None
+
+
+def numero_semaine(valeur):
+    """Semaine du mois saisie "S2", "s2" ou "2" → 2, ou None."""
+    m = re.fullmatch(r"[sS]?\s*(\d{1,2})", str(valeur).strip()) if valeur is not None else None
+    return int(m.group(1)) if m else None
+
+
+def semaines_du_mois(lundis):
+    """
+    Position de chaque semaine dans son mois : {(annee, mois, rang): indice de semaine}.
+    Une semaine appartient au mois de son jeudi (même règle que le calendrier).
+    """
+    index = {}
+    compteur = {}
+    for j, lundi in enumerate(lundis):
+        jeudi = lundi + timedelta(days=3)
+        cle = (jeudi.year, jeudi.month)
+        compteur[cle] = compteur.get(cle, 0) + 1
+        index[(*cle, compteur[cle])] = j
+    return index
+
+
+def capacite_disponible(collaborateurs, disponibilites, lundis, jh_par_semaine=JH_PAR_SEMAINE):
+    """
+    Capacité disponible (JH) par collaborateur et par semaine, en BUILD et en RUN.
+
+    - collaborateurs : lignes (matricule, build_ratio, run_ratio, profil_build_ratio,
+      profil_run_ratio, caf_disponible_build, caf_disponible_run)
+    - disponibilites : lignes (source 'jour' | 'semaine', matricule, annee, mois, rang, jh)
+      où rang est le jour du mois ou la semaine du mois ("S1"...) ; les doublons sont cumulés
+    - lundis : dates des lundis de la fenêtre
+
+    Pour chaque semaine : somme des disponibilités journalières si elles existent,
+    sinon la disponibilité hebdomadaire saisie, sinon `jh_par_semaine`.
+    Répartition BUILD/RUN : ratio du profil, à défaut celui du collaborateur, à défaut 70/30 ;
+    caf_disponible_build/run (> 0) fixent directement la capacité hebdomadaire correspondante.
+    Retourne (total, build, run), matrices (collaborateurs × semaines).
+    """
+    nb_collab, nb_semaines = len(collaborateurs), len(lundis)
+    jours = np.zeros((nb_collab, nb_semaines))
+    semaines = np.zeros((nb_collab, nb_semaines))
+    a_jours = np.zeros((nb_collab, nb_semaines), dtype=bool)
+    a_semaines = np.zeros((nb_collab, nb_semaines), dtype=bool)
+
+    if disponibilites and nb_collab and nb_semaines:
+        df = pd.DataFrame([tuple(r) for r in disponibilites],
+                          columns=["source", "matricule", "annee", "mois", "rang", "jh"])
+        position = {c["matricule"]: i for i, c in enumerate(collaborateurs)}
+        df["ligne"] = df["matricule"].map(position)
+        df["mois"] = df["mois"].map({m: numero_mois(m) for m in df["mois"].unique()})
+        df["jh"] = pd.to_numeric(df["jh"], errors="coerce").fillna(0)
+        df = df.dropna(subset=["ligne", "mois"])
+
+        # Disponibilités journalières → date (arithmétique datetime64) → indice de semaine
+        jour = df[df["source"] == "jour"]
+        annee = pd.to_numeric(jour["annee"], errors="coerce").to_numpy(dtype=float)
+        numero = pd.to_numeric(jour["rang"], errors="coerce").to_numpy(dtype=float)
+        garde = ~np.isnan(annee) & ~np.isnan(numero) & (numero >= 1)
+        mois_absolu = ((np.nan_to_num(annee) - 1970) * 12 + jour["mois"].to_numpy(dtype=float) - 1).astype(np.int64)
+        debut_mois = mois_absolu.astype("datetime64[M]").astype("datetime64[D]")
+        fin_mois = (mois_absolu + 1).astype("datetime64[M]").astype("datetime64[D]")
+        dates = debut_mois + (np.nan_to_num(numero).astype(np.int64) - 1)
+        j = (dates - np.datetime64(lundis[0], "D")).astype(np.int64) // 7
+        garde &= (dates < fin_mois) & (j >= 0) & (j < nb_semaines)
+        lignes = jour["ligne"].to_numpy(dtype=np.int64)[garde]
+        np.add.at(jours, (lignes, j[garde]), jour["jh"].to_numpy()[garde])
+        a_jours[lignes, j[garde]] = True
+
+        # Disponibilités hebdomadaires (semaine n du mois) → indice de semaine
+        semaine = df[df["source"] == "semaine"]
+        position_semaine = semaines_du_mois(lundis)
+        cles = zip(pd.to_numeric(semaine["annee"], errors="coerce").tolist(),
+                   semaine["mois"].tolist(),
+                   semaine["rang"].map(numero_semaine).tolist())
+        j = np.array([position_semaine.get(cle, -1) for cle in cles], dtype=np.int64)
+        garde = j >= 0
+        lignes = semaine["ligne"].to_numpy(dtype=np.int64)[garde]
+        np.add.at(semaines, (lignes, j[garde]), semaine["jh"].to_numpy()[garde])
+        a_semaines[lignes, j[garde]] = True
+
+    total = np.where(a_jours, jours, np.where(a_semaines, semaines, jh_par_semaine))
+
+    def colonne(nom):
+        """Colonne numérique des collaborateurs (NaN si absente ou invalide)."""
+        return pd.to_numeric(pd.Series([c[nom] for c in collaborateurs], dtype=object),
+                             errors="coerce").to_numpy(dtype=float)
+
+    def premiere_valeur(*colonnes, defaut):
+        resultat = np.full(nb_collab, float(defaut))
+        for valeurs in reversed(colonnes):
+            resultat = np.where(np.isnan(valeurs), resultat, valeurs)
+        return resultat
+
+    build_ratio = premiere_valeur(colonne("profil_build_ratio"), colonne("build_ratio"), defaut=BUILD_RATIO_DEFAUT)
+    run_ratio = premiere_valeur(colonne("profil_run_ratio"), colonne("run_ratio"), defaut=RUN_RATIO_DEFAUT)
+    somme = build_ratio + run_ratio
+    part_build = np.divide(build_ratio, somme, out=np.full(nb_collab, BUILD_RATIO_DEFAUT / 100), where=somme > 0)
+
+    caf_build = np.nan_to_num(colonne("caf_disponible_build"))[:, None]
+    caf_run = np.nan_to_num(colonne("caf_disponible_run"))[:, None]
+    build = np.where(caf_build > 0, caf_build, total * part_build[:, None])
+    run = np.where(caf_run > 0, caf_run, total * (1 - part_build)[:, None])
+    return total, build, run
+
+
+def capacite_collaborateurs(lundis):
+    """
+    Collaborateurs et leur capacité disponible (total, build, run) sur les semaines `lundis`.
+    Deux requêtes pour toute l'équipe : les collaborateurs, puis leurs disponibilités
+    journalières et hebdomadaires (regroupées par semaine lors du passage vectorisé).
+    """
+    collaborateurs = query_db("""
+        SELECT
+            c.matricule,
+            c.nom || ' ' || c.prenom AS nom_prenom,
+            c.profil_id,
+            p.nom AS profil,
+            a.nom AS affectation,
+            c.build_ratio,
+            c.run_ratio,
+            p.build_ratio AS profil_build_ratio,
+            p.run_ratio AS profil_run_ratio,
+            c.caf_disponible_build,
+            c.caf_disponible_run
+        FROM collaborateurs c
+        JOIN profils p ON c.profil_id = p.id
+        LEFT JOIN affectation a ON c.affectation_id = a.id
+        ORDER BY c.nom, c.prenom
+    """)
+
+    annees = [lundis[0].year, (lundis[-1] + timedelta(days=6)).year]
+    disponibilites = query_db("""
+        SELECT 'jour' AS source, collaborateur_matricule AS matricule, annee, mois, jour AS rang,
+               jours_dispo AS jh
+        FROM disponibilites_jour
+        WHERE annee BETWEEN ? AND ?
+        UNION ALL
+        SELECT 'semaine', collaborateur_matricule, annee, mois, semaine, SUM(jours_dispo)
+        FROM disponibilites_semaine
+        WHERE annee BETWEEN ? AND ?
+        GROUP BY collaborateur_matricule, annee, mois, semaine
+    """, annees + annees)
+
+    total, build, run = capacite_disponible(collaborateurs, disponibilites, lundis)
+    return collaborateurs, total, build, run
+
+
+def capacite_build_profils(profil_ids, lundis):
+    """Capacité BUILD disponible par profil (somme de ses collaborateurs) : matrice (profils × semaines)."""
+    collaborateurs, _, build, _ = capacite_collaborateurs(lundis)
+    ligne = {pid: i for i, pid in enumerate(profil_ids)}
+    garde = [i for i, c in enumerate(collaborateurs) if c["profil_id"] in ligne]
+    groupes = [ligne[collaborateurs[i]["profil_id"]] for i in garde]
+    return cumul_par_lignes(build[garde], groupes, len(profil_ids))
@@ -0,0 +1,227 @@
+# services/charge_hebdo.py
+"""
+Charge hebdomadaire matérialisée : table charge_hebdo(profil_id, annee, semaine, jh).
+
+Chaque ligne porte la charge requise d'un profil sur une semaine lundi → dimanche,
+identifiée par l'année et le numéro ISO de son lundi. La table est tenue à jour
+par différence : avant de modifier un projet on retire sa contribution, après on
+ajoute la nouvelle (voir maj_charge_projet), dans la même transaction.
+
+La répartition des phases par profil (phase_profils_programme) et le catalogue des
+phases sont modifiés hors de ces routes : des triggers SQL incrémentent leur compteur
+dans cache_version, et charge_semaines() reconstruit la table quand ce compteur ne
+correspond plus à celui de la dernière reconstruction (ou quand il n'y en a jamais eu,
+ex. projet_phases créée après la base). La table agrège tous les projets : l'ancienne
+contribution des projets touchés n'étant plus calculable, la reconstruction est complète.
+
+Reconstruction / vérification :
+    python -m services.charge_hebdo --reconstruire
+    python -m services.charge_hebdo --verifier
+"""
+import argparse
+from collections import defaultdict
+from contextlib import contextmanager
+import numpy as np
+from services.capacite import charge_par_lundi
+from services.simulation import invalider as invalider_simulation
+from utils.db_utils import _table_existe, connexion, init_db, query_db, transaction
+from utils.versions import fixer_version, lire_versions
+
+STATUTS_ACTIFS = ('En attente', 'À planifier', 'En cours')
+TOLERANCE = 1e-6  # écart (JH) toléré entre la table et un recalcul complet
+
+TABLES_CHARGE = ("projets", "projet_phases", "phase_profils_programme")
+REPARTITION = 'phase_profils_programme'  # compteur des tables de répartition (triggers)
+MARQUEUR = 'charge_hebdo'                # valeur de REPARTITION à la dernière reconstruction
+
+_INCREMENT_REPARTITION = f"""
+    INSERT INTO cache_version (nom, version, udate) VALUES ('{REPARTITION}', 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (nom) DO UPDATE SET version = version + 1, udate = CURRENT_TIMESTAMP;
+"""
+
+_REQUETE_PHASES = """
+    SELECT pp.date_debut, pp.date_fin, p.duree_estimee_jh, pph.pourcentage, pph.profil_id
+    FROM projets p
+    JOIN projet_phases pp ON p.id = pp.projet_id
+    JOIN phase_profils_programme pph ON pp.phase_id = pph.phase_id
+    WHERE p.statut IN ({})
+""".format(", ".join("?" * len(STATUTS_ACTIFS)))
+
+
+def _contributions(cur, projet_id=None):
+    """{(profil_id, annee, semaine): jh} pour un projet, ou pour tout le portefeuille."""
+    requete, params = _REQUETE_PHASES, list(STATUTS_ACTIFS)
+    if projet_id is not None:
+        requete += " AND p.id = ?"
+        params.append(projet_id)
+    rows = cur.execute(requete, params).fetchall()
+
+    contributions = defaultdict(float)
+    for profil_id, lundi, jh in charge_par_lundi(rows):
+        annee, semaine, _ = lundi.isocalendar()
+        contributions[(profil_id, annee, semaine)] += jh
+    return contributions
+
+
+def _appliquer(cur, projet_id, signe):
+    contributions = _contributions(cur, projet_id)
+    if not contributions:
+        return
+    cur.executemany("""
+        INSERT INTO charge_hebdo (profil_id, annee, semaine, jh) VALUES (?, ?, ?, ?)
+        ON CONFLICT (annee, semaine, profil_id) DO UPDATE SET jh = jh + excluded.jh
+    """, [(p, a, s, signe * jh) for (p, a, s), jh in contributions.items()])
+    # Les cellules revenues à zéro (aux arrondis près) sont supprimées
+    cur.executemany("""
+        DELETE FROM charge_hebdo
+        WHERE annee = ? AND semaine = ? AND profil_id = ? AND ABS(jh) < ?
+    """, [(a, s, p, TOLERANCE) for (p, a, s) in contributions])
+
+
+def retirer_charge_projet(cur, projet_id):
+    """Soustrait la contribution actuelle du projet (état avant modification)."""
+    _appliquer(cur, projet_id, -1)
+
+
+def ajouter_charge_projet(cur, projet_id):
+    """Ajoute la contribution actuelle du projet (état après modification)."""
+    _appliquer(cur, projet_id, 1)
+
+
+@contextmanager
+def maj_charge_projet(projet_id, conn=None):
+    """
+    Transaction de modification d'un projet qui maintient charge_hebdo :
+        with maj_charge_projet(projet_id) as cur:
+            cur.execute("UPDATE projets ...")
+    """
+    with transaction(conn) as cur:
+        retirer_charge_projet(cur, projet_id)
+        yield cur
+        ajouter_charge_projet(cur, projet_id)
+    invalider_simulation()
+
+
+# ===============================
+# 🔄 RÉPARTITION MODIFIÉE HORS APPLICATION
+# ===============================
+def installer_triggers(cur):
+    """Triggers (SQL pur) qui signalent toute écriture sur la répartition et le catalogue des phases."""
+    evenements = {
+        "phase_profils_programme": ("INSERT", "UPDATE", "DELETE"),
+        "phases": ("UPDATE OF id, programme_id", "DELETE"),
+    }
+    for table, liste in evenements.items():
+        if not _table_existe(cur, table):
+            continue
+        for evenement in liste:
+            suffixe = evenement.split()[0].lower()
+            cur.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_version_{suffixe} AFTER {evenement} ON {table}
+                BEGIN {_INCREMENT_REPARTITION} END
+            """)
+
+
+def actualiser_si_perimee(conn=None):
+    """
+    Reconstruit charge_hebdo si la répartition a changé depuis la dernière reconstruction
+    ou si la table n'a jamais été remplie. Retourne True si elle a été reconstruite.
+    """
+    presentes = query_db(f"""
+        SELECT COUNT(*) AS nb FROM sqlite_master
+        WHERE type = 'table' AND name COLLATE NOCASE IN ({', '.join('?' * len(TABLES_CHARGE))})
+    """, list(TABLES_CHARGE), one=True)["nb"]
+    if presentes < len(TABLES_CHARGE):
+        return False
+    marqueur = query_db("SELECT version FROM cache_version WHERE nom = ?", [MARQUEUR], one=True)
+    if marqueur is not None and marqueur["version"] == lire_versions(REPARTITION)[0]:
+        return False
+    reconstruire(conn)
+    return True
+
+
+def charge_semaines(profil_ids, lundis):
+    """
+    Matrice (profils × semaines) lue dans charge_hebdo pour les semaines
+    commençant aux `lundis` donnés (dates consécutives, pas de 7 jours).
+    La table est d'abord reconstruite si elle est périmée (actualiser_si_perimee).
+    """
+    actualiser_si_perimee()
+    matrice = np.zeros((len(profil_ids), len(lundis)))
+    if not len(profil_ids) or not len(lundis):
+        return matrice
+
+    semaines = {tuple(l.isocalendar()[:2]): j for j, l in enumerate(lundis)}
+    lignes = {pid: i for i, pid in enumerate(profil_ids)}
+    premiere, derniere = lundis[0].isocalendar(), lundis[-1].isocalendar()
+    rows = query_db("""
+        SELECT profil_id, annee, semaine, jh
+        FROM charge_hebdo
+        WHERE (annee, semaine) BETWEEN (?, ?) AND (?, ?)
+    """, [premiere[0], premiere[1], derniere[0], derniere[1]])
+
+    for r in rows:
+        i = lignes.get(r["profil_id"])
+        j = semaines.get((r["annee"], r["semaine"]))
+        if i is not None and j is not None:
+            matrice[i, j] = r["jh"]
+    return matrice
+
+
+def reconstruire(conn=None):
+    """Recalcule entièrement charge_hebdo ; retourne le nombre de cellules écrites."""
+    with transaction(conn) as cur:
+        return reecrire_charge(cur)
+
+
+def reecrire_charge(cur):
+    """Réécrit charge_hebdo dans la transaction en cours du curseur `cur` (voir reconstruire)."""
+    contributions = _contributions(cur)
+    cur.execute("DELETE FROM charge_hebdo")
+    cur.executemany(
+        "INSERT INTO charge_hebdo (profil_id, annee, semaine, jh) VALUES (?, ?, ?, ?)",
+        [(p, a, s, jh) for (p, a, s), jh in contributions.items()]
+    )
+    # Version de la répartition prise en compte, lue dans la même transaction
+    cur.execute("SELECT version FROM cache_version WHERE nom = ?", [REPARTITION])
+    row = cur.fetchone()
+    fixer_version(MARQUEUR, row[0] if row else 0, cur)
+    return len(contributions)
+
+
+def verifier():
+    """Compare charge_hebdo à un recalcul complet ; retourne la liste des écarts."""
+    with connexion() as conn:
+        cur = conn.cursor()
+        attendu = _contributions(cur)
+        stocke = {
+            (r["profil_id"], r["annee"], r["semaine"]): r["jh"]
+            for r in cur.execute("SELECT profil_id, annee, semaine, jh FROM charge_hebdo")
+        }
+        cur.close()
+
+    ecarts = []
+    for cle in sorted(set(attendu) | set(stocke)):
+        a, s = attendu.get(cle, 0.0), stocke.get(cle, 0.0)
+        if abs(a - s) > TOLERANCE:
+            ecarts.append((cle, s, a))
+    return ecarts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance de la table charge_hebdo")
+    groupe = parser.add_mutually_exclusive_group(required=True)
+    groupe.add_argument("--reconstruire", action="store_true", help="recalculer toute la table")
+    groupe.add_argument("--verifier", action="store_true", help="comparer la table à un recalcul complet")
+    args = parser.parse_args()
+
+    init_db()
+    if args.reconstruire:
+        print(f"✅ charge_hebdo reconstruite : {reconstruire()} cellules.")
+    else:
+        ecarts = verifier()
+        for (profil_id, annee, semaine), stocke, attendu in ecarts[:50]:
+            print(f"⚠️ profil {profil_id} {annee}-S{semaine:02d} : table={stocke:.4f} attendu={attendu:.4f}")
+        if ecarts:
+            raise SystemExit(f"❌ {len(ecarts)} écart(s) entre charge_hebdo et le recalcul complet.")
+        print("✅ charge_hebdo cohérente avec le recalcul complet.")
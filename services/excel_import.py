@@ -0,0 +1,446 @@
+# services/excel_import.py
+import hashlib
+import math
+import os
+import time
+from datetime import date, datetime, timedelta
+from itertools import islice
+import pandas as pd
+from services.recalcul_scores import recalculer_scores_projets
+from services.valeur_metier_matcher import ValeurMetierMatcher
+from utils.db_utils import connexion, query_db, transaction
+from utils.text_utils import normalize_text
+
+# Colonnes obligatoires (après normalisation)
+COLONNES_OBLIGATOIRES = [
+    "ref ogp",
+    "nomencalture du projet",
+    "description du projet",
+    "date de mep prevue",
+]
+# Colonnes descriptives qui ne portent pas de valeur métier
+COLONNES_IGNOREES = ["nom du departement", "type de la demande"]
+
+TAILLE_LOT = 500  # Nombre de projets accumulés en mémoire avant écriture en table de travail
+
+MODE_COMPLET = "complet"          # Remplace tous les projets importés
+MODE_INCREMENTAL = "incremental"  # Met à jour par ref_opg (projets inchangés ignorés)
+
+
+# ------------------------------------------------------------
+# 📖 Lecture en flux du classeur (une ligne à la fois)
+# ------------------------------------------------------------
+def _lignes_xlsx(filepath):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _lignes_xlsb(filepath):
+    from pyxlsb import open_workbook
+
+    with open_workbook(filepath) as wb:
+        with wb.get_sheet(1) as sheet:
+            for row in sheet.rows():
+                yield tuple(c.v for c in row)
+
+
+def _lignes_pandas(filepath):
+    # Formats sans lecteur en flux (.xls, .ods) : lecture complète
+    df = pd.read_excel(filepath, header=None)
+    yield from df.itertuples(index=False, name=None)
+
+
+def lire_lignes(filepath):
+    """
+    Itère sur les lignes brutes (tuples de valeurs) de la première feuille,
+    sans charger le classeur en mémoire pour les formats .xlsx/.xlsm/.xlsb.
+    Lève ValueError si le fichier ne peut pas être ouvert.
+    """
+    ext = os.path.splitext(filepath)[1].lower()
+    lecteur = {".xlsx": _lignes_xlsx, ".xlsm": _lignes_xlsx, ".xlsb": _lignes_xlsb}.get(ext, _lignes_pandas)
+    lignes = lecteur(filepath)
+    try:
+        premiere = next(lignes)
+    except StopIteration:
+        raise ValueError("Erreur de lecture Excel : fichier vide")
+    except Exception as e:
+        raise ValueError(f"Erreur de lecture Excel : {e}") from e
+    yield premiere
+    yield from lignes
+
+
+def _noms_colonnes(entetes):
+    """Noms de colonnes comme pandas (colonnes sans nom, doublons suffixés), puis normalisés."""
+    noms = []
+    vus = {}
+    for i, h in enumerate(entetes):
+        nom = str(h) if _texte(h) else f"Unnamed: {i}"
+        if nom in vus:
+            vus[nom] += 1
+            nom = f"{nom}.{vus[nom]}"
+        else:
+            vus[nom] = 0
+        noms.append(normalize_text(nom))
+    return noms
+
+
+def _texte(v):
+    """Valeur de cellule en texte ('' pour une cellule vide)."""
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return ""
+    v = str(v).strip()
+    return "" if v.lower() == "nan" else v
+
+
+def iter_blocs(lignes, idx_ref):
+    """Regroupe les lignes en blocs projet (1 projet = 3 lignes, débutant par une réf. OPG)."""
+    for ligne in lignes:
+        if idx_ref < len(ligne) and _texte(ligne[idx_ref]):
+            yield [ligne] + list(islice(lignes, 2))
+
+
+# ------------------------------------------------------------
+# 📚 Catalogue des valeurs métier
+# ------------------------------------------------------------
+def charger_matcher():
+    """
+    Construit l'index de correspondance à partir des libellés normalisés
+    stockés dans valeur_metier (calculés seulement s'ils manquent).
+    """
+    rows = query_db("""
+        SELECT id, libelle, type_libelle, valeur_libelle, libelle_norm, type_libelle_norm, valeur_libelle_norm
+        FROM valeur_metier
+    """)
+    lignes = [
+        (r["id"],
+         r["libelle_norm"] if r["libelle_norm"] is not None else normalize_text(r["libelle"]),
+         r["type_libelle_norm"] if r["type_libelle_norm"] is not None else normalize_text(r["type_libelle"]),
+         r["valeur_libelle_norm"] if r["valeur_libelle_norm"] is not None else normalize_text(r["valeur_libelle"]))
+        for r in rows
+    ]
+    return ValeurMetierMatcher(lignes), len(lignes)
+
+
+# ------------------------------------------------------------
+# 🧠 Lecture d'un bloc projet
+# ------------------------------------------------------------
+def _valeur(bloc, ligne, idx):
+    if ligne < len(bloc) and idx < len(bloc[ligne]):
+        return bloc[ligne][idx]
+    return None
+
+
+def _cellule(bloc, ligne, idx):
+    return _texte(_valeur(bloc, ligne, idx))
+
+
+def _date_mep(date_raw, serie_excel=False):
+    """
+    Conversion de la date Excel. pyxlsb ne type pas les dates : pour un .xlsb (`serie_excel`),
+    un nombre est un numéro de série. Ailleurs, un nombre est gardé tel quel en texte.
+    """
+    if isinstance(date_raw, (datetime, date)):
+        return date_raw.strftime("%Y-%m-%d")
+    if (serie_excel and isinstance(date_raw, (int, float)) and not isinstance(date_raw, bool)
+            and not math.isnan(date_raw)):
+        return (datetime(1899, 12, 30) + timedelta(days=date_raw)).strftime("%Y-%m-%d")
+    return _texte(date_raw) or None
+
+
+def _empreinte(bloc, nb_colonnes):
+    """Empreinte (SHA-1) des cellules normalisées d'un bloc projet."""
+    h = hashlib.sha1()
+    for n in range(len(bloc)):
+        for i in range(nb_colonnes):
+            v = normalize_text(_cellule(bloc, n, i))
+            if v:
+                h.update(f"{n}\x1f{i}\x1f{v}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _liens_du_bloc(bloc, colonnes, matcher, debug):
+    """Retourne les ids de valeurs métier reconnues dans un bloc projet (noms de colonnes déjà normalisés)."""
+    ids = []
+    for idx, lib_n in colonnes:
+        # ligne 0 → type (texte), ligne 2 → valeur (numérique)
+        type_libelle = _cellule(bloc, 0, idx)
+        valeur_libelle = _cellule(bloc, 2, idx)
+
+        type_n = normalize_text(type_libelle)
+        val_n = normalize_text(valeur_libelle)
+
+        debug.write(f"🔍 {lib_n} :: type='{type_libelle}' | valeur='{valeur_libelle}'\n")
+
+        if not type_n and not val_n:
+            debug.write("❌ aucun match (vides)\n")
+            continue
+
+        vm_id = matcher.trouver(lib_n, type_n, val_n)
+        if vm_id is not None:
+            ids.append(vm_id)
+            debug.write(f"🟩 match id={vm_id}\n")
+        else:
+            debug.write("❌ aucun match\n")
+    return ids
+
+
+# ------------------------------------------------------------
+# 💾 Écriture : tables de travail puis bascule en une transaction
+# ------------------------------------------------------------
+def _preparer_tables_travail(conn):
+    """Tables TEMP propres à la connexion : les remplir ne verrouille pas la base."""
+    conn.executescript("""
+        CREATE TEMP TABLE IF NOT EXISTS import_projets (
+            rang INTEGER PRIMARY KEY,
+            ref_opg TEXT, titre TEXT, description TEXT, date_mep TEXT, empreinte TEXT
+        );
+        CREATE TEMP TABLE IF NOT EXISTS import_liens (rang INTEGER, id_valeur_metier INTEGER);
+        DELETE FROM temp.import_projets;
+        DELETE FROM temp.import_liens;
+    """)
+
+
+def _vider_lot(conn, projets, liens):
+    conn.executemany("INSERT INTO temp.import_projets VALUES (?, ?, ?, ?, ?, ?)", projets)
+    conn.executemany("INSERT INTO temp.import_liens VALUES (?, ?)", liens)
+    conn.commit()
+    projets.clear()
+    liens.clear()
+
+
+def _prochain_id_projet(cur):
+    """Premier id libre de Projet (respecte la séquence AUTOINCREMENT)."""
+    cur.execute("""
+        SELECT MAX(
+            COALESCE((SELECT MAX(id) FROM Projet), 0),
+            COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'Projet'), 0)
+        ) + 1
+    """)
+    return cur.fetchone()[0]
+
+
+def _ecrire_complet(conn):
+    """
+    Remplace le contenu importé en une seule transaction :
+    suppression, puis insertion groupée des projets et liens depuis les tables de travail.
+    Les ids de Projet sont pré-attribués (premier id libre + rang) pour lier les valeurs sans lastrowid.
+    """
+    with transaction(conn) as cur:
+        cur.execute("DELETE FROM valeur_metier_projet")
+        cur.execute("DELETE FROM complexite_projet")
+        cur.execute("DELETE FROM Projet")
+        supprimes = cur.rowcount
+
+        premier_id = _prochain_id_projet(cur)
+        cur.execute("""
+            INSERT INTO Projet (id, ref_opg, titre_projet, description, date_mep, empreinte, idate)
+            SELECT ? + rang, ref_opg, titre, description, date_mep, empreinte, DATETIME('now')
+            FROM temp.import_projets
+            ORDER BY rang
+        """, (premier_id,))
+        inseres = cur.rowcount
+        cur.execute("""
+            INSERT OR IGNORE INTO valeur_metier_projet (id_projet, id_valeur_metier, idate)
+            SELECT ? + rang, id_valeur_metier, DATETIME('now')
+            FROM temp.import_liens
+        """, (premier_id,))
+        recalculer_scores_projets(cur)
+
+    return {"inseres": inseres, "mis_a_jour": 0, "inchanges": 0, "supprimes": supprimes}
+
+
+def _ecrire_incremental(conn, supprimer_absents=False):
+    """
+    Fusionne les tables de travail avec Projet, par ref_opg, en une seule transaction :
+    - projet inconnu → inséré ;
+    - empreinte différente → mis à jour (ses liens valeur métier sont remplacés) ;
+    - empreinte identique → ignoré (liens, complexités et saisies manuelles conservés) ;
+    - projet absent du fichier → supprimé si `supprimer_absents`.
+    Si une référence apparaît plusieurs fois dans le fichier, seul son premier bloc est retenu.
+    """
+    with transaction(conn) as cur:
+        premier_id = _prochain_id_projet(cur)
+        cur.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS import_delta (
+                rang INTEGER PRIMARY KEY, id_projet INTEGER, action TEXT
+            )
+        """)
+        cur.execute("DELETE FROM temp.import_delta")
+        cur.execute("""
+            INSERT INTO temp.import_delta (rang, id_projet, action)
+            SELECT t.rang,
+                   COALESCE(p.id, ? + t.rang),
+                   CASE WHEN p.id IS NULL THEN 'insert'
+                        WHEN p.empreinte IS t.empreinte THEN 'inchange'
+                        ELSE 'maj' END
+            FROM temp.import_projets t
+            LEFT JOIN (
+                SELECT ref_opg, id, empreinte,
+                       ROW_NUMBER() OVER (PARTITION BY ref_opg ORDER BY id) AS rn
+                FROM Projet
+            ) p ON p.ref_opg = t.ref_opg AND p.rn = 1
+            WHERE t.rang IN (SELECT MIN(rang) FROM temp.import_projets GROUP BY ref_opg)
+        """, (premier_id,))
+
+        # Projets modifiés : mise à jour des informations + remplacement des liens
+        cur.execute("""
+            UPDATE Projet
+            SET titre_projet = t.titre, description = t.description, date_mep = t.date_mep,
+                empreinte = t.empreinte, udate = DATETIME('now')
+            FROM temp.import_delta d
+            JOIN temp.import_projets t ON t.rang = d.rang
+            WHERE Projet.id = d.id_projet AND d.action = 'maj'
+        """)
+        cur.execute("""
+            DELETE FROM valeur_metier_projet
+            WHERE id_projet IN (SELECT id_projet FROM temp.import_delta WHERE action = 'maj')
+        """)
+
+        # Nouveaux projets
+        cur.execute("""
+            INSERT INTO Projet (id, ref_opg, titre_projet, description, date_mep, empreinte, idate)
+            SELECT d.id_projet, t.ref_opg, t.titre, t.description, t.date_mep, t.empreinte, DATETIME('now')
+            FROM temp.import_delta d
+            JOIN temp.import_projets t ON t.rang = d.rang
+            WHERE d.action = 'insert'
+            ORDER BY d.rang
+        """)
+
+        cur.execute("""
+            INSERT OR IGNORE INTO valeur_metier_projet (id_projet, id_valeur_metier, idate)
+            SELECT d.id_projet, l.id_valeur_metier, DATETIME('now')
+            FROM temp.import_liens l
+            JOIN temp.import_delta d ON d.rang = l.rang
+            WHERE d.action IN ('insert', 'maj')
+        """)
+        recalculer_scores_projets(cur, "SELECT id_projet FROM temp.import_delta WHERE action IN ('insert', 'maj')")
+
+        # Projets absents du fichier
+        supprimes = 0
+        if supprimer_absents:
+            absents = "SELECT id FROM Projet WHERE ref_opg NOT IN (SELECT ref_opg FROM temp.import_projets)"
+            cur.execute(f"DELETE FROM valeur_metier_projet WHERE id_projet IN ({absents})")
+            cur.execute(f"DELETE FROM complexite_projet WHERE id_projet IN ({absents})")
+            cur.execute(f"DELETE FROM Projet WHERE id IN ({absents})")
+            supprimes = cur.rowcount
+
+        cur.execute("SELECT action, COUNT(*) FROM temp.import_delta GROUP BY action")
+        compte = dict(cur.fetchall())
+        cur.execute("DROP TABLE temp.import_delta")
+
+    return {
+        "inseres": compte.get("insert", 0),
+        "mis_a_jour": compte.get("maj", 0),
+        "inchanges": compte.get("inchange", 0),
+        "supprimes": supprimes,
+    }
+
+
+def resume_rapport(rapport):
+    """Résumé lisible d'un rapport d'import."""
+    return (
+        f"Import {rapport['mode']} terminé : {rapport['projets']} projets lus "
+        f"({rapport['inseres']} insérés, {rapport['mis_a_jour']} mis à jour, "
+        f"{rapport['inchanges']} inchangés, {rapport['supprimes']} supprimés), "
+        f"{rapport['liens']} liens reconnus en {rapport['duree']} s "
+        f"({rapport['lignes_par_seconde']} lignes/s)."
+    )
+
+
+# ------------------------------------------------------------
+# 🔧 Import complet d'un fichier
+# ------------------------------------------------------------
+def importer_fichier(filepath, debug, progression=None, mode=MODE_COMPLET, supprimer_absents=False):
+    """
+    Importe un fichier Excel OPG.
+    - mode complet : remplace tous les projets existants ;
+    - mode incrémental : fusion par ref_opg (voir _ecrire_incremental).
+    Le classeur est lu en flux, bloc par bloc : la mémoire reste constante
+    quelle que soit la taille du fichier.
+    Écrit le détail dans `debug` et retourne un rapport :
+    {mode, projets, liens, inseres, mis_a_jour, inchanges, supprimes, duree, lignes_par_seconde}.
+    `progression(blocs_parses, liens_crees)` est appelé après chaque bloc.
+    Lève ValueError si le fichier est illisible ou incomplet.
+    """
+    debut = time.perf_counter()
+
+    # 📖 Lecture Excel (en-têtes)
+    lignes = lire_lignes(filepath)
+    serie_excel = os.path.splitext(filepath)[1].lower() == ".xlsb"
+    colonnes = _noms_colonnes(next(lignes))
+
+    debug.write("=== DEBUG IMPORT LOG ===\n\n")
+    debug.write(f"🔎 Colonnes normalisées : {colonnes}\n\n")
+
+    for r in COLONNES_OBLIGATOIRES:
+        if r not in colonnes:
+            debug.write(f"❌ Colonne manquante : {r}\n")
+            raise ValueError(f"Colonne manquante : {r}")
+
+    idx = {col: i for i, col in reversed(list(enumerate(colonnes)))}
+    colonnes_valeurs = [
+        (i, col) for i, col in enumerate(colonnes)
+        if col not in COLONNES_OBLIGATOIRES and col not in COLONNES_IGNOREES
+    ]
+
+    # 📚 Chargement valeurs métier
+    matcher, nb_valeurs = charger_matcher()
+    debug.write(f"📚 {nb_valeurs} valeurs métier chargées.\n\n")
+
+    # 🔁 Parcours des blocs projet au fil de la lecture
+    nb_projets = 0
+    nb_liens = 0
+    with connexion() as conn:
+        _preparer_tables_travail(conn)
+        projets, liens = [], []
+        for p_idx, bloc in enumerate(iter_blocs(lignes, idx["ref ogp"]), start=1):
+            ref_opg = _cellule(bloc, 0, idx["ref ogp"])
+            titre = _cellule(bloc, 0, idx["nomencalture du projet"])
+            desc = _cellule(bloc, 0, idx["description du projet"])
+            date_mep = _date_mep(_valeur(bloc, 0, idx["date de mep prevue"]), serie_excel)
+
+            debug.write(f"\n=== Aperçu du bloc projet {p_idx} ===\n")
+            for n, ligne in enumerate(bloc):
+                debug.write(f"{n} | " + " | ".join(_texte(v) for v in ligne) + "\n")
+            debug.write(f"\n--- Projet {p_idx}: {titre} ({ref_opg}) ---\n")
+
+            rang = nb_projets
+            projets.append((rang, ref_opg, titre, desc, date_mep, _empreinte(bloc, len(colonnes))))
+            ids = _liens_du_bloc(bloc, colonnes_valeurs, matcher, debug)
+            liens.extend((rang, vm_id) for vm_id in ids)
+            nb_projets += 1
+            nb_liens += len(ids)
+            debug.write("\n")
+
+            if len(projets) >= TAILLE_LOT:
+                _vider_lot(conn, projets, liens)
+            if progression:
+                progression(p_idx, nb_liens)
+
+        _vider_lot(conn, projets, liens)
+        debug.write(f"📊 {nb_projets} blocs projet détectés.\n\n")
+
+        try:
+            if mode == MODE_INCREMENTAL:
+                compte = _ecrire_incremental(conn, supprimer_absents)
+            else:
+                compte = _ecrire_complet(conn)
+        finally:
+            conn.executescript("DROP TABLE IF EXISTS temp.import_projets; DROP TABLE IF EXISTS temp.import_liens;")
+
+    duree = time.perf_counter() - debut
+    rapport = {
+        "mode": mode,
+        "projets": nb_projets,
+        "liens": nb_liens,
+        **compte,
+        "duree": round(duree, 2),
+        "lignes_par_seconde": round((nb_projets + nb_liens) / duree) if duree > 0 else 0,
+    }
+    debug.write(f"✅ {resume_rapport(rapport)}\n")
+    return rapport
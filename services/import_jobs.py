@@ -0,0 +1,104 @@
+# services/import_jobs.py
+"""
+Imports Excel exécutés en arrière-plan, suivis dans la table import_jobs.
+
+Les imports sont sérialisés par un worker unique (un ThreadPoolExecutor) propre au
+processus : la garantie « un import à la fois » ne vaut qu'au sein d'un même processus,
+pas entre plusieurs workers d'un serveur WSGI. De même, un job en attente ou en cours
+n'existe que dans la mémoire du processus qui l'a reçu : au démarrage, ceux qu'un arrêt a
+interrompus sont marqués en erreur (marquer_jobs_interrompus).
+
+Le fichier importé est supprimé dès la fin du job, quelle qu'en soit l'issue.
+"""
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from services.excel_import import MODE_COMPLET, importer_fichier, resume_rapport
+from utils.db_utils import execute_db, query_db
+
+# Un seul worker : les imports soumis en parallèle sont exécutés l'un après l'autre
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="import-excel")
+
+INTERVALLE_PROGRESSION = 0.5  # secondes entre deux mises à jour de progression
+
+
+def soumettre_import(filepath, log_path, mode=MODE_COMPLET, supprimer_absents=False):
+    """Enregistre un job d'import et le confie au worker ; retourne son id."""
+    job_id = str(uuid.uuid4())
+    execute_db("INSERT INTO import_jobs (id, fichier) VALUES (?, ?)", [job_id, filepath])
+    _executor.submit(_executer, job_id, filepath, log_path, mode, supprimer_absents)
+    return job_id
+
+
+def marquer_jobs_interrompus():
+    """
+    Passe en erreur les jobs restés en attente ou en cours (processus arrêté) et supprime
+    leurs fichiers. À appeler au démarrage, avant toute soumission. Retourne leur nombre.
+    """
+    jobs = query_db("SELECT id, fichier FROM import_jobs WHERE statut IN ('en_attente', 'en_cours')")
+    for job in jobs:
+        execute_db("""
+            UPDATE import_jobs SET statut = 'erreur', message = ?, finished_at = DATETIME('now')
+            WHERE id = ?
+        """, ["Import interrompu par un redémarrage de l'application, à relancer.", job["id"]])
+        _supprimer_fichier(job["fichier"])
+    return len(jobs)
+
+
+def etat_job(job_id):
+    """État d'un job (progression, durée écoulée en secondes), ou None."""
+    row = query_db("""
+        SELECT id, statut, blocs_parses, liens_crees, message, created_at, started_at, finished_at,
+               ROUND((JULIANDAY(COALESCE(finished_at, DATETIME('now'))) - JULIANDAY(started_at)) * 86400, 1)
+                   AS duree
+        FROM import_jobs
+        WHERE id = ?
+    """, [job_id], one=True)
+    return dict(row) if row else None
+
+
+def _supprimer_fichier(filepath):
+    try:
+        os.remove(filepath)
+    except FileNotFoundError:
+        pass
+
+
+def _executer(job_id, filepath, log_path, mode, supprimer_absents):
+    try:
+        _importer(job_id, filepath, log_path, mode, supprimer_absents)
+    finally:
+        _supprimer_fichier(filepath)
+
+
+def _importer(job_id, filepath, log_path, mode, supprimer_absents):
+    derniere_maj = [0.0]
+
+    def progression(blocs_parses, liens_crees):
+        maintenant = time.monotonic()
+        if maintenant - derniere_maj[0] >= INTERVALLE_PROGRESSION:
+            derniere_maj[0] = maintenant
+            execute_db(
+                "UPDATE import_jobs SET blocs_parses = ?, liens_crees = ? WHERE id = ?",
+                [blocs_parses, liens_crees, job_id]
+            )
+
+    # Toute erreur, passage en cours compris, termine le job en erreur : sinon l'exception
+    # resterait dans le Future du worker et le job en attente jusqu'au prochain démarrage
+    try:
+        execute_db("UPDATE import_jobs SET statut = 'en_cours', started_at = DATETIME('now') WHERE id = ?",
+                   [job_id])
+        with open(log_path, "w", encoding="utf-8") as debug:
+            rapport = importer_fichier(filepath, debug, progression=progression,
+                                       mode=mode, supprimer_absents=supprimer_absents)
+        execute_db("""
+            UPDATE import_jobs
+            SET statut = 'termine', blocs_parses = ?, liens_crees = ?, message = ?, finished_at = DATETIME('now')
+            WHERE id = ?
+        """, [rapport["projets"], rapport["liens"], resume_rapport(rapport), job_id])
+    except Exception as e:
+        execute_db("""
+            UPDATE import_jobs SET statut = 'erreur', message = ?, finished_at = DATETIME('now')
+            WHERE id = ?
+        """, [str(e), job_id])
@@ -0,0 +1,110 @@
+# services/moteur_wsjf.py
+"""
+Moteur de score WSJF unique, compilé à partir des catalogues valeur_metier et complexite.
+
+Une ligne de catalogue pèse valeur_libelle × ponderation (même arithmétique que SQLite).
+Le moteur en tire :
+- les poids par id de ligne : comparés d'une compilation à l'autre, ils désignent les lignes
+  modifiées et donc les projets importés à rescorer (services/recalcul_scores) ;
+- le barème des formulaires de saisie : POINTS_CONFIG, dont chaque réponse peut être
+  remplacée par une ligne de catalogue. CHAMPS_CATALOGUE (services/wsjf_calculator) désigne
+  explicitement, pour chaque champ, le catalogue et le libellé de ses lignes ; la réponse
+  choisit la ligne de ce libellé dont le type est son code, comparés après normalize_text
+  — ex. alignement_strategic=fortement_aligne → libellé « alignement strategic », type
+  « fortement aligné ». Les points d'une réponse surchargée sont lus dans les mêmes poids
+  par id que ceux des projets importés : les deux chemins de score partagent une seule table.
+
+Le moteur compilé est gardé en mémoire et recompilé quand la version d'un des deux
+catalogues change (utils/versions.py) : aucun catalogue n'est relu pour un calcul de score.
+"""
+import threading
+import numpy as np
+from utils.db_utils import query_db
+from utils.text_utils import normalize_text
+from utils.versions import lire_versions
+
+CATALOGUES = ('valeur_metier', 'complexite')
+
+_moteur = None
+_verrou = threading.Lock()
+
+
+class MoteurWSJF:
+    """Poids et barèmes compilés pour un couple de versions des catalogues."""
+
+    def __init__(self, versions, valeurs_metier, complexites, points_config, champs_catalogue):
+        """
+        `valeurs_metier`, `complexites` : lignes (id, libelle_norm, type_libelle_norm, poids).
+        `points_config` : barème par défaut des formulaires {champ: {réponse: points}}.
+        `champs_catalogue` : {champ: (catalogue, libellé)} pour les champs surchargeables.
+        """
+        self.versions = versions
+        self.poids_valeur = {r[0]: r[3] for r in valeurs_metier}
+        self.poids_complexite = {r[0]: r[3] for r in complexites}
+        poids = {'valeur_metier': self.poids_valeur, 'complexite': self.poids_complexite}
+
+        # (libellé, type) normalisés → id de la première ligne de catalogue
+        ids = {
+            'valeur_metier': {(r[1], r[2]): r[0] for r in reversed(valeurs_metier)},
+            'complexite': {(r[1], r[2]): r[0] for r in reversed(complexites)},
+        }
+        # Champ → {réponse: id de la ligne de catalogue retenue} (réponses surchargées seulement)
+        self.lignes = {}
+        self.baremes = {}
+        for champ, bareme in points_config.items():
+            catalogue, libelle = champs_catalogue.get(champ, (None, None))
+            index = ids.get(catalogue, {})
+            libelle_norm = normalize_text(libelle or '')
+            self.lignes[champ] = {
+                reponse: index[(libelle_norm, normalize_text(reponse))]
+                for reponse in bareme if (libelle_norm, normalize_text(reponse)) in index
+            }
+            self.baremes[champ] = {
+                reponse: poids[catalogue][self.lignes[champ][reponse]] if reponse in self.lignes[champ] else points
+                for reponse, points in bareme.items()
+            }
+
+        # Tables de correspondance code catégoriel → points (calcul par lot) :
+        # la dernière case vaut 0 et sert aux codes -1 (réponse absente ou inconnue)
+        self.tables = {
+            champ: (list(bareme), np.array(list(bareme.values()) + [0], dtype=float))
+            for champ, bareme in self.baremes.items()
+        }
+
+    def points(self, champ, reponse):
+        """Points d'une réponse de formulaire (0 si inconnue)."""
+        return self.baremes[champ].get(reponse, 0)
+
+
+def _lignes_catalogue(table):
+    existe = query_db("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE",
+                      [table], one=True)
+    if not existe:
+        return []
+    # valeur_libelle * ponderation est évalué par SQLite, comme dans les requêtes de score historiques
+    rows = query_db(f"""
+        SELECT id, libelle, type_libelle, libelle_norm, type_libelle_norm,
+               COALESCE(valeur_libelle * ponderation, 0) AS poids
+        FROM {table}
+        ORDER BY id
+    """)
+    return [
+        (r["id"],
+         r["libelle_norm"] if r["libelle_norm"] is not None else normalize_text(r["libelle"]),
+         r["type_libelle_norm"] if r["type_libelle_norm"] is not None else normalize_text(r["type_libelle"]),
+         r["poids"])
+        for r in rows
+    ]
+
+
+def moteur():
+    """Moteur courant, recompilé si un catalogue a changé depuis sa construction."""
+    global _moteur
+    from services.wsjf_calculator import CHAMPS_CATALOGUE, POINTS_CONFIG
+
+    versions = lire_versions(*CATALOGUES)
+    with _verrou:
+        if _moteur is None or _moteur.versions != versions:
+            _moteur = MoteurWSJF(versions, _lignes_catalogue('valeur_metier'),
+                                 _lignes_catalogue('complexite'), POINTS_CONFIG, CHAMPS_CATALOGUE)
+        return _moteur
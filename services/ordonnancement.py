@@ -0,0 +1,195 @@
+# services/ordonnancement.py
+"""
+Ordonnancement du portefeuille sous contrainte de capacité.
+
+Les projets candidats sont pris par score WSJF décroissant ; chacun est placé à la
+première semaine où tous les profils qu'il mobilise ont assez de capacité BUILD
+restante pendant toute sa durée (placement glouton). La charge des projets en cours
+est déduite de la capacité avant placement.
+
+Usage en ligne de commande :
+    python -m services.ordonnancement --debut 2026-01-05 --fin 2026-12-27 [--retenus] [--json]
+"""
+import argparse
+import json
+import math
+from datetime import date, timedelta
+import numpy as np
+from services.capacite import (
+    JH_PAR_SEMAINE, POURCENTAGE_DEFAUT, calendrier, capacite_build_profils, charge_requise
+)
+from utils.db_utils import init_db, query_db
+from utils.referentiel import lignes as referentiel
+
+STATUTS_CANDIDATS = ('En attente', 'À planifier')
+STATUT_EN_COURS = 'En cours'
+EPSILON = 1e-9
+
+
+def placer(besoins, durees, capacite, charge_fixe=None, semaine_min=0):
+    """
+    Placement glouton, dans l'ordre des lignes de `besoins`.
+
+    - besoins : matrice (projets × profils), JH totaux demandés à chaque profil
+    - durees : nombre de semaines de chaque projet (charge répartie uniformément)
+    - capacite, charge_fixe : matrices (profils × semaines)
+    Retourne (indice de semaine de début par projet, -1 si aucun créneau ; charge résultante).
+
+    La faisabilité d'un début s est testée pour toutes les semaines d'un coup :
+    une semaine est « libre » si chaque profil concerné y a assez de reste, et
+    une somme cumulée donne les fenêtres de `duree` semaines entièrement libres.
+    """
+    besoins = np.asarray(besoins, dtype=float)
+    durees = np.asarray(durees, dtype=np.int64)
+    nb_semaines = capacite.shape[1]
+    charge = np.zeros_like(capacite) if charge_fixe is None else np.array(charge_fixe, dtype=float)
+    reste = capacite - charge
+    debuts = np.full(len(besoins), -1, dtype=np.int64)
+
+    for k, (besoin, duree) in enumerate(zip(besoins, durees)):
+        if duree <= 0 or duree > nb_semaines - semaine_min:
+            continue
+        profils = np.flatnonzero(besoin > 0)
+        hebdo = besoin[profils] / duree
+        libres = np.all(reste[profils] >= hebdo[:, None] - EPSILON, axis=0)
+        libres[:semaine_min] = False
+        cumul = np.concatenate(([0], np.cumsum(libres)))
+        fenetres = np.flatnonzero(cumul[duree:] - cumul[:-duree] == duree)
+        if not len(fenetres):
+            continue
+        s = fenetres[0]
+        debuts[k] = s
+        reste[profils, s:s + duree] -= hebdo[:, None]
+        charge[profils, s:s + duree] += hebdo[:, None]
+
+    return debuts, charge
+
+
+def _duree_semaines(projet, nb_semaines):
+    """Durée du projet : étendue de ses phases si elles existent, sinon un ETP à 5 JH/semaine."""
+    try:
+        debut = date.fromisoformat(projet['debut_phases'])
+        fin = date.fromisoformat(projet['fin_phases'])
+        duree = (fin - debut).days // 7 + 1
+    except (TypeError, ValueError):
+        duree = math.ceil((projet['duree_estimee_jh'] or 0) / JH_PAR_SEMAINE)
+    return max(1, min(duree, nb_semaines))
+
+
+def proposer_planning(debut, fin, retenus_seulement=False, a_partir_de=None):
+    """
+    Propose une semaine de début pour chaque projet candidat sur la fenêtre [debut, fin].
+    `a_partir_de` (date) interdit les débuts antérieurs à sa semaine.
+    Retourne un dict : calendrier, profils, projets proposés, charge et capacité (profils × semaines).
+    """
+    cal = calendrier(debut, fin)
+    lundis = cal.lundis.tolist()
+    profils = referentiel('profils')
+    profil_ids = [p['id'] for p in profils]
+    ligne_profil = {pid: i for i, pid in enumerate(profil_ids)}
+
+    filtre_retenu = " AND p.retenu = 1" if retenus_seulement else ""
+    projets = query_db(f"""
+        SELECT p.id, p.titre, p.score_wsjf, p.duree_estimee_jh, p.programme_id,
+               MIN(pp.date_debut) AS debut_phases, MAX(pp.date_fin) AS fin_phases
+        FROM projets p
+        LEFT JOIN projet_phases pp ON pp.projet_id = p.id
+        WHERE p.statut IN ({", ".join("?" * len(STATUTS_CANDIDATS))}){filtre_retenu}
+        GROUP BY p.id
+        ORDER BY p.score_wsjf IS NULL, p.score_wsjf DESC, p.created_at
+    """, list(STATUTS_CANDIDATS))
+
+    # Part de chaque profil dans un projet, d'après la répartition des phases de son programme
+    # (pourcentage absent ou nul : même défaut que la charge requise, services/capacite)
+    repartition = [
+        r for r in query_db("""
+            SELECT programme_id, profil_id, SUM(COALESCE(NULLIF(pourcentage, 0), ?)) AS pourcentage
+            FROM phase_profils_programme
+            GROUP BY programme_id, profil_id
+        """, [POURCENTAGE_DEFAUT])
+        if r['profil_id'] in ligne_profil
+    ]
+    programmes = {pid: i for i, pid in enumerate(dict.fromkeys(r['programme_id'] for r in repartition))}
+    parts = np.zeros((len(programmes), len(profil_ids)))
+    for r in repartition:
+        parts[programmes[r['programme_id']], ligne_profil[r['profil_id']]] += r['pourcentage'] / 100
+
+    # Charge déjà engagée : phases des projets en cours qui recoupent la fenêtre
+    en_cours = query_db("""
+        SELECT pp.date_debut, pp.date_fin, p.duree_estimee_jh, pph.pourcentage, pph.profil_id
+        FROM projets p
+        JOIN projet_phases pp ON p.id = pp.projet_id
+        JOIN phase_profils_programme pph ON pp.phase_id = pph.phase_id
+        WHERE p.statut = ? AND pp.date_fin >= ? AND pp.date_debut <= ?
+    """, [STATUT_EN_COURS, lundis[0].isoformat(), (lundis[-1] + timedelta(days=6)).isoformat()])
+    charge_fixe = charge_requise(en_cours, profil_ids, lundis)
+    capacite = capacite_build_profils(profil_ids, lundis)
+
+    planifiables = [p for p in projets if p['programme_id'] in programmes]
+    besoins = np.array([
+        (p['duree_estimee_jh'] or 0) * parts[programmes[p['programme_id']]] for p in planifiables
+    ]).reshape(len(planifiables), len(profil_ids))
+    durees = [_duree_semaines(p, len(lundis)) for p in planifiables]
+
+    semaine_min = 0
+    if a_partir_de is not None:
+        semaine_min = int(np.searchsorted(cal.lundis, np.datetime64(a_partir_de, "D") - 6))
+    debuts, charge = placer(besoins, durees, capacite, charge_fixe, semaine_min)
+
+    propositions = []
+    for p, s, duree, besoin in zip(planifiables, debuts.tolist(), durees, besoins.sum(axis=1).tolist()):
+        propositions.append({
+            'id': p['id'], 'titre': p['titre'], 'score_wsjf': p['score_wsjf'],
+            'duree_semaines': duree, 'charge_jh': besoin,
+            'semaine_debut': cal.labels[s] if s >= 0 else None,
+            'date_debut': lundis[s].isoformat() if s >= 0 else None,
+            'date_fin': (lundis[s + duree - 1] + timedelta(days=6)).isoformat() if s >= 0 else None,
+        })
+    non_planifiables = [
+        {'id': p['id'], 'titre': p['titre'], 'score_wsjf': p['score_wsjf']}
+        for p in projets if p['programme_id'] not in programmes
+    ]
+
+    return {
+        'calendrier': cal,
+        'profils': [{'id': p['id'], 'nom': p['nom']} for p in profils],
+        'propositions': propositions,
+        'sans_repartition': non_planifiables,
+        'charge': charge,
+        'capacite': capacite,
+    }
+
+
+def resultat_json(resultat):
+    """Version sérialisable (JSON) d'un résultat de proposer_planning."""
+    cal = resultat['calendrier']
+    return {
+        'semaines': list(cal.labels),
+        'lundis': [l.isoformat() for l in cal.lundis.tolist()],
+        'profils': resultat['profils'],
+        'propositions': resultat['propositions'],
+        'sans_repartition': resultat['sans_repartition'],
+        'charge': np.round(resultat['charge'], 3).tolist(),
+        'capacite': np.round(resultat['capacite'], 3).tolist(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Proposition de planning WSJF sous contrainte de capacité")
+    aujourd_hui = date.today()
+    parser.add_argument("--debut", type=date.fromisoformat, default=aujourd_hui, help="AAAA-MM-JJ")
+    parser.add_argument("--fin", type=date.fromisoformat, default=aujourd_hui + timedelta(weeks=52), help="AAAA-MM-JJ")
+    parser.add_argument("--retenus", action="store_true", help="ne planifier que les projets retenus")
+    parser.add_argument("--json", action="store_true", help="sortie JSON complète")
+    args = parser.parse_args()
+
+    init_db()
+    resultat = proposer_planning(args.debut, args.fin, args.retenus)
+    if args.json:
+        print(json.dumps(resultat_json(resultat), ensure_ascii=False, indent=2))
+    else:
+        for p in resultat['propositions']:
+            debut = p['semaine_debut'] or "— aucun créneau"
+            print(f"{p['score_wsjf'] or 0:>6}  {debut:<10} {p['duree_semaines']:>3} sem.  {p['charge_jh']:>8.1f} JH  {p['titre']}")
+        for p in resultat['sans_repartition']:
+            print(f"⚠️ sans répartition par profil (programme) : {p['titre']}")
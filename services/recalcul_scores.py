@@ -0,0 +1,144 @@
+# services/recalcul_scores.py
+"""
+Recalcul des scores WSJF des projets importés (Projet.score_wsjf_projet).
+
+score = ROUND(Σ valeur métier × pondération / Σ complexité × pondération, 2), dénominateur nul → 1.
+Le calcul est ensembliste : une seule requête UPDATE … FROM agrège les liens
+valeur_metier_projet / complexite_projet des projets ciblés.
+
+Quand un catalogue change, planifier_recalcul() regroupe les modifications rapprochées
+(DELAI_RECALCUL secondes) en un seul recalcul en arrière-plan, limité aux projets qui
+utilisent une ligne dont le poids a changé. La liste des projets appelle
+recalculer_si_perime() : si le recalcul n'a pas encore eu lieu, il est fait avant l'affichage.
+Ce recalcul automatique ne touche que les scores : udate / uuser restent ceux de la
+dernière modification faite par un utilisateur.
+"""
+import logging
+import threading
+from services.moteur_wsjf import moteur
+from utils.db_utils import query_db, transaction
+from utils.versions import fixer_version
+
+DELAI_RECALCUL = 2.0  # secondes de regroupement des modifications de catalogue
+
+# Somme des versions des catalogues (croissantes) à laquelle correspondent les scores en base
+MARQUEUR = 'score_wsjf_projet'
+
+TABLES_SCORE = ('Projet', 'valeur_metier', 'valeur_metier_projet', 'complexite', 'complexite_projet')
+
+_UPDATE_SCORES = """
+    WITH cibles(id) AS ({selection})
+    UPDATE Projet
+    SET score_wsjf_projet = a.score{audit}
+    FROM (
+        SELECT c.id,
+               ROUND(COALESCE(v.total, 0) * 1.0 / COALESCE(NULLIF(k.total, 0), 1), 2) AS score
+        FROM cibles c
+        LEFT JOIN (
+            SELECT vmp.id_projet, SUM(vm.valeur_libelle * vm.ponderation) AS total
+            FROM valeur_metier_projet vmp
+            JOIN valeur_metier vm ON vm.id = vmp.id_valeur_metier
+            WHERE vmp.id_projet IN (SELECT id FROM cibles)
+            GROUP BY vmp.id_projet
+        ) v ON v.id_projet = c.id
+        LEFT JOIN (
+            SELECT cp.id_projet, SUM(cx.valeur_libelle * cx.ponderation) AS total
+            FROM complexite_projet cp
+            JOIN complexite cx ON cx.id = cp.id_complexite
+            WHERE cp.id_projet IN (SELECT id FROM cibles)
+            GROUP BY cp.id_projet
+        ) k ON k.id_projet = c.id
+    ) a
+    WHERE Projet.id = a.id AND Projet.score_wsjf_projet IS NOT a.score
+"""
+
+# Colonnes d'audit : renseignées pour une écriture faite par un utilisateur (édition, import)
+_AUDIT = ", udate = DATETIME('now'), uuser = 1"
+
+_verrou_calcul = threading.Lock()
+_verrou_minuteur = threading.Lock()
+_minuteur = None
+_reference = None  # moteur correspondant aux scores en base (repérage des lignes modifiées)
+
+
+def _tables_presentes(cur):
+    cur.execute(f"""
+        SELECT COUNT(*) FROM sqlite_master
+        WHERE type = 'table' AND name COLLATE NOCASE IN ({', '.join('?' * len(TABLES_SCORE))})
+    """, TABLES_SCORE)
+    return cur.fetchone()[0] == len(TABLES_SCORE)
+
+
+def recalculer_scores_projets(cur, selection=None, params=(), audit=True):
+    """
+    Recalcule le score des projets dont l'id est renvoyé par la requête `selection`
+    (tous les projets si None), dans la transaction de `cur`. Retourne le nombre de scores modifiés.
+    `audit=False` (recalcul automatique) laisse udate / uuser inchangés.
+    """
+    if not _tables_presentes(cur):
+        return 0
+    # rowcount vaut -1 pour un UPDATE précédé d'un WITH : compter les changements de la connexion
+    avant = cur.connection.total_changes
+    cur.execute(_UPDATE_SCORES.format(selection=selection or "SELECT id FROM Projet",
+                                      audit=_AUDIT if audit else ""), params)
+    return cur.connection.total_changes - avant
+
+
+def _ids_modifies(avant, apres):
+    return [i for i in set(avant) | set(apres) if avant.get(i) != apres.get(i)]
+
+
+def recalculer_si_perime():
+    """
+    Met les scores en base à jour des catalogues si besoin (deux lectures de version sinon).
+    Retourne le nombre de scores modifiés.
+    """
+    global _reference
+    with _verrou_calcul:
+        courant = moteur()
+        cible = sum(courant.versions)
+        # Marqueur absent : scores jamais recalculés en masse → recalcul complet
+        marqueur = query_db("SELECT version FROM cache_version WHERE nom = ?", [MARQUEUR], one=True)
+        fait = marqueur["version"] if marqueur else None
+        if fait == cible:
+            _reference = courant
+            return 0
+
+        with transaction() as cur:
+            if fait is not None and _reference is not None and sum(_reference.versions) == fait:
+                # Seuls les projets liés à une ligne dont le poids a changé sont recalculés
+                ids_valeur = _ids_modifies(_reference.poids_valeur, courant.poids_valeur)
+                ids_complexite = _ids_modifies(_reference.poids_complexite, courant.poids_complexite)
+                modifies = recalculer_scores_projets(cur, """
+                    SELECT id_projet FROM valeur_metier_projet
+                    WHERE id_valeur_metier IN (SELECT value FROM json_each(?))
+                    UNION
+                    SELECT id_projet FROM complexite_projet
+                    WHERE id_complexite IN (SELECT value FROM json_each(?))
+                """, [str(ids_valeur), str(ids_complexite)], audit=False) if ids_valeur or ids_complexite else 0
+            else:
+                modifies = recalculer_scores_projets(cur, audit=False)
+            fixer_version(MARQUEUR, cible, cur)
+        _reference = courant
+        return modifies
+
+
+def _executer():
+    global _minuteur
+    with _verrou_minuteur:
+        _minuteur = None
+    try:
+        nb = recalculer_si_perime()
+        logging.info("[SCORES] %s score(s) WSJF recalculé(s) après modification des catalogues", nb)
+    except Exception:
+        logging.exception("[SCORES] Échec du recalcul des scores WSJF")
+
+
+def planifier_recalcul():
+    """À appeler après une écriture sur un catalogue : un seul recalcul par rafale de modifications."""
+    global _minuteur
+    with _verrou_minuteur:
+        if _minuteur is None:
+            _minuteur = threading.Timer(DELAI_RECALCUL, _executer)
+            _minuteur.daemon = True
+            _minuteur.start()
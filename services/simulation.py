@@ -0,0 +1,138 @@
+# services/simulation.py
+"""
+Simulation « what-if » de la charge pour une sélection de projets (retenu).
+
+Les données de phases et de capacité sont lues une fois dans un instantané en
+mémoire (rafraîchi après SNAPSHOT_TTL secondes ou sur invalidation explicite) ;
+chaque simulation n'est ensuite qu'un calcul vectorisé, sans écriture en base.
+"""
+import threading
+import time
+import numpy as np
+from services.capacite import (
+    calendrier, capacite_build_profils, phases_valides, repartir_par_semaine
+)
+from utils.db_utils import query_db
+from utils.referentiel import lignes as referentiel
+
+SNAPSHOT_TTL = 30  # secondes
+STATUT_EN_COURS = 'En cours'
+EPSILON = 1e-9
+
+_instantane = None
+_verrou = threading.Lock()
+
+
+class _Instantane:
+    """Phases de tous les projets (tableaux numpy) et capacités déjà calculées par fenêtre."""
+
+    def __init__(self):
+        self.cree_le = time.monotonic()
+        self.profils = [{'id': p['id'], 'nom': p['nom']} for p in referentiel('profils')]
+        self._profil_ids = [p['id'] for p in self.profils]
+
+        projets = query_db("SELECT id, statut, retenu FROM projets")
+        self.projets = {p['id']: i for i, p in enumerate(projets)}
+        self.en_cours = np.array([p['statut'] == STATUT_EN_COURS for p in projets], dtype=bool)
+        self.retenus = [p['id'] for p in projets if p['retenu']]
+
+        rows = query_db("""
+            SELECT pp.projet_id, pp.date_debut, pp.date_fin, p.duree_estimee_jh, pph.pourcentage, pph.profil_id
+            FROM projets p
+            JOIN projet_phases pp ON p.id = pp.projet_id
+            JOIN phase_profils_programme pph ON pp.phase_id = pph.phase_id
+        """)
+        self._charger_phases(rows, {pid: i for i, pid in enumerate(self._profil_ids)})
+        self.avec_phases = set(np.unique(self.projet).tolist())
+        self._capacites = {}
+
+    def _charger_phases(self, rows, position):
+        df = phases_valides(rows) if rows else None
+        if df is None or df.empty:
+            self.projet = np.zeros(0, dtype=np.int64)
+            self.ligne = np.zeros(0, dtype=np.int64)
+            self.debut = np.zeros(0, dtype="datetime64[D]")
+            self.fin = np.zeros(0, dtype="datetime64[D]")
+            self.charge = np.zeros(0)
+            return
+        projet_ids = np.array([self.projets.get(r['projet_id'], -1) for r in rows], dtype=np.int64)
+        df = df.assign(projet=projet_ids[df.index.to_numpy()], ligne=df["profil_id"].map(position))
+        df = df[(df["projet"] >= 0)].dropna(subset=["ligne"])
+        self.projet = df["projet"].to_numpy(dtype=np.int64)
+        self.ligne = df["ligne"].to_numpy(dtype=np.int64)
+        self.debut = df["debut"].to_numpy(dtype="datetime64[D]")
+        self.fin = df["fin"].to_numpy(dtype="datetime64[D]")
+        self.charge = df["charge"].to_numpy()
+
+    def capacite(self, cal):
+        """Capacité BUILD par profil sur la fenêtre du calendrier (mise en cache)."""
+        cle = (cal.lundis[0].item(), len(cal.lundis))
+        if cle not in self._capacites:
+            self._capacites[cle] = capacite_build_profils(self._profil_ids, cal.lundis.tolist())
+        return self._capacites[cle]
+
+
+def instantane():
+    """Instantané courant, reconstruit s'il est absent ou trop ancien."""
+    global _instantane
+    with _verrou:
+        if _instantane is None or time.monotonic() - _instantane.cree_le > SNAPSHOT_TTL:
+            _instantane = _Instantane()
+        return _instantane
+
+
+def invalider():
+    """À appeler après une écriture sur les projets, phases ou capacités."""
+    global _instantane
+    with _verrou:
+        _instantane = None
+
+
+def simuler(debut, fin, projet_ids=None, decalages=None):
+    """
+    Charge par profil et par semaine si les projets `projet_ids` (défaut : les retenus)
+    sont réalisés, en plus des projets en cours ; `decalages` = {projet_id: semaines}
+    décale les phases d'un projet. Retourne un dict sérialisable en JSON.
+    """
+    snap = instantane()
+    cal = calendrier(debut, fin)
+    lundis = cal.lundis
+    decalages = decalages or {}
+    if projet_ids is None:
+        projet_ids = snap.retenus
+
+    inconnus = [pid for pid in list(projet_ids) + list(decalages) if pid not in snap.projets]
+    selection = np.zeros(len(snap.projets), dtype=bool)
+    selection[[snap.projets[pid] for pid in projet_ids if pid in snap.projets]] = True
+    decalage = np.zeros(len(snap.projets), dtype=np.int64)
+    for pid, semaines in decalages.items():
+        if pid in snap.projets:
+            decalage[snap.projets[pid]] = int(semaines)
+
+    # Phases retenues : la sélection plus les projets en cours, décalées semaine par semaine
+    garde = (selection | snap.en_cours)[snap.projet]
+    jours = 7 * decalage[snap.projet[garde]]
+    charge = repartir_par_semaine(
+        snap.ligne[garde], snap.debut[garde] + jours, snap.fin[garde] + jours,
+        snap.charge[garde], len(snap.profils), lundis[0], len(lundis)
+    )
+    capacite = snap.capacite(cal)
+
+    i, j = np.nonzero(charge > capacite + EPSILON)
+    surcharges = [
+        {'profil': snap.profils[a]['nom'], 'semaine': cal.labels[b],
+         'lundi': str(lundis[b]), 'charge': round(float(charge[a, b]), 3), 'capacite': round(float(capacite[a, b]), 3)}
+        for a, b in zip(i.tolist(), j.tolist())
+    ]
+    return {
+        'semaines': list(cal.labels),
+        'lundis': [str(l) for l in lundis],
+        'profils': snap.profils,
+        'charge': np.round(charge, 3).tolist(),
+        'capacite': np.round(capacite, 3).tolist(),
+        'surcharges': surcharges,
+        'projets_inconnus': inconnus,
+        'projets_sans_phases': [pid for pid in projet_ids
+                                if pid in snap.projets and snap.projets[pid] not in snap.avec_phases],
+        'instantane_age': round(time.monotonic() - snap.cree_le, 1),
+    }
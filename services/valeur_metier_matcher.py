@@ -0,0 +1,83 @@
+# services/valeur_metier_matcher.py
+from difflib import SequenceMatcher
+
+
+class ValeurMetierMatcher:
+    """
+    Index de correspondance (libellé, type, valeur) → id de valeur métier,
+    construit une seule fois par import à partir du catalogue normalisé.
+
+    - Recherche exacte : tables de hachage, avec « joker » quand le type ou
+      la valeur lue dans l'Excel est vide.
+    - Recherche floue : seuls les libellés candidats proches sont examinés,
+      et un pré-filtre (bornes de longueur, quick_ratio) évite la plupart des
+      appels coûteux à SequenceMatcher.ratio().
+
+    À résultat égal, la première ligne du catalogue l'emporte (même ordre
+    que le parcours ligne à ligne d'origine).
+    """
+
+    def __init__(self, lignes, seuil=0.9):
+        """`lignes` : itérable de (id, libelle, type_libelle, valeur_libelle) déjà normalisés."""
+        self.seuil = seuil
+        self._exact = {}
+        self._par_lib_type = {}
+        self._par_lib_val = {}
+        self._par_libelle = {}
+        for rang, (id_vm, lib, type_lib, val) in enumerate(lignes):
+            id_vm = int(id_vm)
+            self._exact.setdefault((lib, type_lib, val), id_vm)
+            self._par_lib_type.setdefault((lib, type_lib), id_vm)
+            self._par_lib_val.setdefault((lib, val), id_vm)
+            self._par_libelle.setdefault(lib, []).append((rang, id_vm, type_lib, val))
+        self._candidats = {}
+        self._resultats = {}
+
+    def trouver(self, lib_n, type_n, val_n):
+        """Retourne l'id de la valeur métier correspondante, ou None."""
+        cle = (lib_n, type_n, val_n)
+        if cle not in self._resultats:
+            id_vm = self._recherche_exacte(lib_n, type_n, val_n)
+            if id_vm is None:
+                id_vm = self._recherche_floue(lib_n, type_n, val_n)
+            self._resultats[cle] = id_vm
+        return self._resultats[cle]
+
+    def _recherche_exacte(self, lib_n, type_n, val_n):
+        if type_n and val_n:
+            return self._exact.get((lib_n, type_n, val_n))
+        if type_n:
+            return self._par_lib_type.get((lib_n, type_n))
+        if val_n:
+            return self._par_lib_val.get((lib_n, val_n))
+        lignes = self._par_libelle.get(lib_n)
+        return lignes[0][1] if lignes else None
+
+    def _recherche_floue(self, lib_n, type_n, val_n):
+        for _, id_vm, type_lib, val in self._lignes_candidates(lib_n):
+            if (not type_n or self._proche(type_lib, type_n)) and (not val_n or self._proche(val, val_n)):
+                return id_vm
+        return None
+
+    def _lignes_candidates(self, lib_n):
+        """Lignes des libellés proches de `lib_n`, dans l'ordre du catalogue (mis en cache)."""
+        if lib_n not in self._candidats:
+            lignes = []
+            for lib, lignes_lib in self._par_libelle.items():
+                if self._proche(lib, lib_n):
+                    lignes.extend(lignes_lib)
+            lignes.sort()
+            self._candidats[lib_n] = lignes
+        return self._candidats[lib_n]
+
+    def _proche(self, a, b):
+        """Équivalent de `similar(a, b, seuil)` avec pré-filtres bon marché."""
+        if not a or not b:
+            return False
+        if a == b:
+            return True
+        la, lb = len(a), len(b)
+        if 2.0 * min(la, lb) / (la + lb) < self.seuil:
+            return False
+        sm = SequenceMatcher(None, a, b)
+        return sm.quick_ratio() >= self.seuil and sm.ratio() >= self.seuil
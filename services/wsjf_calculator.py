@@ -1,4 +1,24 @@
 # services/wsjf_calculator.py
+"""
+Calcul du score WSJF : valeur métier (numérateur) / coût d'implémentation (dénominateur).
+
+Les points viennent du moteur compilé (services/moteur_wsjf) : POINTS_CONFIG, surchargé
+par les lignes des catalogues valeur_metier / complexite désignées par CHAMPS_CATALOGUE.
+
+- calculate_wsjf(form_data) : un formulaire à la fois (saisie d'un projet)
+- calculate_wsjf_batch(donnees) : tout un lot (DataFrame ou liste d'enregistrements), vectorisé
+- rescorer_projets() : recalcule score et complexité de tous les projets (JH si absents) en une transaction
+
+Usage en ligne de commande :
+    python -m services.wsjf_calculator --rescorer
+"""
+import argparse
+import numpy as np
+import pandas as pd
+from services.charge_hebdo import ajouter_charge_projet, retirer_charge_projet
+from services.moteur_wsjf import moteur
+from services.simulation import invalider as invalider_simulation
+from utils.db_utils import init_db, transaction
 
 POINTS_CONFIG = {
     # Champs du numérateur (Valeur métier)
@@ -27,20 +47,56 @@ POINTS_CONFIG = {
     'q10': {'evolution_systeme': 2, 'integration_partenaire': 13, 'creation_nouveau': 21}
 }
 
+# Champ de formulaire → (catalogue, libellé de la ligne de catalogue) : une réponse est remplacée
+# par la ligne de ce libellé dont le type_libelle est le code de la réponse (après normalize_text)
+CHAMPS_CATALOGUE = {
+    'alignement_strategic': ('valeur_metier', 'alignement strategic'),
+    'impact_pnb': ('valeur_metier', 'impact pnb'),
+    'impact_satisfaction': ('valeur_metier', 'impact satisfaction'),
+    'conquerir_client': ('valeur_metier', 'conquerir client'),
+    'maitrise_couts': ('valeur_metier', 'maitrise couts'),
+    'attenuation_menaces': ('valeur_metier', 'attenuation menaces'),
+    'creation_opportunites': ('valeur_metier', 'creation opportunites'),
+    'conditions_techniques': ('valeur_metier', 'conditions techniques'),
+    'deadline_reglementaire': ('valeur_metier', 'deadline reglementaire'),
+    'pression_concurrence': ('valeur_metier', 'pression concurrence'),
+    'echeances_strategiques': ('valeur_metier', 'echeances strategiques'),
+    'dependances_projets': ('valeur_metier', 'dependances projets'),
+    'urgence_obsolescence': ('valeur_metier', 'urgence obsolescence'),
+    'q1': ('complexite', 'q1'),
+    'q3': ('complexite', 'q3'),
+    'q4': ('complexite', 'q4'),
+    'q5': ('complexite', 'q5'),
+    'q6': ('complexite', 'q6'),
+    'q7': ('complexite', 'q7'),
+    'q8': ('complexite', 'q8'),
+    'q9': ('complexite', 'q9'),
+    'q10': ('complexite', 'q10'),
+}
+
+# Liste des champs numérateur (Valeur métier)
+NUMERATEUR_FIELDS = [
+    'alignement_strategic', 'impact_pnb', 'impact_satisfaction',
+    'conquerir_client', 'maitrise_couts', 'attenuation_menaces',
+    'creation_opportunites', 'conditions_techniques', 'deadline_reglementaire',
+    'pression_concurrence', 'echeances_strategiques', 'urgence_obsolescence'
+]
+
+# Liste des champs dénominateur (Complexité / Coût d'implémentation) ; q2 est un nombre saisi
+DENOMINATEUR_FIELDS = ['q1', 'q2', 'q3', 'q4', 'q5', 'q6', 'q7', 'q8', 'q9', 'q10']
+
+# Estimation en Jours-Homme selon la complexité (1 = faible, 2 = moyenne, 3 = élevée)
+JH_PAR_COMPLEXITE = {1: 20, 2: 40, 3: 60}
+
+
 def calculate_wsjf(form_data):
-    # Liste des champs numérateur (Valeur métier)
-    numerateur_fields = [
-        'alignement_strategic', 'impact_pnb', 'impact_satisfaction',
-        'conquerir_client', 'maitrise_couts', 'attenuation_menaces',
-        'creation_opportunites', 'conditions_techniques', 'deadline_reglementaire',
-        'pression_concurrence', 'echeances_strategiques', 'urgence_obsolescence'
-    ]
+    numerateur_fields, denominateur_fields = NUMERATEUR_FIELDS, DENOMINATEUR_FIELDS
 
-    # Liste des champs dénominateur (Complexité / Coût d'implémentation)
-    denominateur_fields = ['q1', 'q2', 'q3', 'q4', 'q5', 'q6', 'q7', 'q8', 'q9', 'q10']
+    # Barème compilé (POINTS_CONFIG surchargé par les catalogues valeur_metier / complexite)
+    bareme = moteur()
 
     # Calcul du numérateur
-    numerateur = sum(POINTS_CONFIG[field].get(form_data.get(field, ''), 0) for field in numerateur_fields)
+    numerateur = sum(bareme.points(field, form_data.get(field, '')) for field in numerateur_fields)
 
     # Calcul du dénominateur
     denominateur = 0
@@ -51,7 +107,7 @@ def calculate_wsjf(form_data):
             except ValueError:
                 denominateur += 0
         else:
-            denominateur += POINTS_CONFIG[field].get(form_data.get(field, ''), 0)
+            denominateur += bareme.points(field, form_data.get(field, ''))
 
     # Éviter la division par zéro
     wsjf = numerateur * 2 / denominateur if denominateur != 0 else 0
@@ -70,15 +126,117 @@ def calculate_wsjf(form_data):
     complexite = get_complexite_label(complexite_score)
 
     # Estimation en Jours-Homme selon la complexité
-    jh_estime = {
-        1: 20,
-        2: 40,
-        3: 60
-    }.get(complexite, 30)
+    jh_estime = JH_PAR_COMPLEXITE.get(complexite, 30)
 
     return {
         'score_wsjf': round(wsjf, 2),
         'complexite_score': complexite_score,
         'complexite': complexite,
         'jh_estime': jh_estime
-    }
\ No newline at end of file
+    }
+
+
+# ===============================
+# 🧮 CALCUL PAR LOT (VECTORISÉ)
+# ===============================
+def _points(colonne, table):
+    categories, points = table
+    return points[pd.Categorical(colonne, categories=categories).codes]
+
+
+def _entiers(colonne):
+    """Équivalent vectorisé de int(valeur) avec 0 en cas d'échec (champ q2)."""
+    if pd.api.types.is_numeric_dtype(colonne):
+        return pd.to_numeric(colonne, errors="coerce").fillna(0).astype(np.int64).to_numpy()
+    texte = colonne.astype(str).str.strip()
+    valide = texte.str.fullmatch(r"[+-]?\d+").fillna(False).to_numpy(dtype=bool)
+    valeurs = np.zeros(len(texte), dtype=np.int64)
+    valeurs[valide] = texte[valide].astype(np.int64).to_numpy()
+    return valeurs
+
+
+def calculate_wsjf_batch(donnees):
+    """
+    Même calcul que calculate_wsjf pour un lot de projets.
+    `donnees` : DataFrame ou liste de dicts portant les champs de NUMERATEUR_FIELDS et q1 … q10
+    (les colonnes absentes valent 0 point). Retourne un dict de tableaux numpy alignés sur les lignes :
+    score_wsjf, complexite_score, complexite, jh_estime.
+    """
+    df = donnees if isinstance(donnees, pd.DataFrame) else pd.DataFrame.from_records(list(donnees))
+    n = len(df)
+    vide = pd.Series([None] * n, index=df.index, dtype=object)
+    tables = moteur().tables
+
+    numerateur = np.zeros(n)
+    for champ in NUMERATEUR_FIELDS:
+        numerateur += _points(df.get(champ, vide), tables[champ])
+
+    denominateur = np.zeros(n)
+    for champ in DENOMINATEUR_FIELDS:
+        colonne = df.get(champ, vide)
+        denominateur += _entiers(colonne) if champ == 'q2' else _points(colonne, tables[champ])
+
+    score = np.divide(numerateur * 2, denominateur, out=np.zeros(n), where=denominateur != 0)
+    complexite = np.where(denominateur < 50, 1, np.where(denominateur <= 100, 2, 3))
+    jh = np.array([JH_PAR_COMPLEXITE[c] for c in (1, 2, 3)])[complexite - 1]
+    # round() natif : np.round (x × 100) ne tranche pas les cas limites comme la saisie unitaire
+    score_arrondi = np.array([round(x, 2) for x in score.tolist()], dtype=float)
+
+    return {
+        'score_wsjf': score_arrondi,
+        'complexite_score': denominateur,
+        'complexite': complexite,
+        'jh_estime': jh,
+    }
+
+
+def rescorer_projets(conn=None):
+    """
+    Recalcule score_wsjf et complexite de tous les projets (barème actuel du moteur) en une seule
+    transaction. duree_estimee_jh peut avoir été ajustée à la main : elle n'est renseignée que si
+    elle est vide (NULL ou 0), et seule la charge de ces projets est reportée dans charge_hebdo.
+    Retourne le nombre de projets modifiés.
+    """
+    colonnes = ['id', 'score_wsjf', 'complexite', 'duree_estimee_jh'] + NUMERATEUR_FIELDS + DENOMINATEUR_FIELDS
+    with transaction(conn) as cur:
+        rows = cur.execute(f"SELECT {', '.join(colonnes)} FROM projets").fetchall()
+        if not rows:
+            return 0
+        df = pd.DataFrame.from_records(rows, columns=colonnes)
+        resultats = calculate_wsjf_batch(df)
+
+        anciens = df[['score_wsjf', 'complexite']].apply(pd.to_numeric, errors="coerce")
+        scores_modifies = ~(
+            np.isclose(anciens['score_wsjf'], resultats['score_wsjf'])
+            & np.isclose(anciens['complexite'], resultats['complexite'])
+        )
+        # 0 est la valeur par défaut de la colonne : durée jamais estimée
+        duree = pd.to_numeric(df['duree_estimee_jh'], errors="coerce")
+        sans_duree = (duree.isna() | (duree == 0)).to_numpy()
+
+        cur.executemany(
+            "UPDATE projets SET score_wsjf = ?, complexite = ? WHERE id = ?",
+            zip(resultats['score_wsjf'][scores_modifies].tolist(),
+                resultats['complexite'][scores_modifies].tolist(),
+                df['id'][scores_modifies].tolist())
+        )
+        # La durée estimée alimente la charge requise : report projet par projet dans charge_hebdo
+        for projet_id, jh in zip(df['id'][sans_duree].tolist(), resultats['jh_estime'][sans_duree].tolist()):
+            retirer_charge_projet(cur, projet_id)
+            cur.execute("UPDATE projets SET duree_estimee_jh = ? WHERE id = ?", [jh, projet_id])
+            ajouter_charge_projet(cur, projet_id)
+
+    modifies = scores_modifies | sans_duree
+    if modifies.any():
+        invalider_simulation()
+    return int(modifies.sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calcul WSJF par lot")
+    parser.add_argument("--rescorer", action="store_true", required=True,
+                        help="recalculer score et complexité de tous les projets")
+    args = parser.parse_args()
+
+    init_db()
+    print(f"✅ {rescorer_projets()} projet(s) rescoré(s).")
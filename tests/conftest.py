@@ -0,0 +1,45 @@
+# tests/conftest.py
+import os
+import sqlite3
+import sys
+import pytest
+
+# Les modules de l'application s'importent depuis la racine du dépôt (python -m pytest ou pytest)
+RACINE = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RACINE)
+
+# Tables présentes en production mais créées hors des scripts de schéma
+TABLES_HORS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Phase (id INTEGER PRIMARY KEY AUTOINCREMENT, nom TEXT,
+                                  idate DATE, iuser INTEGER, uuser INTEGER, udate DATE);
+CREATE TABLE IF NOT EXISTS Statut (id INTEGER PRIMARY KEY AUTOINCREMENT, nom TEXT,
+                                   idate DATE, iuser INTEGER, uuser INTEGER, udate DATE);
+CREATE TABLE IF NOT EXISTS projet_phases (id INTEGER PRIMARY KEY AUTOINCREMENT, projet_id TEXT,
+                                          phase_id INTEGER, date_debut DATE, date_fin DATE);
+"""
+
+
+@pytest.fixture
+def base(tmp_path, monkeypatch):
+    """Base SQLite temporaire au schéma complet (init_db.py + tables hors schéma + init_db de l'application)."""
+    import init_db as schema
+    import routes.complexite_routes as complexite_routes
+    import services.moteur_wsjf as moteur_wsjf
+    import utils.db_utils as db_utils
+    import utils.pagination as pagination
+    import utils.referentiel as referentiel
+
+    chemin = str(tmp_path / "projets.db")
+    db_utils.pool.fermer_tout()
+    monkeypatch.setattr(db_utils, "DB_PATH", chemin)
+    # Les versions repartent de zéro dans chaque base : aucun cache rempli sur une autre base
+    monkeypatch.setattr(moteur_wsjf, "_moteur", None)
+    monkeypatch.setattr(complexite_routes, "_arbre", None)
+    monkeypatch.setattr(referentiel, "_cache", {})
+    monkeypatch.setattr(pagination, "_comptes", pagination.OrderedDict())
+    with sqlite3.connect(chemin) as conn:
+        conn.executescript(schema.SCHEMA)
+        conn.executescript(TABLES_HORS_SCHEMA)
+    db_utils.init_db()
+    yield chemin
+    db_utils.pool.fermer_tout()
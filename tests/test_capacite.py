@@ -0,0 +1,38 @@
+# tests/test_capacite.py
+from datetime import date, timedelta
+import pytest
+from services.capacite import capacite_disponible, semaines_du_mois, semaines_iso
+
+
+@pytest.mark.parametrize("annee", range(2020, 2031))
+def test_semaines_du_mois_couvre_chaque_semaine_iso_une_fois(annee):
+    lundis = [lundi for _, lundi, _, _ in semaines_iso(annee)]
+    index = semaines_du_mois(lundis)
+
+    # Chaque semaine ISO de l'année a exactement une clé (annee, mois, rang)
+    assert sorted(index.values()) == list(range(len(lundis)))
+    for (a, mois, rang), j in index.items():
+        jeudi = lundis[j] + timedelta(days=3)
+        assert (a, mois) == (jeudi.year, jeudi.month)
+    # Rangs consécutifs à partir de 1 dans chaque mois
+    for mois in range(1, 13):
+        rangs = sorted(r for a, m, r in index if (a, m) == (annee, mois))
+        assert rangs == list(range(1, len(rangs) + 1))
+
+
+def test_semaines_du_mois_janvier_2024():
+    lundis = [lundi for _, lundi, _, _ in semaines_iso(2024)]
+    index = semaines_du_mois(lundis)
+    assert lundis[index[(2024, 1, 1)]] == date(2024, 1, 1)
+    assert lundis[index[(2024, 2, 1)]] == date(2024, 1, 29)  # jeudi 1er février
+
+
+def test_disponibilite_hebdomadaire_dans_la_bonne_semaine():
+    lundis = [lundi for _, lundi, _, _ in semaines_iso(2024)]
+    collaborateurs = [{"matricule": "M1", "build_ratio": None, "run_ratio": None,
+                       "profil_build_ratio": None, "profil_run_ratio": None,
+                       "caf_disponible_build": None, "caf_disponible_run": None}]
+    disponibilites = [("semaine", "M1", 2024, 1, "S1", 2.0), ("semaine", "M1", 2024, 2, "S1", 3.0)]
+    total, _, _ = capacite_disponible(collaborateurs, disponibilites, lundis)
+    assert total[0, 0] == 2.0   # S1 de janvier : semaine du 1er janvier
+    assert total[0, 4] == 3.0   # S1 de février : semaine du 29 janvier
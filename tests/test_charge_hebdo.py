@@ -0,0 +1,40 @@
+# tests/test_charge_hebdo.py
+import sqlite3
+from datetime import date, timedelta
+import pytest
+from services.charge_hebdo import charge_semaines, verifier
+
+LUNDIS = [date(2026, 1, 5) + timedelta(weeks=i) for i in range(4)]
+
+
+def _portefeuille(chemin):
+    with sqlite3.connect(chemin) as conn:
+        conn.executescript("""
+            INSERT INTO profils (id, nom) VALUES (1, 'Dev'), (2, 'QA');
+            INSERT INTO programmes (id, nom) VALUES (1, 'P');
+            INSERT INTO phases (id, programme_id, nom) VALUES (1, 1, 'Build');
+            INSERT INTO phase_profils_programme (programme_id, phase_id, profil_id, pourcentage)
+            VALUES (1, 1, 1, 60), (1, 1, 2, 40);
+            INSERT INTO projets (id, titre, statut, duree_estimee_jh, programme_id)
+            VALUES ('x', 'X', 'En cours', 100, 1);
+            INSERT INTO projet_phases (projet_id, phase_id, date_debut, date_fin)
+            VALUES ('x', 1, '2026-01-05', '2026-02-01');
+        """)
+
+
+def test_remplie_apres_creation_des_phases(base):
+    # Phases saisies après init_db : la table vide est remplie à la première lecture
+    _portefeuille(base)
+    assert charge_semaines([1, 2], LUNDIS).sum(axis=1).tolist() == pytest.approx([60.0, 40.0])
+    assert verifier() == []
+
+
+def test_reconstruite_quand_la_repartition_change(base):
+    _portefeuille(base)
+    charge_semaines([1, 2], LUNDIS)
+    # Écriture hors application (connexion SQLite simple) : signalée par les triggers
+    with sqlite3.connect(base) as conn:
+        conn.execute("UPDATE phase_profils_programme SET pourcentage = 90 WHERE profil_id = 1")
+        conn.execute("DELETE FROM phase_profils_programme WHERE profil_id = 2")
+    assert charge_semaines([1, 2], LUNDIS).sum(axis=1).tolist() == pytest.approx([90.0, 0.0])
+    assert verifier() == []
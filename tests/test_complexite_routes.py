@@ -0,0 +1,72 @@
+# tests/test_complexite_routes.py
+import sqlite3
+import pytest
+
+
+@pytest.fixture
+def client(base, monkeypatch):
+    import routes.complexite_routes as complexite_routes
+    from app import app
+
+    # Pas de recalcul différé des scores (minuteur) pendant les tests
+    monkeypatch.setattr(complexite_routes, "planifier_recalcul", lambda: None)
+    app.config["TESTING"] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = {"id": "1", "username": "test", "role": "admin"}
+    return client
+
+
+def _catalogue(chemin):
+    with sqlite3.connect(chemin) as conn:
+        conn.executescript("""
+            INSERT INTO Projet (id, ref_opg, titre_projet) VALUES (1, 100, 'P1'), (2, 200, 'P2');
+            INSERT INTO complexite (id, libelle, type_libelle, valeur_libelle, ponderation)
+            VALUES (1, 'taille', 'petit', 1, 2), (2, 'delai', 'court', 1, 2), (3, 'risque', 'faible', 1, 2);
+            INSERT INTO complexite_projet (id_projet, id_complexite, libelle)
+            VALUES (1, 1, 'taille'), (1, 2, 'delai'), (2, 3, 'risque');
+        """)
+
+
+def _modifier(client, id_complexite, libelle):
+    return client.post(f"/complexite/modifier/{id_complexite}", data={
+        "libelle": libelle, "type_libelle": "t", "valeur_libelle": "1", "ponderation": "2",
+    })
+
+
+def _libelles(chemin):
+    with sqlite3.connect(chemin) as conn:
+        return (dict(conn.execute("SELECT id, libelle FROM complexite")),
+                sorted(conn.execute("SELECT id_projet, id_complexite, libelle FROM complexite_projet")))
+
+
+def test_libelle_deja_pris_par_un_projet_refuse(client, base):
+    _catalogue(base)
+    avant = _libelles(base)
+    reponse = _modifier(client, 2, "taille")
+    assert reponse.status_code == 302
+    assert _libelles(base) == avant
+    with client.session_transaction() as session:
+        assert any("modification refusée" in message for _, message in session["_flashes"])
+
+
+def test_libelle_libre_reporte_sur_les_projets(client, base):
+    _catalogue(base)
+    # Le projet 1 n'a pas de complexité « risque » : renommage accepté
+    _modifier(client, 2, "risque")
+    catalogue, liens = _libelles(base)
+    assert catalogue[2] == "risque"
+    assert liens == [(1, 1, "taille"), (1, 2, "risque"), (2, 3, "risque")]
+
+
+def test_libelle_sans_type_garde_dans_la_cascade(client, base):
+    with sqlite3.connect(base) as conn:
+        conn.executescript("""
+            INSERT INTO complexite (libelle, type_libelle, valeur_libelle, ponderation)
+            VALUES ('taille', 'petit', 1, 2), ('taille', 'grand', 3, 2), ('interfaces', NULL, NULL, 1);
+        """)
+    assert client.get("/complexite/get_libelles").get_json() == {"libelles": ["interfaces", "taille"]}
+    assert client.get("/complexite/get_types/interfaces").get_json() == {"types": []}
+    assert client.get("/complexite/arbre").get_json()["libelles"] == {
+        "interfaces": {}, "taille": {"grand": [3], "petit": [1]},
+    }
@@ -0,0 +1,28 @@
+# tests/test_db_utils.py
+import logging
+from flask import Flask
+import utils.db_utils as db_utils
+
+
+def test_site_de_get_db_releve_une_seule_fois(base, monkeypatch):
+    appels = []
+    site_appel = db_utils._site_appel
+    monkeypatch.setattr(db_utils, "_site_appel", lambda: appels.append(1) or site_appel())
+
+    app = Flask(__name__)
+    db_utils.init_app(app)
+    with app.app_context():
+        for _ in range(5):
+            db_utils.get_db().execute("SELECT 1")
+    assert len(appels) == 1
+
+
+def test_fuite_signalee_avec_le_site_d_ouverture(base, caplog):
+    app = Flask(__name__)
+    db_utils.init_app(app)
+    with caplog.at_level(logging.WARNING, logger=db_utils.logger.name):
+        with app.app_context():
+            conn = db_utils.get_connection()
+    assert id(conn) not in db_utils._connexions_ouvertes
+    (message,) = [r.getMessage() for r in caplog.records if "Fuite" in r.getMessage()]
+    assert f"{__file__}:" in message and "test_fuite_signalee_avec_le_site_d_ouverture" in message
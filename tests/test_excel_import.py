@@ -0,0 +1,22 @@
+# tests/test_excel_import.py
+from datetime import date, datetime
+from services.excel_import import _date_mep
+
+
+def test_date_mep_cellule_date():
+    assert _date_mep(datetime(2026, 3, 31, 0, 0)) == "2026-03-31"
+    assert _date_mep(date(2026, 3, 31), serie_excel=True) == "2026-03-31"
+
+
+def test_date_mep_numero_de_serie_xlsb():
+    assert _date_mep(46112, serie_excel=True) == "2026-03-31"
+    assert _date_mep(46112.0, serie_excel=True) == "2026-03-31"
+
+
+def test_date_mep_nombre_hors_xlsb_garde_en_texte():
+    # Un classeur .xlsx type ses dates : un nombre (année, référence…) n'est pas une date
+    assert _date_mep(2026) == "2026"
+    assert _date_mep(46112.0) == "46112.0"
+    assert _date_mep(" T2 2026 ") == "T2 2026"
+    assert _date_mep(None) is None
+    assert _date_mep(float("nan")) is None
@@ -0,0 +1,53 @@
+# tests/test_import_jobs.py
+import sqlite3
+from services.excel_import import MODE_COMPLET
+from services.import_jobs import _executer, etat_job, marquer_jobs_interrompus
+
+
+def test_jobs_interrompus_marques_en_erreur(base, tmp_path):
+    fichiers = {statut: tmp_path / f"{statut}.xlsx" for statut in ("en_attente", "en_cours", "termine")}
+    with sqlite3.connect(base) as conn:
+        for statut, fichier in fichiers.items():
+            fichier.write_bytes(b"x")
+            conn.execute("INSERT INTO import_jobs (id, fichier, statut) VALUES (?, ?, ?)",
+                         [statut, str(fichier), statut])
+
+    assert marquer_jobs_interrompus() == 2
+    assert [etat_job(j)["statut"] for j in ("en_attente", "en_cours", "termine")] == ["erreur", "erreur", "termine"]
+    assert [f.exists() for f in fichiers.values()] == [False, False, True]
+    assert marquer_jobs_interrompus() == 0
+
+
+def test_fichier_supprime_en_fin_de_job(base, tmp_path):
+    fichier = tmp_path / "illisible.xlsx"
+    fichier.write_bytes(b"pas un classeur")
+    with sqlite3.connect(base) as conn:
+        conn.execute("INSERT INTO import_jobs (id, fichier) VALUES ('j', ?)", [str(fichier)])
+
+    _executer("j", str(fichier), str(tmp_path / "debug.txt"), MODE_COMPLET, False)
+    assert etat_job("j")["statut"] == "erreur"
+    assert not fichier.exists()
+
+
+def test_echec_du_passage_en_cours(base, tmp_path, monkeypatch):
+    import services.import_jobs as import_jobs
+
+    fichier = tmp_path / "a.xlsx"
+    fichier.write_bytes(b"x")
+    with sqlite3.connect(base) as conn:
+        conn.execute("INSERT INTO import_jobs (id, fichier) VALUES ('j', ?)", [str(fichier)])
+
+    execute_db = import_jobs.execute_db
+
+    def execute_db_en_echec(requete, args=()):
+        if "'en_cours'" in requete:
+            raise sqlite3.OperationalError("database is locked")
+        return execute_db(requete, args)
+
+    monkeypatch.setattr(import_jobs, "execute_db", execute_db_en_echec)
+    # Exécuté par le worker, comme en production : aucune exception ne doit rester dans le Future
+    import_jobs._executor.submit(_executer, "j", str(fichier), str(tmp_path / "debug.txt"),
+                                 MODE_COMPLET, False).result()
+    etat = etat_job("j")
+    assert (etat["statut"], etat["message"]) == ("erreur", "database is locked")
+    assert not fichier.exists()
@@ -0,0 +1,67 @@
+# tests/test_migrations.py
+import sqlite3
+from utils.migrations import MIGRATIONS, REQUETES_CONTROLEES, verifier_plans, version_schema
+
+
+def test_schema_a_jour(base):
+    with sqlite3.connect(base) as conn:
+        assert version_schema(conn) == MIGRATIONS[-1][0]
+
+
+def test_plans_utilisent_les_index(base):
+    conn = sqlite3.connect(base)
+    try:
+        resultats = verifier_plans(conn)
+    finally:
+        conn.close()
+    assert len(resultats) == len(REQUETES_CONTROLEES)
+    echecs = [(description, statut, plan) for description, statut, plan in resultats if statut != "ok"]
+    assert not echecs, echecs
+
+
+def _etat(chemin):
+    with sqlite3.connect(chemin) as conn:
+        colonnes = lambda table: {c[1] for c in conn.execute(f"PRAGMA table_info({table})")}
+        index = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return ("empreinte" in colonnes("Projet"), "libelle" in colonnes("complexite_projet"),
+                "ux_complexite_projet_libelle" in index, "fts_projet" in tables, version_schema(conn))
+
+
+def _base_application(tmp_path, monkeypatch):
+    """Base créée par l'application seule (init_db de utils.db_utils), avant init_db.py."""
+    import utils.db_utils as db_utils
+
+    chemin = str(tmp_path / "projets.db")
+    db_utils.pool.fermer_tout()
+    monkeypatch.setattr(db_utils, "DB_PATH", chemin)
+    db_utils.init_db()
+    return chemin
+
+
+def test_init_db_script_apres_l_application(tmp_path, monkeypatch):
+    import init_db as schema
+    import utils.db_utils as db_utils
+
+    chemin = _base_application(tmp_path, monkeypatch)
+    monkeypatch.setattr(schema, "DB_PATH", chemin)
+    schema.init_db()
+    assert _etat(chemin) == (True, True, True, True, MIGRATIONS[-1][0])
+    db_utils.pool.fermer_tout()
+
+
+def test_tables_creees_apres_coup_rattrapees_au_demarrage(tmp_path, monkeypatch):
+    import init_db as schema
+    import utils.db_utils as db_utils
+
+    chemin = _base_application(tmp_path, monkeypatch)
+    # Tables créées hors application et hors migrations (outil externe)
+    with sqlite3.connect(chemin) as conn:
+        conn.executescript(schema.SCHEMA)
+    assert _etat(chemin)[:4] == (False, False, False, False)
+
+    db_utils.init_db()
+    assert _etat(chemin) == (True, True, True, True, MIGRATIONS[-1][0])
+    with sqlite3.connect(chemin) as conn:
+        assert all(statut == "ok" for _, statut, _ in verifier_plans(conn) if statut != "ignorée")
+    db_utils.pool.fermer_tout()
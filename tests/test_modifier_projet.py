@@ -0,0 +1,70 @@
+# tests/test_modifier_projet.py
+import sqlite3
+import pytest
+
+
+@pytest.fixture
+def client(base, monkeypatch):
+    import utils.db_utils as db_utils
+    from app import app
+
+    # Toutes les instructions SQL exécutées par les connexions du pool
+    instructions = []
+    ouvrir = db_utils._ouvrir_connexion
+
+    def ouvrir_tracee():
+        conn = ouvrir()
+        conn.set_trace_callback(instructions.append)
+        return conn
+
+    monkeypatch.setattr(db_utils, "_ouvrir_connexion", ouvrir_tracee)
+    db_utils.pool.fermer_tout()
+
+    app.config["TESTING"] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = {"id": "1", "username": "test", "role": "admin"}
+    client.instructions = instructions
+    return client
+
+
+def _projet(chemin, nb_libelles):
+    """Projet 1 lié à une valeur métier et une complexité pour chacun des `nb_libelles` libellés."""
+    with sqlite3.connect(chemin) as conn:
+        conn.execute("INSERT INTO Projet (id, ref_opg, titre_projet) VALUES (1, 100, 'P1')")
+        for i in range(nb_libelles):
+            for t in range(3):
+                conn.execute("INSERT INTO valeur_metier (libelle, type_libelle, valeur_libelle, ponderation) "
+                             "VALUES (?, ?, ?, 2)", (f"vm{i}", f"t{t}", t + 1))
+                conn.execute("INSERT INTO complexite (libelle, type_libelle, valeur_libelle, ponderation) "
+                             "VALUES (?, ?, ?, 2)", (f"cx{i}", f"t{t}", t + 1))
+            conn.execute("INSERT INTO valeur_metier_projet (id_projet, id_valeur_metier) "
+                         "SELECT 1, id FROM valeur_metier WHERE libelle = ? AND type_libelle = 't0'", (f"vm{i}",))
+            conn.execute("INSERT INTO complexite_projet (id_projet, id_complexite) "
+                         "SELECT 1, id FROM complexite WHERE libelle = ? AND type_libelle = 't0'", (f"cx{i}",))
+
+
+def _requetes_editeur(client):
+    del client.instructions[:]
+    reponse = client.get("/projet/modifier/1")
+    assert reponse.status_code == 200
+    return [i for i in client.instructions if not i.lstrip().upper().startswith("PRAGMA")]
+
+
+@pytest.mark.parametrize("nb_libelles", [1, 5, 40])
+def test_editeur_nombre_de_requetes_borne(client, base, nb_libelles):
+    _projet(base, nb_libelles)
+    requetes = _requetes_editeur(client)
+    # Projet, valeurs retenues, catalogue valeur métier, complexités retenues, catalogue complexité
+    assert len(requetes) <= 5, requetes
+
+
+def test_editeur_nombre_de_requetes_independant_des_liens(client, base):
+    _projet(base, 2)
+    peu = len(_requetes_editeur(client))
+    with sqlite3.connect(base) as conn:
+        conn.execute("DELETE FROM complexite_projet")
+        conn.execute("DELETE FROM valeur_metier_projet")
+        conn.execute("DELETE FROM Projet")
+    _projet(base, 30)  # les catalogues grossissent aussi (ids suivants)
+    assert len(_requetes_editeur(client)) == peu
@@ -0,0 +1,40 @@
+# tests/test_moteur_wsjf.py
+import sqlite3
+from services.moteur_wsjf import moteur
+from services.wsjf_calculator import CHAMPS_CATALOGUE, POINTS_CONFIG, calculate_wsjf
+from utils.versions import incrementer_version
+
+
+def _catalogue(chemin, table, lignes):
+    with sqlite3.connect(chemin) as conn:
+        conn.executemany(f"INSERT INTO {table} (libelle, type_libelle, valeur_libelle, ponderation) "
+                         "VALUES (?, ?, ?, ?)", lignes)
+    incrementer_version(table)
+
+
+def test_champs_catalogue_couvre_le_bareme():
+    assert set(CHAMPS_CATALOGUE) == set(POINTS_CONFIG)
+    assert {catalogue for catalogue, _ in CHAMPS_CATALOGUE.values()} == {"valeur_metier", "complexite"}
+
+
+def test_reponse_surchargee_par_la_ligne_designee(base):
+    _catalogue(base, "valeur_metier", [("Alignement stratégic", "Fortement aligné", 5, 3)])
+    bareme = moteur()
+    id_ligne = bareme.lignes["alignement_strategic"]["fortement_aligne"]
+    # Même poids que celui servi aux projets importés pour cette ligne
+    assert bareme.points("alignement_strategic", "fortement_aligne") == bareme.poids_valeur[id_ligne] == 15
+    assert bareme.points("alignement_strategic", "aligne") == POINTS_CONFIG["alignement_strategic"]["aligne"]
+
+    avant = calculate_wsjf({"alignement_strategic": "aligne", "q1": "petit"})["score_wsjf"]
+    apres = calculate_wsjf({"alignement_strategic": "fortement_aligne", "q1": "petit"})["score_wsjf"]
+    assert (avant, apres) == (21 * 2 / 2, 15 * 2 / 2)
+
+
+def test_libelle_hors_correspondance_ignore(base):
+    # Le type correspond à une réponse de q1, mais le libellé n'est pas celui de CHAMPS_CATALOGUE
+    _catalogue(base, "complexite", [("taille", "petit", 10, 10), ("valeur_metier q1", "petit", 10, 10)])
+    _catalogue(base, "valeur_metier", [("q1", "petit", 10, 10)])
+    assert moteur().points("q1", "petit") == POINTS_CONFIG["q1"]["petit"]
+
+    _catalogue(base, "complexite", [("Q1", "Petit", 4, 1)])
+    assert moteur().points("q1", "petit") == 4
@@ -0,0 +1,28 @@
+# tests/test_ordonnancement.py
+import sqlite3
+from datetime import date
+import pytest
+from services.capacite import POURCENTAGE_DEFAUT, phases_valides
+from services.ordonnancement import proposer_planning
+
+
+def test_pourcentage_absent_meme_defaut_que_la_charge(base):
+    with sqlite3.connect(base) as conn:
+        conn.executescript("""
+            INSERT INTO profils (id, nom) VALUES (1, 'Dev'), (2, 'QA');
+            INSERT INTO programmes (id, nom) VALUES (1, 'P');
+            INSERT INTO phases (id, programme_id, nom) VALUES (1, 1, 'Build'), (2, 1, 'Recette');
+            INSERT INTO phase_profils_programme (programme_id, phase_id, profil_id, pourcentage)
+            VALUES (1, 1, 1, 0), (1, 2, 2, 0);
+            INSERT INTO projets (id, titre, statut, duree_estimee_jh, programme_id)
+            VALUES ('x', 'X', 'En attente', 40, 1);
+        """)
+
+    # Deux lignes sans pourcentage : 1 % des 40 JH chacune, comme la charge requise de l'écran CAF
+    (proposition,) = proposer_planning(date(2026, 1, 5), date(2026, 6, 28))['propositions']
+    assert POURCENTAGE_DEFAUT == 1.0
+    assert proposition['charge_jh'] == pytest.approx(0.8)
+
+    ligne = {"date_debut": "2026-01-05", "date_fin": "2026-01-11", "duree_estimee_jh": 40,
+             "pourcentage": None, "profil_id": 1}
+    assert phases_valides([ligne])["charge"].tolist() == pytest.approx([0.4])
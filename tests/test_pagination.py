@@ -0,0 +1,20 @@
+# tests/test_pagination.py
+import sqlite3
+import utils.pagination as pagination
+from utils.pagination import compter, invalider_comptes
+
+
+def test_cache_des_comptages_borne(base, monkeypatch):
+    monkeypatch.setattr(pagination, "COMPTES_MAX", 5)
+    with sqlite3.connect(base) as conn:
+        conn.executemany("INSERT INTO profils (nom) VALUES (?)", [(f"p{i}",) for i in range(20)])
+
+    requete = "SELECT id FROM profils WHERE id > ?"
+    for i in range(20):
+        assert compter("profils", requete, [i]) == 20 - i
+    assert len(pagination._comptes) == 5
+    # Les filtres les plus récents restent en cache
+    assert list(pagination._comptes) == [("profils", requete, (i,)) for i in range(15, 20)]
+
+    invalider_comptes("profils")
+    assert not pagination._comptes
@@ -0,0 +1,57 @@
+# tests/test_recalcul_scores.py
+import sqlite3
+import pytest
+import services.recalcul_scores as recalcul_scores
+
+
+@pytest.fixture
+def client(base, monkeypatch):
+    from app import app
+
+    monkeypatch.setattr(recalcul_scores, "_reference", None)
+    monkeypatch.setattr(recalcul_scores, "DELAI_RECALCUL", 0.3)
+    app.config["TESTING"] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = {"id": "1", "username": "test", "role": "admin"}
+    return client
+
+
+def _projet(chemin):
+    with sqlite3.connect(chemin) as conn:
+        conn.executescript("""
+            INSERT INTO Projet (id, ref_opg, titre_projet, udate, uuser) VALUES (1, 100, 'P1', '2020-01-01', 7);
+            INSERT INTO valeur_metier (id, libelle, type_libelle, valeur_libelle, ponderation)
+            VALUES (1, 'impact', 'fort', 10, 3);
+            INSERT INTO complexite (id, libelle, type_libelle, valeur_libelle, ponderation)
+            VALUES (1, 'taille', 'petit', 1, 5);
+            INSERT INTO valeur_metier_projet (id_projet, id_valeur_metier) VALUES (1, 1);
+            INSERT INTO complexite_projet (id_projet, id_complexite, libelle) VALUES (1, 1, 'taille');
+        """)
+
+
+def _projet_en_base(chemin):
+    with sqlite3.connect(chemin) as conn:
+        return conn.execute("SELECT score_wsjf_projet, udate, uuser FROM Projet WHERE id = 1").fetchone()
+
+
+def test_rafale_un_seul_recalcul_sans_toucher_l_audit(client, base, monkeypatch):
+    _projet(base)
+    assert recalcul_scores.recalculer_si_perime() == 1
+    assert _projet_en_base(base) == (6.0, "2020-01-01", 7)
+
+    appels = []
+    recalculer = recalcul_scores.recalculer_si_perime
+    monkeypatch.setattr(recalcul_scores, "recalculer_si_perime", lambda: appels.append(1) or recalculer())
+
+    for ponderation in ("2", "3", "10"):
+        client.post("/complexite/modifier/1", data={
+            "libelle": "taille", "type_libelle": "petit", "valeur_libelle": "1", "ponderation": ponderation,
+        })
+    minuteur = recalcul_scores._minuteur
+    assert minuteur is not None
+    minuteur.join(timeout=5)
+
+    assert appels == [1]
+    assert recalcul_scores._minuteur is None
+    assert _projet_en_base(base) == (3.0, "2020-01-01", 7)
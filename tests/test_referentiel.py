@@ -0,0 +1,47 @@
+# tests/test_referentiel.py
+import sqlite3
+import pytest
+from utils.referentiel import lignes
+
+
+@pytest.fixture
+def client(base):
+    from app import app
+
+    app.config["TESTING"] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["user"] = {"id": "1", "username": "test", "role": "admin"}
+    return client
+
+
+def _versions(chemin):
+    with sqlite3.connect(chemin) as conn:
+        return dict(conn.execute("SELECT nom, version FROM cache_version WHERE nom = 'profils'"))
+
+
+def test_ecritures_profils_invalident_le_cache(client, base):
+    with client.application.app_context():
+        assert lignes("profils") == ()
+
+    client.post("/profils/ajouter", data={"nom": "Dev"})
+    with client.application.app_context():
+        (profil,) = lignes("profils")
+    assert profil["nom"] == "Dev"
+    assert _versions(base) == {"profils": 1}
+
+    client.post(f"/profils/modifier/{profil['id']}", data={"nom": "QA"})
+    with client.application.app_context():
+        assert [p["nom"] for p in lignes("profils")] == ["QA"]
+
+    client.post(f"/profils/supprimer/{profil['id']}")
+    with client.application.app_context():
+        assert lignes("profils") == ()
+    assert _versions(base) == {"profils": 3}
+
+
+def test_ecriture_refusee_sans_invalidation(client, base):
+    client.post("/profils/ajouter", data={"nom": "Dev"})
+    # Nom déjà pris (UNIQUE) : la transaction est annulée, compteur compris
+    client.post("/profils/ajouter", data={"nom": "Dev"})
+    assert _versions(base) == {"profils": 1}
@@ -0,0 +1,70 @@
+# tests/test_wsjf_calculator.py
+import random
+import sqlite3
+import pytest
+from services.charge_hebdo import reconstruire, verifier
+from services.wsjf_calculator import (
+    DENOMINATEUR_FIELDS, NUMERATEUR_FIELDS, POINTS_CONFIG, calculate_wsjf, calculate_wsjf_batch,
+    rescorer_projets
+)
+
+CHAMPS = NUMERATEUR_FIELDS + DENOMINATEUR_FIELDS
+
+
+def _formulaires(nombre, graine=42):
+    hasard = random.Random(graine)
+    formulaires = []
+    for _ in range(nombre):
+        formulaire = {}
+        for champ in CHAMPS:
+            if champ == 'q2':
+                choix = ['0', '3', '12', ' 7 ', '-4', 'abc', '', None]
+            else:
+                choix = list(POINTS_CONFIG[champ]) + ['inconnue', '', None]
+            valeur = hasard.choice(choix)
+            if valeur is not None:
+                formulaire[champ] = valeur
+        formulaires.append(formulaire)
+    return formulaires
+
+
+def test_lot_identique_au_calcul_unitaire(base):
+    formulaires = _formulaires(300)
+    lot = calculate_wsjf_batch(formulaires)
+    for i, formulaire in enumerate(formulaires):
+        unitaire = calculate_wsjf(formulaire)
+        assert lot['score_wsjf'][i] == unitaire['score_wsjf'], formulaire
+        assert lot['complexite_score'][i] == unitaire['complexite_score']
+        assert lot['complexite'][i] == unitaire['complexite']
+        assert lot['jh_estime'][i] == unitaire['jh_estime']
+
+
+def test_rescorer_conserve_les_durees_saisies(base):
+    formulaire = {'alignement_strategic': 'aligne', 'q1': 'petit', 'q2': '3'}
+    attendu = calculate_wsjf(formulaire)
+    with sqlite3.connect(base) as conn:
+        conn.executescript("""
+            INSERT INTO profils (id, nom) VALUES (1, 'Dev');
+            INSERT INTO programmes (id, nom) VALUES (1, 'P');
+            INSERT INTO phases (id, programme_id, nom) VALUES (1, 1, 'Build');
+            INSERT INTO phase_profils_programme (programme_id, phase_id, profil_id, pourcentage)
+            VALUES (1, 1, 1, 100);
+        """)
+        for projet_id, duree in (('saisie', 75), ('vide', None), ('defaut', 0)):
+            conn.execute("""
+                INSERT INTO projets (id, statut, programme_id, duree_estimee_jh, alignement_strategic, q1, q2)
+                VALUES (?, 'En cours', 1, ?, 'aligne', 'petit', '3')
+            """, [projet_id, duree])
+            conn.execute("INSERT INTO projet_phases (projet_id, phase_id, date_debut, date_fin) "
+                         "VALUES (?, 1, '2026-01-05', '2026-02-01')", [projet_id])
+    reconstruire()
+
+    assert rescorer_projets() == 3
+    with sqlite3.connect(base) as conn:
+        lignes = dict(conn.execute("SELECT id, duree_estimee_jh FROM projets"))
+        scores = [r[0] for r in conn.execute("SELECT score_wsjf FROM projets")]
+    assert lignes == {'saisie': 75, 'vide': attendu['jh_estime'], 'defaut': attendu['jh_estime']}
+    assert scores == pytest.approx([attendu['score_wsjf']] * 3)
+    assert verifier() == []
+    # Barème inchangé : plus rien à modifier
+    assert rescorer_projets() == 0
@@ -1,7 +1,13 @@
 # utils/db_utils.py
+import logging
 import os
 import sqlite3
+import threading
+import sys
 import time
+from contextlib import contextmanager
+from flask import g, has_app_context
+from utils.text_utils import normalize_text
 
 # --------------------------------------------------------------------
 # 📁 Chemin vers la base SQLite
@@ -10,23 +16,67 @@ database_path = os.path.join(os.path.dirname(__file__), '..', 'database', 'proje
 os.makedirs(os.path.dirname(database_path), exist_ok=True)
 DB_PATH = database_path
 
+POOL_TAILLE_MAX = 8     # Nombre maximum de connexions physiques ouvertes
+POOL_TIMEOUT = 30       # Attente maximale (s) d'une connexion libre
+
+logger = logging.getLogger(__name__)
+
 
 # --------------------------------------------------------------------
-# 🔌 Connexion SQLite robuste (avec WAL, timeout, foreign keys)
+# 🕵️ Suivi des connexions ouvertes (détection de fuites)
 # --------------------------------------------------------------------
-def get_connection():
+_connexions_ouvertes = {}
+_suivi_lock = threading.Lock()
+
+
+def _site_appel():
     """
-    Retourne une connexion SQLite robuste.
-    Configure WAL + timeouts pour éviter les verrous.
+    (code, ligne) du premier appelant hors de ce module : quelques sauts de frame, sans lecture
+    des sources. Mis en forme par _decrire_site seulement quand une fuite est signalée.
     """
+    frame = sys._getframe(1)
+    while frame is not None and (frame.f_code.co_filename == __file__
+                                 or "contextlib" in frame.f_code.co_filename):
+        frame = frame.f_back
+    return (frame.f_code, frame.f_lineno) if frame is not None else None
+
+
+def _decrire_site(site):
+    """'fichier:ligne (fonction)' d'un site d'appel relevé par _site_appel."""
+    if site is None:
+        return "inconnu"
+    code, ligne = site
+    return f"{code.co_filename}:{ligne} ({code.co_name})"
+
+
+class _ConnexionSuivie(sqlite3.Connection):
+    """Connexion SQLite qui se retire du registre de suivi à la fermeture."""
+
+    def close(self):
+        with _suivi_lock:
+            _connexions_ouvertes.pop(id(self), None)
+        super().close()
+
+
+def _suivre(conn, site):
+    with _suivi_lock:
+        _connexions_ouvertes[id(conn)] = site
+
+
+# --------------------------------------------------------------------
+# 🔌 Connexion SQLite robuste (avec WAL, timeout, foreign keys)
+# --------------------------------------------------------------------
+def _ouvrir_connexion():
+    """Ouvre une connexion physique et applique les PRAGMA une seule fois."""
     conn = sqlite3.connect(
         DB_PATH,
         timeout=60,               # ⏱️ Patiente jusqu'à 60s avant "database is locked"
-        check_same_thread=False
+        check_same_thread=False,
+        factory=_ConnexionSuivie
     )
     conn.row_factory = sqlite3.Row
 
-    # ✅ PRAGMA essentiels à chaque connexion
+    # ✅ PRAGMA essentiels, appliqués à l'ouverture de la connexion physique
     conn.execute("PRAGMA journal_mode=WAL;")      # Autorise les écritures concurrentes
     conn.execute("PRAGMA synchronous=NORMAL;")    # Bon compromis vitesse/sécurité
     conn.execute("PRAGMA foreign_keys = ON;")     # Active les clés étrangères
@@ -35,12 +85,164 @@ def get_connection():
     return conn
 
 
+def get_connection():
+    """
+    Retourne une connexion SQLite robuste, hors pool.
+    L'appelant est responsable de sa fermeture : une connexion encore ouverte
+    à la fin de la requête est signalée (avec son site d'appel) puis fermée.
+    """
+    conn = _ouvrir_connexion()
+    site = _site_appel()
+    _suivre(conn, site)
+    if has_app_context():
+        g.setdefault("db_connexions_directes", []).append((conn, site))
+    return conn
+
+
+# --------------------------------------------------------------------
+# ♻️ Pool borné de connexions
+# --------------------------------------------------------------------
+class ConnectionPool:
+    """
+    Pool borné de connexions SQLite réutilisables.
+    Les connexions libres sont réutilisées (LIFO) ; au-delà de `taille_max`
+    connexions ouvertes, les demandes attendent qu'une connexion soit rendue.
+    """
+
+    def __init__(self, taille_max=POOL_TAILLE_MAX, timeout=POOL_TIMEOUT):
+        self.taille_max = taille_max
+        self.timeout = timeout
+        self._libres = []
+        self._ouvertes = 0
+        self._cond = threading.Condition()
+        self._stats = {"checkouts": 0, "attentes": 0, "creees": 0}
+
+    def acquire(self):
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if not self._libres and self._ouvertes >= self.taille_max:
+                self._stats["attentes"] += 1
+                disponible = self._cond.wait_for(
+                    lambda: self._libres or self._ouvertes < self.taille_max,
+                    timeout=self.timeout
+                )
+                if not disponible:
+                    raise sqlite3.OperationalError("pool de connexions épuisé")
+            if self._libres:
+                return self._libres.pop()
+            self._ouvertes += 1
+            self._stats["creees"] += 1
+        try:
+            return _ouvrir_connexion()
+        except Exception:
+            with self._cond:
+                self._ouvertes -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Connexion inutilisable : on la jette au lieu de la remettre au pool
+            with self._cond:
+                self._ouvertes -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._libres.append(conn)
+            self._cond.notify()
+
+    def fermer_tout(self):
+        """Ferme toutes les connexions libres (ex : fin de process, tests)."""
+        with self._cond:
+            while self._libres:
+                self._libres.pop().close()
+                self._ouvertes -= 1
+
+    def stats(self):
+        with self._cond:
+            stats = {
+                **self._stats,
+                "ouvertes": self._ouvertes,
+                "libres": len(self._libres),
+                "taille_max": self.taille_max,
+            }
+        with _suivi_lock:
+            stats["hors_pool_ouvertes"] = len(_connexions_ouvertes)
+        return stats
+
+
+pool = ConnectionPool()
+
+
+def pool_stats():
+    """Statistiques du pool (checkouts, attentes, connexions ouvertes...)."""
+    return pool.stats()
+
+
+@contextmanager
+def connexion():
+    """
+    Fournit une connexion du pool.
+    Dans une requête Flask, la même connexion est réutilisée jusqu'au teardown ;
+    hors contexte applicatif, elle est réservée pour toute la durée du bloc
+    puis rendue au pool.
+    """
+    if has_app_context():
+        if "db_conn" not in g:
+            g.db_conn = pool.acquire()
+        yield g.db_conn
+    else:
+        conn = pool.acquire()
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
+
+
+def fermer_connexion_requete(exception=None):
+    """
+    Rend au pool la connexion liée au contexte applicatif courant et
+    ferme (en les signalant) les connexions hors pool restées ouvertes.
+    """
+    conn = g.pop("db_conn", None)
+    if conn is not None:
+        if conn.in_transaction:
+            logger.warning("⚠️ Transaction non validée en fin de requête (get_db() appelé depuis %s)",
+                           _decrire_site(g.get("db_conn_site")))
+        pool.release(conn)
+
+    for conn, site in g.pop("db_connexions_directes", []):
+        with _suivi_lock:
+            fuite = id(conn) in _connexions_ouvertes
+        if fuite:
+            logger.warning("⚠️ Fuite de connexion SQLite : ouverte depuis %s et jamais fermée", _decrire_site(site))
+            conn.close()
+
+
+def init_app(app):
+    """Branche la gestion des connexions sur le cycle de vie de l'application."""
+    app.teardown_appcontext(fermer_connexion_requete)
+
+
 # --------------------------------------------------------------------
 # 🧩 Alias compatible avec les routes Flask (ex: import_excel_routes)
 # --------------------------------------------------------------------
 def get_db():
-    """Alias pour compatibilité avec les routes Flask (utilise get_connection)."""
-    return get_connection()
+    """
+    Connexion gérée, liée au contexte applicatif : la même connexion que
+    query_db/execute_db, rendue au pool automatiquement au teardown.
+    Hors contexte applicatif, retourne une connexion hors pool à fermer.
+    """
+    if not has_app_context():
+        return get_connection()
+    if "db_conn" not in g:
+        g.db_conn = pool.acquire()
+    if "db_conn_site" not in g:
+        g.db_conn_site = _site_appel()
+    return g.db_conn
 
 
 # --------------------------------------------------------------------
@@ -50,11 +252,10 @@ def query_db(query, args=(), one=False, retries=3, delay=1):
     """Exécute une requête SELECT avec retry doux si la base est momentanément verrouillée."""
     for attempt in range(retries):
         try:
-            conn = get_connection()
-            cur = conn.execute(query, args)
-            rows = cur.fetchall()
-            cur.close()
-            conn.close()
+            with connexion() as conn:
+                cur = conn.execute(query, args)
+                rows = cur.fetchall()
+                cur.close()
             return (rows[0] if rows else None) if one else rows
         except sqlite3.OperationalError as e:
             if "locked" in str(e).lower() and attempt < retries - 1:
@@ -70,16 +271,19 @@ def execute_db(query, args=(), many=False, retries=3, delay=1):
     """Exécute une requête d'écriture avec gestion douce des verrous."""
     for attempt in range(retries):
         try:
-            conn = get_connection()
-            cur = conn.cursor()
-            if many:
-                cur.executemany(query, args)
-            else:
-                cur.execute(query, args)
-            conn.commit()
-            last_id = cur.lastrowid
-            cur.close()
-            conn.close()
+            with connexion() as conn:
+                cur = conn.cursor()
+                try:
+                    if many:
+                        cur.executemany(query, args)
+                    else:
+                        cur.execute(query, args)
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
+                last_id = cur.lastrowid
+                cur.close()
             return last_id
         except sqlite3.OperationalError as e:
             if "locked" in str(e).lower() and attempt < retries - 1:
@@ -88,6 +292,80 @@ def execute_db(query, args=(), many=False, retries=3, delay=1):
             raise
 
 
+# --------------------------------------------------------------------
+# 🔒 Transaction explicite (plusieurs écritures atomiques)
+# --------------------------------------------------------------------
+@contextmanager
+def transaction(conn=None):
+    """
+    Ouvre une transaction d'écriture (BEGIN IMMEDIATE) et fournit un curseur.
+    Commit à la sortie du bloc, rollback en cas d'exception.
+    `conn` permet de réutiliser une connexion déjà réservée via connexion().
+    """
+    if conn is None:
+        with connexion() as conn:
+            with transaction(conn) as cur:
+                yield cur
+        return
+
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    cur = conn.cursor()
+    try:
+        yield cur
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def _table_existe(cur, table_name):
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ? COLLATE NOCASE", [table_name])
+    return cur.fetchone() is not None
+
+
+def _ajouter_colonnes(cur, table_name, columns):
+    """Ajoute les colonnes manquantes d'une table existante."""
+    cur.execute(f"PRAGMA table_info({table_name});")
+    existing_cols = [col[1] for col in cur.fetchall()]
+    for col_name, col_def in columns.items():
+        if col_name not in existing_cols:
+            cur.execute(f"ALTER TABLE {table_name} ADD COLUMN {col_name} {col_def};")
+
+
+# Catalogues dont les libellés sont aussi stockés sous forme normalisée
+COLONNES_NORMALISEES = {
+    "libelle": "libelle_norm",
+    "type_libelle": "type_libelle_norm",
+    "valeur_libelle": "valeur_libelle_norm",
+}
+
+
+def valeurs_normalisees(libelle, type_libelle, valeur_libelle):
+    """Copies normalisées (libelle_norm, type_libelle_norm, valeur_libelle_norm) à écrire avec la ligne."""
+    return [normalize_text(libelle), normalize_text(type_libelle), normalize_text(valeur_libelle)]
+
+
+def _synchroniser_normalisation(cur, table_name):
+    """Ajoute les colonnes *_norm si besoin et complète celles qui ne sont pas encore calculées."""
+    _ajouter_colonnes(cur, table_name, {norm: "TEXT" for norm in COLONNES_NORMALISEES.values()})
+    cur.execute(f"""
+        SELECT id, libelle, type_libelle, valeur_libelle FROM {table_name}
+        WHERE libelle_norm IS NULL OR type_libelle_norm IS NULL OR valeur_libelle_norm IS NULL
+    """)
+    maj = [(*valeurs_normalisees(r[1], r[2], r[3]), r[0]) for r in cur.fetchall()]
+    cur.executemany(f"""
+        UPDATE {table_name} SET libelle_norm = ?, type_libelle_norm = ?, valeur_libelle_norm = ?
+        WHERE id = ?
+    """, maj)
+    if maj:
+        # Les libellés normalisés servent au moteur de score (services/moteur_wsjf)
+        from utils.versions import incrementer_version
+        incrementer_version(table_name, cur)
+
+
 # --------------------------------------------------------------------
 # 🏗️ Initialisation de la base (création des tables principales)
 # --------------------------------------------------------------------
@@ -247,16 +525,56 @@ def init_db():
             uuser TEXT,
             udate DATETIME DEFAULT CURRENT_TIMESTAMP
         );
+
+        -- Imports Excel exécutés en arrière-plan
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id TEXT PRIMARY KEY,
+            fichier TEXT NOT NULL,
+            statut TEXT NOT NULL DEFAULT 'en_attente',  -- en_attente / en_cours / termine / erreur
+            blocs_parses INTEGER DEFAULT 0,
+            liens_crees INTEGER DEFAULT 0,
+            message TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME
+        );
+
+        -- Versions des données de référence (invalidation des caches en mémoire, voir utils/versions.py)
+        CREATE TABLE IF NOT EXISTS cache_version (
+            nom TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            udate DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Charge requise matérialisée par profil et semaine (lundi, numérotation ISO)
+        CREATE TABLE IF NOT EXISTS charge_hebdo (
+            profil_id INTEGER NOT NULL,
+            annee INTEGER NOT NULL,
+            semaine INTEGER NOT NULL,
+            jh REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (annee, semaine, profil_id)
+        ) WITHOUT ROWID;
         """
 
         cur.executescript(SCHEMA)
 
-        # Vérifie et ajoute la colonne 'retenu' si absente
-        cur.execute("SELECT COUNT(*) FROM pragma_table_info('projets') WHERE name='retenu';")
-        if cur.fetchone()[0] == 0:
-            cur.execute("ALTER TABLE projets ADD COLUMN retenu INTEGER DEFAULT 0;")
+        # Évolutions du schéma (colonnes ajoutées, index) : migrations versionnées
+        from utils.migrations import migrer
+        migrer(conn)
+
+        # Copies normalisées des libellés des catalogues (import, recherche)
+        for catalogue in ("valeur_metier", "complexite"):
+            if _table_existe(cur, catalogue):
+                _synchroniser_normalisation(cur, catalogue)
 
+        # Écritures sur la répartition des phases signalées à charge_hebdo (tables créées tardivement comprises)
+        from services.charge_hebdo import actualiser_si_perimee, installer_triggers
+        installer_triggers(cur)
         conn.commit()
+
+        # Remplissage de charge_hebdo s'il n'a jamais eu lieu ou si la répartition a changé
+        actualiser_si_perimee(conn)
+
         cur.close()
         conn.close()
         print("✅ Base initialisée et configurée avec succès (WAL activé).")
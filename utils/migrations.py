@@ -0,0 +1,286 @@
+# utils/migrations.py
+"""
+Migrations versionnées du schéma SQLite, suivies par PRAGMA user_version.
+
+init_db() (application) et init_db.py créent les tables (CREATE TABLE IF NOT EXISTS)
+puis appellent migrer() : chaque migration de numéro supérieur à user_version est
+appliquée dans sa propre transaction, qui enregistre aussi le nouveau numéro.
+
+Les migrations ignorent les tables absentes : une table créée après coup (init_db.py
+lancé après l'application, par exemple) ne les aurait jamais reçues. migrer() rejoue
+donc aussi, à chaque appel, les migrations de structure (colonnes, index) — idempotentes
+et peu coûteuses — et crée les index de recherche manquants (RATTRAPAGE).
+--reappliquer rejoue toutes les migrations, reconstruction des index de recherche comprise.
+
+Usage :
+    python -m utils.migrations                 # applique les migrations en attente
+    python -m utils.migrations --statut
+    python -m utils.migrations --reappliquer
+    python -m utils.migrations --verifier      # plans d'exécution (EXPLAIN QUERY PLAN) des requêtes chaudes
+"""
+import argparse
+import sqlite3
+from utils.db_utils import DB_PATH, _ajouter_colonnes, _table_existe, transaction
+from utils.recherche import creer_index, index_manquants
+
+
+def _colonnes(cur, table):
+    cur.execute(f"PRAGMA table_info({table})")
+    return {col[1] for col in cur.fetchall()}
+
+
+# ===============================
+# 🧱 MIGRATIONS
+# ===============================
+def _m001_colonnes_projets(cur):
+    """Colonnes ajoutées après coup à projets (les deux schémas historiques divergent)."""
+    _ajouter_colonnes(cur, "projets", {
+        "retenu": "INTEGER DEFAULT 0",
+        "complexite": "REAL",
+        "programme_id": "INTEGER REFERENCES programmes(id)",
+    })
+
+
+def _m002_empreinte_projet(cur):
+    """Empreinte des blocs Excel importés (import incrémental par ref_opg)."""
+    if _table_existe(cur, "Projet"):
+        _ajouter_colonnes(cur, "Projet", {"empreinte": "TEXT"})
+
+
+def _m003_complexite_projet_libelle(cur):
+    """Complexités d'un projet : une seule valeur par libellé (clé d'upsert)."""
+    if not _table_existe(cur, "complexite_projet"):
+        return
+    _ajouter_colonnes(cur, "complexite_projet", {"libelle": "TEXT"})
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'ux_complexite_projet_libelle'")
+    if cur.fetchone():
+        return  # déjà migrée : la contrainte d'unicité garde les libellés renseignés
+    cur.execute("""
+        UPDATE complexite_projet
+        SET libelle = (SELECT c.libelle FROM complexite c WHERE c.id = complexite_projet.id_complexite)
+        WHERE libelle IS NULL
+    """)
+    cur.execute("""
+        DELETE FROM complexite_projet
+        WHERE libelle IS NOT NULL
+          AND id NOT IN (SELECT MIN(id) FROM complexite_projet
+                         WHERE libelle IS NOT NULL
+                         GROUP BY id_projet, libelle)
+    """)
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_complexite_projet_libelle
+        ON complexite_projet (id_projet, libelle)
+    """)
+
+
+# Index secondaires des prédicats fréquents : (nom, table, colonnes)
+INDEX = [
+    # /priorites : tri par score, filtre retenu
+    ("ix_projets_score", "projets", "score_wsjf DESC"),
+    ("ix_projets_retenu_score", "projets", "retenu, score_wsjf DESC"),
+    # Ordonnancement, charge_hebdo : filtres par statut et programme
+    ("ix_projets_statut", "projets", "statut"),
+    ("ix_projets_programme", "projets", "programme_id"),
+    # Phases d'un projet (jointures CAF / charge), couvrant pour MIN/MAX des dates
+    ("ix_projet_phases_projet", "projet_phases", "projet_id, date_debut, date_fin"),
+    ("ix_phase_profils_phase", "phase_profils_programme", "phase_id, profil_id, pourcentage"),
+    ("ix_phase_profils_programme_profil", "phase_profils_programme", "programme_id, profil_id"),
+    # Effectif par profil
+    ("ix_collaborateurs_profil", "collaborateurs", "profil_id"),
+    # Disponibilités d'une période (CAF disponible), couvrant
+    ("ix_dispo_jour_annee", "disponibilites_jour", "annee, collaborateur_matricule, mois, jour, jours_dispo"),
+    ("ix_dispo_semaine_annee", "disponibilites_semaine",
+     "annee, collaborateur_matricule, mois, semaine, jours_dispo"),
+    # Éditeur de projet et recalcul des scores
+    ("ix_valeur_metier_projet_projet", "valeur_metier_projet", "id_projet, id_valeur_metier"),
+    ("ix_valeur_metier_projet_valeur", "valeur_metier_projet", "id_valeur_metier"),
+    ("ix_complexite_projet_complexite", "complexite_projet", "id_complexite"),
+    # Listes en cascade des complexités, couvrant
+    ("ix_complexite_libelle", "complexite", "libelle, type_libelle, valeur_libelle"),
+    # Release d'une date de MEP
+    ("ix_releases_debut_fin", "releases", "debut, fin"),
+]
+
+
+def _m004_index(cur):
+    """Index secondaires ; une table absente ou sans la colonne est ignorée."""
+    for nom, table, colonnes in INDEX:
+        if not _table_existe(cur, table):
+            continue
+        requises = {c.split()[0] for c in colonnes.split(",")}
+        if requises <= _colonnes(cur, table):
+            cur.execute(f"CREATE INDEX IF NOT EXISTS {nom} ON {table} ({colonnes})")
+    cur.execute("PRAGMA optimize")
+
+
+def _m005_tri_complexite(cur):
+    """Ordre de la liste des complexités (pagination par clé : idate, udate, id)."""
+    if _table_existe(cur, "complexite"):
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS ix_complexite_tri
+            ON complexite (COALESCE(idate, ''), COALESCE(udate, ''), id)
+        """)
+
+
+def _m006_recherche(cur):
+    """Index plein texte FTS5 et triggers de synchronisation (utils/recherche)."""
+    creer_index(cur)
+
+
+def _m007_recherche_sql_pur(cur):
+    """Index de recherche reconstruits : triggers sans fonction SQL applicative, clé primaire réelle."""
+    creer_index(cur)
+
+
+MIGRATIONS = [
+    (1, _m001_colonnes_projets),
+    (2, _m002_empreinte_projet),
+    (3, _m003_complexite_projet_libelle),
+    (4, _m004_index),
+    (5, _m005_tri_complexite),
+    (6, _m006_recherche),
+    (7, _m007_recherche_sql_pur),
+]
+
+
+def _rattraper_recherche(cur):
+    """Index de recherche des tables sources créées depuis la dernière construction."""
+    if index_manquants(cur):
+        creer_index(cur)
+
+
+# Rejouées à chaque migrer() : tables créées après le passage des migrations numérotées
+RATTRAPAGE = [
+    _m001_colonnes_projets,
+    _m002_empreinte_projet,
+    _m003_complexite_projet_libelle,
+    _m004_index,
+    _m005_tri_complexite,
+    _rattraper_recherche,
+]
+
+
+def version_schema(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrer(conn, depuis=None):
+    """
+    Applique les migrations de numéro > `depuis` (défaut : PRAGMA user_version), puis le
+    rattrapage des tables créées après coup. Retourne la liste des numéros appliqués.
+    """
+    actuelle = version_schema(conn)
+    depuis = actuelle if depuis is None else depuis
+    appliquees = []
+    for numero, migration in MIGRATIONS:
+        if numero <= depuis:
+            continue
+        with transaction(conn) as cur:
+            migration(cur)
+            # PRAGMA user_version fait partie de la transaction : annulé avec elle en cas d'échec
+            cur.execute(f"PRAGMA user_version = {max(numero, actuelle)}")
+        appliquees.append(numero)
+    with transaction(conn) as cur:
+        for etape in RATTRAPAGE:
+            etape(cur)
+    return appliquees
+
+
+# ===============================
+# 🔎 VÉRIFICATION DES PLANS
+# ===============================
+# (description, requête, paramètres, index attendu dans le plan)
+REQUETES_CONTROLEES = [
+    ("/priorites", """
+        SELECT p.*, c.nom AS categorie FROM projets p
+        LEFT JOIN categorie c ON p.categorie_id = c.id
+        ORDER BY p.score_wsjf DESC LIMIT 50
+     """, [], "ix_projets_score"),
+    ("/priorites?retenu=1", """
+        SELECT p.*, c.nom AS categorie FROM projets p
+        LEFT JOIN categorie c ON p.categorie_id = c.id
+        WHERE p.retenu = 1 ORDER BY p.score_wsjf DESC LIMIT 50
+     """, [], "ix_projets_retenu_score"),
+    ("ordonnancement : candidats", """
+        SELECT p.id FROM projets p WHERE p.statut IN (?, ?)
+     """, ["En attente", "À planifier"], "ix_projets_statut"),
+    ("charge d'un projet (charge_hebdo)", """
+        SELECT pp.date_debut, pp.date_fin, p.duree_estimee_jh, pph.pourcentage, pph.profil_id
+        FROM projets p
+        JOIN projet_phases pp ON p.id = pp.projet_id
+        JOIN phase_profils_programme pph ON pp.phase_id = pph.phase_id
+        WHERE p.id = ?
+     """, ["x"], "ix_projet_phases_projet"),
+    ("charge d'un projet : profils de la phase", """
+        SELECT pph.profil_id, pph.pourcentage FROM phase_profils_programme pph WHERE pph.phase_id = ?
+     """, [1], "ix_phase_profils_phase"),
+    ("CAF : effectif par profil", """
+        SELECT COUNT(*) FROM collaborateurs c WHERE c.profil_id = ?
+     """, [1], "ix_collaborateurs_profil"),
+    ("CAF disponible : jours", """
+        SELECT collaborateur_matricule, mois, jour, jours_dispo FROM disponibilites_jour
+        WHERE annee BETWEEN ? AND ?
+     """, [2026, 2026], "ix_dispo_jour_annee"),
+    ("éditeur de projet : valeurs métier", """
+        SELECT id_valeur_metier FROM valeur_metier_projet WHERE id_projet = ?
+     """, [1], "ix_valeur_metier_projet_projet"),
+    ("éditeur de projet : complexités", """
+        SELECT id_complexite FROM complexite_projet WHERE id_projet = ?
+     """, [1], "ux_complexite_projet_libelle"),
+    ("complexité : types d'un libellé", """
+        SELECT DISTINCT type_libelle FROM complexite WHERE libelle = ? ORDER BY type_libelle
+     """, ["x"], "ix_complexite_libelle"),
+    ("liste des complexités (page suivante)", """
+        SELECT * FROM (SELECT *, COALESCE(idate, '') AS tri_idate, COALESCE(udate, '') AS tri_udate
+                       FROM complexite)
+        WHERE (tri_idate, tri_udate, id) < (?, ?, ?)
+        ORDER BY tri_idate DESC, tri_udate DESC, id DESC LIMIT 11
+     """, ["2026-01-01", "", 1], "ix_complexite_tri"),
+    ("release d'une date de MEP", """
+        SELECT id FROM releases WHERE ? BETWEEN debut AND fin ORDER BY debut DESC LIMIT 1
+     """, ["2026-01-01"], "ix_releases_debut_fin"),
+]
+
+
+def verifier_plans(conn):
+    """Retourne [(description, statut, plan)] ; statut : 'ok', 'sans index' ou 'ignorée' (table absente)."""
+    resultats = []
+    for description, requete, params, index in REQUETES_CONTROLEES:
+        try:
+            plan = [r[3] for r in conn.execute(f"EXPLAIN QUERY PLAN {requete}", params)]
+        except sqlite3.OperationalError as e:
+            resultats.append((description, "ignorée", [str(e)]))
+            continue
+        statut = "ok" if any(index in ligne for ligne in plan) else "sans index"
+        resultats.append((description, statut, plan))
+    return resultats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrations du schéma SQLite")
+    groupe = parser.add_mutually_exclusive_group()
+    groupe.add_argument("--statut", action="store_true", help="afficher la version du schéma")
+    groupe.add_argument("--reappliquer", action="store_true", help="rejouer toutes les migrations")
+    groupe.add_argument("--verifier", action="store_true", help="contrôler les plans d'exécution")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        if args.statut:
+            print(f"Schéma en version {version_schema(conn)} / {MIGRATIONS[-1][0]}")
+        elif args.verifier:
+            resultats = verifier_plans(conn)
+            for description, statut, plan in resultats:
+                icone = {"ok": "✅", "ignorée": "ℹ️"}.get(statut, "❌")
+                print(f"{icone} {description} : {statut}")
+                if statut != "ok":
+                    for ligne in plan:
+                        print(f"      {ligne}")
+            echecs = [r for r in resultats if r[1] == "sans index"]
+            if echecs:
+                raise SystemExit(f"❌ {len(echecs)} requête(s) sans l'index attendu.")
+        else:
+            appliquees = migrer(conn, depuis=0 if args.reappliquer else None)
+            print(f"✅ Migrations appliquées : {appliquees or 'aucune'} (version {version_schema(conn)}).")
+    finally:
+        conn.close()
@@ -0,0 +1,121 @@
+# utils/pagination.py
+"""
+Pagination par clé (keyset) et comptages mis en cache pour les listes.
+
+Au lieu de LIMIT/OFFSET (coût proportionnel à la profondeur de la page), chaque page
+reprend après la dernière ligne affichée : WHERE (clés) < (valeurs) ORDER BY clés DESC.
+Les valeurs sont transmises dans un curseur opaque (JSON encodé en base64 URL).
+
+Le total affiché (page x / n) est compté une fois par filtre puis gardé COMPTE_TTL
+secondes, ou jusqu'à une écriture sur la table (invalider_comptes). Le cache garde au plus
+COMPTES_MAX filtres : les entrées expirées puis les moins récemment lues sont évincées.
+"""
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+from utils.db_utils import query_db
+
+COMPTE_TTL = 60  # secondes
+COMPTES_MAX = 256
+
+_comptes = OrderedDict()  # (table, requête, paramètres) → (total, instant du comptage), du plus ancien lu au plus récent
+_verrou = threading.Lock()
+
+
+# ===============================
+# 🔖 CURSEURS
+# ===============================
+def encoder_curseur(valeurs):
+    return base64.urlsafe_b64encode(json.dumps(list(valeurs)).encode()).decode().rstrip("=")
+
+
+def decoder_curseur(texte, nb_cles):
+    """Valeurs de clé d'un curseur, ou None s'il est absent ou invalide (retour à la première page)."""
+    if not texte:
+        return None
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(texte + "=" * (-len(texte) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    if not isinstance(valeurs, list) or len(valeurs) != nb_cles:
+        return None
+    return valeurs
+
+
+# ===============================
+# 📄 PAGE PAR CLÉ
+# ===============================
+def page_keyset(requete, args, cles, par_page, apres=None, avant=None):
+    """
+    Une page de `requete` (SELECT sans ORDER BY) triée par `cles` décroissantes.
+    `cles` : colonnes du résultat formant un ordre total (la dernière doit être unique).
+    `apres` / `avant` : curseurs reçus (page suivante / précédente).
+    Retourne (lignes, curseur de la page précédente ou None, curseur de la page suivante ou None).
+    """
+    colonnes = ", ".join(cles)
+    marqueurs = ", ".join("?" * len(cles))
+    apres = decoder_curseur(apres, len(cles))
+    avant = decoder_curseur(avant, len(cles)) if apres is None else None
+
+    if avant is not None:
+        # Page précédente : on remonte dans l'ordre croissant puis on inverse
+        rows = query_db(
+            f"SELECT * FROM ({requete}) WHERE ({colonnes}) > ({marqueurs}) "
+            f"ORDER BY {', '.join(f'{c} ASC' for c in cles)} LIMIT ?",
+            list(args) + avant + [par_page + 1]
+        )
+        a_precedente, a_suivante = len(rows) > par_page, True
+        rows = rows[:par_page][::-1]
+    else:
+        condition = f"WHERE ({colonnes}) < ({marqueurs})" if apres is not None else ""
+        rows = query_db(
+            f"SELECT * FROM ({requete}) {condition} "
+            f"ORDER BY {', '.join(f'{c} DESC' for c in cles)} LIMIT ?",
+            list(args) + (apres or []) + [par_page + 1]
+        )
+        a_precedente, a_suivante = apres is not None, len(rows) > par_page
+        rows = rows[:par_page]
+
+    if not rows:
+        return rows, None, None
+    precedent = encoder_curseur(rows[0][c] for c in cles) if a_precedente else None
+    suivant = encoder_curseur(rows[-1][c] for c in cles) if a_suivante else None
+    return rows, precedent, suivant
+
+
+# ===============================
+# 🔢 COMPTAGES EN CACHE
+# ===============================
+def compter(table, requete, args=()):
+    """COUNT(*) de `requete`, mis en cache par (table, requête, paramètres) pendant COMPTE_TTL secondes."""
+    cle = (table, requete, tuple(args))
+    maintenant = time.monotonic()
+    with _verrou:
+        entree = _comptes.get(cle)
+        if entree and maintenant - entree[1] < COMPTE_TTL:
+            _comptes.move_to_end(cle)
+            return entree[0]
+    total = query_db(f"SELECT COUNT(*) AS total FROM ({requete})", args, one=True)["total"]
+    with _verrou:
+        _comptes[cle] = (total, maintenant)
+        _comptes.move_to_end(cle)
+        if len(_comptes) > COMPTES_MAX:
+            for expiree in [c for c, (_, instant) in _comptes.items() if maintenant - instant >= COMPTE_TTL]:
+                del _comptes[expiree]
+            while len(_comptes) > COMPTES_MAX:
+                _comptes.popitem(last=False)
+    return total
+
+
+def invalider_comptes(table):
+    """À appeler après une écriture sur `table`."""
+    with _verrou:
+        for cle in [c for c in _comptes if c[0] == table]:
+            del _comptes[cle]
+
+
+def nb_pages(total, par_page):
+    return max(1, -(-total // par_page))
@@ -0,0 +1,193 @@
+# utils/recherche.py
+"""
+Recherche plein texte (SQLite FTS5) sur les collaborateurs, les projets et les catalogues.
+
+Chaque table source a son index fts_<table> : colonne `cle` (clé primaire de la ligne
+source, non indexée) puis le texte brut des colonnes recherchées. Le tokenizer
+unicode61 remove_diacritics 2 ignore casse et accents et coupe sur les tirets et
+soulignés ; la saisie est passée par normalize_text avant la recherche, comme dans le
+reste de l'application. Les index sont créés et remplis par les migrations 6 et 7, puis
+tenus à jour par des triggers en SQL pur (toute connexion peut écrire dans les tables).
+
+Pour les tables à clé entière (id INTEGER PRIMARY KEY), le rowid de l'index est aussi
+l'id : la synchronisation se fait par rowid. Pour les clés texte (collaborateurs.matricule,
+projets.id), dont le rowid implicite peut être renuméroté par un VACUUM, elle se fait
+par `cle`.
+"""
+import re
+from utils.db_utils import _table_existe, query_db
+from utils.text_utils import normalize_text
+
+# Index : nom → (table source, clé primaire, clé entière ?,
+#                {colonne indexée: expression sur la ligne source ({r} = préfixe)},
+#                entité renvoyée, libellé affiché)
+INDEX_RECHERCHE = {
+    "fts_collaborateurs": (
+        "collaborateurs", "matricule", False,
+        {"matricule": "{r}matricule", "nom": "{r}nom", "prenom": "{r}prenom"},
+        "collaborateur", "TRIM(COALESCE(s.prenom, '') || ' ' || COALESCE(s.nom, ''))",
+    ),
+    "fts_projets": (
+        "projets", "id", False,
+        {"titre": "{r}titre", "description": "{r}description"},
+        "projet", "s.titre",
+    ),
+    "fts_projet": (
+        "Projet", "id", True,
+        {"titre": "{r}titre_projet", "description": "{r}description"},
+        "projet_importe", "s.titre_projet",
+    ),
+    "fts_complexite": (
+        "complexite", "id", True,
+        {"libelle": "{r}libelle", "type_libelle": "{r}type_libelle",
+         "valeurs": "COALESCE({r}valeur_libelle, '') || ' ' || COALESCE({r}ponderation, '')"},
+        "complexite", "s.libelle || ' : ' || s.type_libelle",
+    ),
+    "fts_valeur_metier": (
+        "valeur_metier", "id", True,
+        {"libelle": "{r}libelle", "type_libelle": "{r}type_libelle",
+         "valeurs": "COALESCE({r}valeur_libelle, '') || ' ' || COALESCE({r}ponderation, '')"},
+        "valeur_metier", "s.libelle || ' : ' || s.type_libelle",
+    ),
+}
+
+
+def _colonnes_source(colonnes):
+    return list(dict.fromkeys(c for expr in colonnes.values() for c in re.findall(r"\{r\}(\w+)", expr)))
+
+
+def _insertion(nom, cle, entiere, colonnes, prefixe):
+    """Colonnes et valeurs d'une ligne d'index, à partir de la ligne source `prefixe`."""
+    cibles = (["rowid"] if entiere else []) + ["cle"] + list(colonnes)
+    valeurs = ([f"{prefixe}{cle}"] if entiere else []) + [f"{prefixe}{cle}"] + [
+        expr.format(r=prefixe) for expr in colonnes.values()
+    ]
+    return f"INSERT INTO {nom} ({', '.join(cibles)})", ", ".join(valeurs)
+
+
+def _source_indexable(cur, nom):
+    """La table source de l'index `nom` existe et porte toutes les colonnes indexées."""
+    table, cle, _, colonnes, *_ = INDEX_RECHERCHE[nom]
+    if not _table_existe(cur, table):
+        return False
+    cur.execute(f"PRAGMA table_info({table})")
+    presentes = {col[1].lower() for col in cur.fetchall()}
+    return {c.lower() for c in _colonnes_source(colonnes) + [cle]} <= presentes
+
+
+# ===============================
+# 🧱 CRÉATION / RECONSTRUCTION
+# ===============================
+def creer_index(cur):
+    """
+    (Re)crée les index et leurs triggers pour les tables sources présentes, puis les
+    remplit à partir des tables sources. Idempotent. Retourne les index construits.
+    """
+    traites = []
+    for nom, (table, cle, entiere, colonnes, *_) in INDEX_RECHERCHE.items():
+        for suffixe in ("ai", "ad", "au"):
+            cur.execute(f"DROP TRIGGER IF EXISTS {nom}_{suffixe}")
+        cur.execute(f"DROP TABLE IF EXISTS {nom}")
+        if not _source_indexable(cur, nom):
+            continue
+        sources = _colonnes_source(colonnes)
+
+        cur.execute(f"""
+            CREATE VIRTUAL TABLE {nom}
+            USING fts5(cle UNINDEXED, {', '.join(colonnes)}, tokenize = 'unicode61 remove_diacritics 2')
+        """)
+        insertion, valeurs_new = _insertion(nom, cle, entiere, colonnes, "new.")
+        suppression = (f"DELETE FROM {nom} WHERE rowid = old.{cle};" if entiere
+                       else f"DELETE FROM {nom} WHERE cle = old.{cle};")
+        cur.execute(f"""
+            CREATE TRIGGER {nom}_ai AFTER INSERT ON {table} BEGIN
+                {insertion} VALUES ({valeurs_new});
+            END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER {nom}_ad AFTER DELETE ON {table} BEGIN
+                {suppression}
+            END
+        """)
+        cur.execute(f"""
+            CREATE TRIGGER {nom}_au AFTER UPDATE OF {', '.join(dict.fromkeys(sources + [cle]))} ON {table} BEGIN
+                {suppression}
+                {insertion} VALUES ({valeurs_new});
+            END
+        """)
+        insertion, valeurs = _insertion(nom, cle, entiere, colonnes, "")
+        cur.execute(f"{insertion} SELECT {valeurs} FROM {table}")
+        cur.execute(f"INSERT INTO {nom} ({nom}) VALUES ('optimize')")
+        traites.append(nom)
+    return traites
+
+
+def index_manquants(cur):
+    """Index dont la table source est indexable mais qui n'existent pas (table créée après coup)."""
+    return [
+        nom for nom in INDEX_RECHERCHE
+        if not _table_existe(cur, nom) and _source_indexable(cur, nom)
+    ]
+
+
+def index_disponibles():
+    """Noms des index de recherche présents dans la base."""
+    rows = query_db(f"""
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name IN ({', '.join('?' * len(INDEX_RECHERCHE))})
+    """, list(INDEX_RECHERCHE))
+    return [nom for nom in INDEX_RECHERCHE if nom in {r["name"] for r in rows}]
+
+
+# ===============================
+# 🔎 REQUÊTES
+# ===============================
+def expression_fts(texte):
+    """
+    Expression MATCH pour une saisie libre : chaque mot normalisé devient un préfixe
+    entre guillemets (aucun opérateur FTS5 interprété). None si la saisie est vide.
+    """
+    mots = normalize_text(texte).split()
+    if not mots:
+        return None
+    return " ".join('"{}"*'.format(mot.replace('"', '""')) for mot in mots)
+
+
+def condition_recherche(nom, texte, colonne=None):
+    """
+    Filtre « `colonne` IN (clés trouvées par l'index `nom`) » et ses paramètres, ou None si
+    l'index n'existe pas (l'appelant garde alors son filtre LIKE). `colonne` : clé primaire
+    de la table source, éventuellement préfixée par son alias (défaut : nom de la clé).
+    """
+    if nom not in index_disponibles():
+        return None
+    expression = expression_fts(texte)
+    if expression is None:
+        return "0", []
+    colonne = colonne or INDEX_RECHERCHE[nom][1]
+    return f"{colonne} IN (SELECT cle FROM {nom} WHERE {nom} MATCH ?)", [expression]
+
+
+def rechercher(texte, limite=20):
+    """
+    Recherche globale, classée par pertinence (bm25) en une seule requête sur tous les index.
+    Retourne [{"entite", "cle", "libelle", "score"}] (score : plus petit = plus pertinent).
+    """
+    expression = expression_fts(texte)
+    disponibles = index_disponibles()
+    if expression is None or not disponibles:
+        return []
+
+    parties = []
+    for nom in disponibles:
+        table, cle, _, _, entite, libelle = INDEX_RECHERCHE[nom]
+        parties.append(f"""
+            SELECT '{entite}' AS entite, s.{cle} AS cle, {libelle} AS libelle, bm25({nom}) AS score
+            FROM {nom} JOIN {table} s ON s.{cle} = {nom}.cle
+            WHERE {nom} MATCH ?
+        """)
+    rows = query_db(
+        f"SELECT * FROM ({' UNION ALL '.join(parties)}) ORDER BY score LIMIT ?",
+        [expression] * len(parties) + [limite]
+    )
+    return [dict(r) for r in rows]
@@ -0,0 +1,111 @@
+# utils/referentiel.py
+"""
+Cache en mémoire des tables de référence (profils, categorie, Statut, Phase, affectation).
+
+Ces petites tables sont relues par presque toutes les pages. Chaque processus garde
+leurs lignes en mémoire, accompagnées de la version de la table (utils/versions.py) lue
+au chargement. Les versions des tables de référence sont relues en une seule requête,
+une fois par requête HTTP : une écriture faite par un autre processus est donc vue dès
+la requête suivante.
+
+Les routes d'ajout / modification / suppression appellent invalider(table). Les lignes
+servies sont immuables (tuple de MappingProxyType) : un appelant qui veut les modifier
+les copie avec dict(ligne).
+"""
+import threading
+from types import MappingProxyType
+from flask import g, has_app_context
+from utils.db_utils import query_db
+from utils.versions import incrementer_version, lire_versions
+
+# Table de référence → nom de son compteur dans cache_version
+TABLES_REFERENCE = {
+    "profils": "profils",
+    "categorie": "categorie",
+    "Statut": "statut",
+    "Phase": "phase",
+    "affectation": "affectation",
+}
+
+_cache = {}      # table → (version, {(tri, inverse): tuple de lignes})
+_stats = {table: {"hits": 0, "misses": 0} for table in TABLES_REFERENCE}
+_verrou = threading.Lock()
+
+
+def _versions():
+    """Versions de toutes les tables de référence, lues une fois par requête HTTP."""
+    if has_app_context() and "referentiel_versions" in g:
+        return g.referentiel_versions
+    versions = dict(zip(TABLES_REFERENCE, lire_versions(*TABLES_REFERENCE.values())))
+    if has_app_context():
+        g.referentiel_versions = versions
+    return versions
+
+
+def _cle_tri(colonne):
+    # Même ordre que ORDER BY : NULL en tête
+    return lambda ligne: (ligne[colonne] is not None, ligne[colonne])
+
+
+# ===============================
+# 📚 LECTURE
+# ===============================
+def lignes(table, tri="id", inverse=False):
+    """
+    Lignes de la table de référence `table` triées par `tri` (ordre décroissant si `inverse`).
+    Retourne un tuple de mappings en lecture seule.
+    """
+    if table not in TABLES_REFERENCE:
+        raise KeyError(f"Table de référence inconnue : {table}")
+    version = _versions()[table]
+    with _verrou:
+        entree = _cache.get(table)
+        if entree is not None and entree[0] == version:
+            _stats[table]["hits"] += 1
+            vues = entree[1]
+            if (tri, inverse) in vues:
+                return vues[(tri, inverse)]
+            base = vues[("id", False)]
+        else:
+            _stats[table]["misses"] += 1
+            base = None
+
+    if base is None:
+        base = tuple(MappingProxyType(dict(r)) for r in query_db(f"SELECT * FROM {table} ORDER BY id"))
+    triees = base if (tri, inverse) == ("id", False) else tuple(sorted(base, key=_cle_tri(tri), reverse=inverse))
+
+    with _verrou:
+        entree = _cache.get(table)
+        if entree is None or entree[0] != version:
+            entree = (version, {("id", False): base})
+            _cache[table] = entree
+        entree[1][(tri, inverse)] = triees
+    return triees
+
+
+# ===============================
+# ♻️ INVALIDATION / MÉTRIQUES
+# ===============================
+def invalider(table, cur=None):
+    """
+    À appeler après une écriture sur une table de référence : incrémente son compteur
+    (dans la transaction de `cur` si fourni) pour tous les processus.
+    """
+    incrementer_version(TABLES_REFERENCE[table], cur)
+    with _verrou:
+        _cache.pop(table, None)
+    if has_app_context():
+        g.pop("referentiel_versions", None)
+
+
+def statistiques():
+    """Succès / échecs du cache par table, avec la version actuellement en mémoire."""
+    with _verrou:
+        return {
+            table: {
+                **compteurs,
+                "version": _cache[table][0] if table in _cache else None,
+                "lignes": len(_cache[table][1][("id", False)]) if table in _cache else 0,
+            }
+            for table, compteurs in _stats.items()
+        }
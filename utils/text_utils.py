@@ -0,0 +1,52 @@
+# utils/text_utils.py
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+
+def _table_accents_latins():
+    """Table de translitération des lettres latines accentuées (Latin-1 + Latin étendu A)."""
+    table = {}
+    for code in range(0x00C0, 0x0180):
+        c = chr(code)
+        base = "".join(x for x in unicodedata.normalize("NFD", c) if unicodedata.category(x) != "Mn")
+        if base != c and base.isascii():
+            table[c] = base
+    table["’"] = "'"
+    table["œ"] = "oe"
+    return str.maketrans(table)
+
+
+_ACCENTS_LATINS = _table_accents_latins()
+
+
+@lru_cache(maxsize=8192)
+def _normaliser(text):
+    text = text.strip()
+    if text.lower() == "nan":
+        return ""
+    text = text.lower()
+    if not text.isascii():
+        # Chemin rapide : accents latins courants, puis NFD seulement s'il reste des caractères non ASCII
+        text = text.translate(_ACCENTS_LATINS)
+        if not text.isascii():
+            text = unicodedata.normalize("NFD", text)
+            text = "".join(c for c in text if unicodedata.category(c) != "Mn")
+            text = text.replace("’", "'").replace("œ", "oe")
+    text = text.replace("_", " ").replace("-", " ")
+    text = " ".join(text.split())
+    return text
+
+
+def normalize_text(text):
+    """Nettoie et normalise les textes (accents, espaces, majuscules...). Résultats mis en cache."""
+    if text is None:
+        return ""
+    return _normaliser(str(text))
+
+
+def similar(a, b, seuil=0.9):
+    """Retourne True si deux chaînes sont suffisamment similaires."""
+    if not a or not b:
+        return False
+    return SequenceMatcher(None, a, b).ratio() >= seuil
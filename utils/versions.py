@@ -0,0 +1,51 @@
+# utils/versions.py
+"""
+Compteurs de version des données de référence (table cache_version).
+
+Chaque écriture sur une table de référence incrémente son compteur, dans la même
+transaction que l'écriture. Les caches en mémoire mémorisent la version lue à leur
+construction et se reconstruisent dès qu'elle change : la vérification coûte un
+SELECT sur une table minuscule, valable pour tous les processus qui partagent la base.
+"""
+from datetime import datetime, timezone
+from utils.db_utils import execute_db, query_db
+
+_INCREMENT = """
+    INSERT INTO cache_version (nom, version, udate) VALUES (?, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (nom) DO UPDATE SET version = version + 1, udate = CURRENT_TIMESTAMP
+"""
+
+
+def lire_versions(*noms):
+    """Tuple des versions des tables `noms` (0 pour une table jamais modifiée)."""
+    rows = query_db(
+        f"SELECT nom, version FROM cache_version WHERE nom IN ({', '.join('?' * len(noms))})",
+        list(noms)
+    )
+    versions = {r["nom"]: r["version"] for r in rows}
+    return tuple(versions.get(nom, 0) for nom in noms)
+
+
+def lire_version_datee(nom):
+    """(version, date UTC de la dernière modification ou None) de la table `nom`."""
+    row = query_db("SELECT version, udate FROM cache_version WHERE nom = ?", [nom], one=True)
+    if row is None:
+        return 0, None
+    udate = datetime.fromisoformat(row["udate"]).replace(tzinfo=timezone.utc) if row["udate"] else None
+    return row["version"], udate
+
+
+def fixer_version(nom, version, cur):
+    """Enregistre une version calculée ailleurs (ex. état des catalogues pris en compte par un recalcul)."""
+    cur.execute("""
+        INSERT INTO cache_version (nom, version, udate) VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (nom) DO UPDATE SET version = excluded.version, udate = CURRENT_TIMESTAMP
+    """, [nom, version])
+
+
+def incrementer_version(nom, cur=None):
+    """Signale une écriture sur la table `nom` ; `cur` : curseur de la transaction en cours."""
+    if cur is not None:
+        cur.execute(_INCREMENT, [nom])
+    else:
+        execute_db(_INCREMENT, [nom])